@@ -15,42 +15,71 @@
     You should have received a copy of the GNU Lesser General Public License
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
+import importlib as __importlib
+
 import blankly.utils.utils
-import blankly.data as data
-from blankly.exchanges.interfaces.coinbase_pro.coinbase_pro import CoinbasePro
-from blankly.exchanges.interfaces.binance.binance import Binance
-from blankly.exchanges.interfaces.alpaca.alpaca import Alpaca
-from blankly.exchanges.interfaces.oanda.oanda import Oanda
-from blankly.exchanges.interfaces.kucoin.kucoin import Kucoin
-from blankly.exchanges.interfaces.ftx.ftx import FTX
-from blankly.exchanges.interfaces.okx.okx import Okx
-from blankly.exchanges.interfaces.paper_trade.paper_trade import PaperTrade
-from blankly.exchanges.interfaces.keyless.keyless import KeylessExchange
-from blankly.frameworks.strategy import Strategy as Strategy
-from blankly.frameworks.model.model import Model as Model
-from blankly.frameworks.strategy import StrategyState as StrategyState
-from blankly.frameworks.screener.screener import Screener
-from blankly.frameworks.screener.screener_state import ScreenerState
-
-from blankly.exchanges.managers.ticker_manager import TickerManager
-from blankly.exchanges.managers.orderbook_manager import OrderbookManager
-from blankly.exchanges.managers.general_stream_manager import GeneralManager
-from blankly.exchanges.interfaces.abc_exchange_interface import ABCExchangeInterface as Interface
-from blankly.frameworks.multiprocessing.blankly_bot import BlanklyBot
 from blankly.utils.utils import trunc
-import blankly.utils.utils as utils
-from blankly.utils.scheduler import Scheduler
-import blankly.indicators as indicators
 from blankly.utils import time_builder
 
 from blankly.enums import Side, OrderType, OrderStatus, TimeInForce
-from blankly.exchanges.interfaces.binance_futures.binance_futures import BinanceFutures
-from blankly.exchanges.interfaces.ftx_futures.ftx_futures import FTXFutures
-from blankly.frameworks.strategy import FuturesStrategy
-from blankly.frameworks.strategy import FuturesStrategyState
 
 from blankly.deployment.reporter_headers import Reporter as __Reporter_Headers
 
+# Exchanges, frameworks & managers pull in exchange SDKs, the plotting stack and the backtesting engine. These are
+#  imported the first time they're accessed (PEP 562) so that processes only pay for what they use.
+__lazy_attributes = {
+    'data': ('blankly.data', None),
+    'indicators': ('blankly.indicators', None),
+    'CoinbasePro': ('blankly.exchanges.interfaces.coinbase_pro.coinbase_pro', 'CoinbasePro'),
+    'Binance': ('blankly.exchanges.interfaces.binance.binance', 'Binance'),
+    'Alpaca': ('blankly.exchanges.interfaces.alpaca.alpaca', 'Alpaca'),
+    'Oanda': ('blankly.exchanges.interfaces.oanda.oanda', 'Oanda'),
+    'Kucoin': ('blankly.exchanges.interfaces.kucoin.kucoin', 'Kucoin'),
+    'FTX': ('blankly.exchanges.interfaces.ftx.ftx', 'FTX'),
+    'Okx': ('blankly.exchanges.interfaces.okx.okx', 'Okx'),
+    'PaperTrade': ('blankly.exchanges.interfaces.paper_trade.paper_trade', 'PaperTrade'),
+    'KeylessExchange': ('blankly.exchanges.interfaces.keyless.keyless', 'KeylessExchange'),
+    'BinanceFutures': ('blankly.exchanges.interfaces.binance_futures.binance_futures', 'BinanceFutures'),
+    'FTXFutures': ('blankly.exchanges.interfaces.ftx_futures.ftx_futures', 'FTXFutures'),
+    'Strategy': ('blankly.frameworks.strategy', 'Strategy'),
+    'StrategyState': ('blankly.frameworks.strategy', 'StrategyState'),
+    'FuturesStrategy': ('blankly.frameworks.strategy', 'FuturesStrategy'),
+    'FuturesStrategyState': ('blankly.frameworks.strategy', 'FuturesStrategyState'),
+    'Model': ('blankly.frameworks.model.model', 'Model'),
+    'Screener': ('blankly.frameworks.screener.screener', 'Screener'),
+    'ScreenerState': ('blankly.frameworks.screener.screener_state', 'ScreenerState'),
+    'TickerManager': ('blankly.exchanges.managers.ticker_manager', 'TickerManager'),
+    'OrderbookManager': ('blankly.exchanges.managers.orderbook_manager', 'OrderbookManager'),
+    'GeneralManager': ('blankly.exchanges.managers.general_stream_manager', 'GeneralManager'),
+    'Interface': ('blankly.exchanges.interfaces.abc_exchange_interface', 'ABCExchangeInterface'),
+    'BlanklyBot': ('blankly.frameworks.multiprocessing.blankly_bot', 'BlanklyBot'),
+    'Scheduler': ('blankly.utils.scheduler', 'Scheduler'),
+    'PriceHistory': ('blankly.utils.ring_buffer', 'PriceHistory'),
+    'RingBuffer': ('blankly.utils.ring_buffer', 'RingBuffer'),
+}
+
+
+__all__ = ['utils', 'trunc', 'time_builder', 'Side', 'OrderType', 'OrderStatus', 'TimeInForce', 'is_deployed',
+           'reporter'] + list(__lazy_attributes.keys())
+
+
+def __getattr__(name: str):
+    try:
+        module_name, attribute = __lazy_attributes[name]
+    except KeyError:
+        raise AttributeError(f"module 'blankly' has no attribute '{name}'")
+
+    module = __importlib.import_module(module_name)
+    value = module if attribute is None else getattr(module, attribute)
+    # Cache it so that this is only called once per name
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(__lazy_attributes.keys()))
+
+
 is_deployed = False
 _screener_runner = None
 
@@ -489,6 +489,42 @@ def blankly_key(args):
     func(args)
 
 
+def load_price_cache(args):
+    # Imported here so that the rest of the CLI doesn't need to load the backtesting stack
+    from blankly.exchanges.interfaces.paper_trade.backtest.price_cache import create_cache_backend
+    settings = load_backtest_preferences(override_allow_nonexistent=True)['settings']
+    return create_cache_backend(args.format or settings['cache_format'], args.folder or settings['cache_location'])
+
+
+def blankly_cache_rebuild(args):
+    cache = load_price_cache(args)
+    with show_spinner(f'Indexing {cache.cache_folder}') as spinner:
+        manifest = cache.rebuild_manifest()
+        spinner.ok(f'Indexed {len(manifest)} cached segments in {cache.cache_folder}')
+
+
+def blankly_cache_verify(args):
+    cache = load_price_cache(args)
+    missing, unindexed = cache.verify_manifest()
+    for file_name in missing:
+        print_failure(f'Indexed but missing from the cache folder: {file_name}')
+    for file_name in unindexed:
+        print_failure(f'In the cache folder but not indexed: {file_name}')
+
+    if missing or unindexed:
+        print_work('Run `blankly cache rebuild` to re-index the cache folder')
+        sys.exit(1)
+    print_success(f'The index matches all {len(cache.manifest)} cached segments in {cache.cache_folder}')
+
+
+def blankly_cache_compact(args):
+    cache = load_price_cache(args)
+    with show_spinner(f'Compacting {cache.cache_folder}') as spinner:
+        result = cache.compact()
+        spinner.ok(f'Merged {result.segments_merged} cached segments into {result.segments_written}, '
+                   f'reclaiming {result.bytes_reclaimed / 1e6:.2f} MB')
+
+
 def main():
     parser = argparse.ArgumentParser(prog='blankly', description='Blankly CLI & deployment tool')
     subparsers = parser.add_subparsers(required=True)
@@ -521,6 +557,22 @@ def main():
     key_add_parser = key_subparsers.add_parser('add', help='Add an API Key to this model')
     key_add_parser.set_defaults(func=blankly_add_key)
 
+    cache_parser = subparsers.add_parser('cache', help='Manage the local backtest price cache')
+    cache_parser.set_defaults(func=lambda _: cache_parser.print_help())
+    cache_subparsers = cache_parser.add_subparsers()
+
+    for name, func, help_text in [
+        ('rebuild', blankly_cache_rebuild, 'Re-index the price cache folder, including files copied in by hand'),
+        ('verify', blankly_cache_verify, 'Check that the price cache index matches the cache folder'),
+        ('compact', blankly_cache_compact, 'Merge overlapping or touching price cache files into single files')
+    ]:
+        cache_command_parser = cache_subparsers.add_parser(name, help=help_text)
+        cache_command_parser.add_argument('--folder', help='the cache folder, defaults to the cache_location in '
+                                                           'backtest.json')
+        cache_command_parser.add_argument('--format', help='the cache format, defaults to the cache_format in '
+                                                           'backtest.json')
+        cache_command_parser.set_defaults(func=func)
+
     # run the selected command
     args = parser.parse_args()
     try:
@@ -19,12 +19,14 @@
 import smtplib
 import ssl
 
-from typing import Any
+from typing import Any, TYPE_CHECKING
 
 from blankly.utils.utils import load_notify_preferences
-from blankly.frameworks.strategy import Strategy
-from blankly.frameworks.screener.screener import Screener
-from blankly.exchanges.interfaces.paper_trade.backtest_result import BacktestResult
+
+if TYPE_CHECKING:
+    # Only needed for annotations, importing these here would load the whole framework with `import blankly`
+    from blankly.frameworks.strategy import Strategy
+    from blankly.frameworks.screener.screener import Screener
 
 
 class Reporter:
@@ -54,7 +56,7 @@ class Reporter:
         """
         return self.__live_vars[id(var)]
 
-    def export_strategy(self, strategy: Strategy):
+    def export_strategy(self, strategy: 'Strategy'):
         """
         Export a strategy for monitoring. This is used internally on the construction of the strategy object
 
@@ -63,7 +65,7 @@ class Reporter:
         """
         pass
 
-    def export_screener(self, screener: Screener):
+    def export_screener(self, screener: 'Screener'):
         """
         Export a screener object to the backend for monitoring
 
@@ -75,7 +77,7 @@ class Reporter:
         else:
             raise RuntimeError("Currently only a single screener can be created per model.")
 
-    def export_screener_result(self, screener: Screener):
+    def export_screener_result(self, screener: 'Screener'):
         """
         Re-export for the finished screener result
 
@@ -29,6 +29,7 @@ import pandas as pd
 
 from blankly import utils
 from blankly.utils import time_interval_to_seconds
+from blankly.utils.ring_buffer import PriceHistory
 
 
 # A lot of this class is just glue between ExchangeInterface and the new Futures classes.
@@ -152,7 +153,10 @@ class ABCBaseExchangeInterface(abc.ABC):
 
     @staticmethod
     def cast_type(response: pd.DataFrame, return_as: str, point_count=None):
-        if return_as != 'df' and return_as != 'deque':
+        if return_as == 'ring':
+            # Fixed size NumPy buffers, which can be passed to indicators without a copy
+            return PriceHistory.from_dataframe(response, max(point_count or 0, len(response), 1))
+        elif return_as != 'df' and return_as != 'deque':
             return response.to_dict(return_as)
         elif return_as == 'deque':
             # Create a deque object that has the same length
@@ -19,18 +19,36 @@
 import alpaca_trade_api
 
 from blankly.exchanges.auth.auth_constructor import AuthConstructor
+from blankly.utils.rate_limiter import get_rate_limiter
 
 live_url = "https://api.alpaca.markets"
 paper_url = "https://paper-api.alpaca.markets"
 
 
+class RateLimitedREST(alpaca_trade_api.REST):
+    """
+    Alpaca client which takes from the shared alpaca rate limit before each request. The library already retries
+    429 responses on its own, those are reported to the limiter so that every thread backs off together.
+    """
+    def _one_request(self, method: str, url, opts: dict, retry: int):
+        limiter = get_rate_limiter('alpaca', 'order' if method in ('POST', 'PATCH', 'DELETE') else 'private')
+        limiter.acquire()
+        try:
+            response = super()._one_request(method, url, opts, retry)
+        except alpaca_trade_api.rest.RetryException:
+            limiter.throttle()
+            raise
+        limiter.succeeded()
+        return response
+
+
 def create_alpaca_client(auth: AuthConstructor, sandbox_mode=True):
     if sandbox_mode:
         api_url = paper_url
     else:
         api_url = live_url
 
-    return alpaca_trade_api.REST(auth.keys['API_KEY'], auth.keys['API_SECRET'], api_url, 'v2', raw_data=True)
+    return RateLimitedREST(auth.keys['API_KEY'], auth.keys['API_SECRET'], api_url, 'v2', raw_data=True)
 
 
 # class API:
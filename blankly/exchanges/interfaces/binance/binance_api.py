@@ -19,11 +19,13 @@ import hashlib
 import hmac
 import time
 from collections import OrderedDict
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlparse
 
 import requests
 from requests.auth import AuthBase
 
+from blankly.utils.rate_limiter import send_request
+
 # Create custom authentication for Exchange
 
 
@@ -44,6 +46,20 @@ def hmac_encode(message: str, secret_key: str) -> str:
     return signature.hexdigest()
 
 
+# Request weights for the endpoints that cost more than 1, every other endpoint costs 1
+request_weights = {
+    '/api/v3/exchangeInfo': 10,
+    '/api/v3/klines': 2,
+    '/api/v3/historicalTrades': 5,
+    '/api/v3/account': 10,
+    '/api/v3/allOrders': 10,
+    '/api/v3/myTrades': 10,
+    '/api/v3/openOrders': 3,
+    '/api/v3/allOrderList': 10,
+    '/api/v3/openOrderList': 3
+}
+
+
 class API:
     API_URL = 'https://api.binance.{}/api'
     API_TESTNET_URL = 'https://testnet.binance.vision/api'
@@ -81,13 +97,25 @@ class API:
         else:
             assert isinstance(data, OrderedDict)
 
-        params["timestamp"] = int(time.time() * 1000)
+        def send():
+            # Signed again on every attempt so that a retry after a backoff isn't rejected as stale
+            params.pop("signature", None)
+            params["timestamp"] = int(time.time() * 1000)
 
-        if signed:
-            msg = urlencode(params) + urlencode(data)
-            params["signature"] = hmac_encode(msg, self.secret_key)
+            if signed:
+                msg = urlencode(params) + urlencode(data)
+                params["signature"] = hmac_encode(msg, self.secret_key)
+
+            return getattr(self.session, method)(url, params=params, data=data)
+
+        path = urlparse(url).path
+        if method in ('post', 'delete') and '/order' in path:
+            endpoint_class = 'order'
+        else:
+            endpoint_class = 'private' if signed else 'public'
 
-        response = getattr(self.session, method)(url, params=params, data=data)
+        weight = next((weight for endpoint, weight in request_weights.items() if path.endswith(endpoint)), 1)
+        response = send_request('binance', endpoint_class, send, weight)
         return response.json()
 
     """
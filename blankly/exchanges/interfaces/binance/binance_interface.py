@@ -15,7 +15,6 @@
     You should have received a copy of the GNU Lesser General Public License
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
-import time
 
 import pandas as pd
 
@@ -27,6 +26,7 @@ from blankly.exchanges.orders.limit_order import LimitOrder
 from blankly.exchanges.orders.market_order import MarketOrder
 from blankly.exchanges.orders.stop_loss import StopLossOrder
 from blankly.exchanges.orders.take_profit import TakeProfitOrder
+from blankly.utils.rate_limiter import get_rate_limiter
 
 
 class BinanceInterface(ExchangeInterface):
@@ -749,16 +749,18 @@ class BinanceInterface(ExchangeInterface):
         while need > 1000:
             # Close is always 300 points ahead
             window_close = int(window_open + 1000 * resolution)
+            # Klines requests with a limit of 1000 cost 2 request weight
+            get_rate_limiter('binance').acquire(2)
             history = history + calls.get_klines(symbol=symbol, startTime=window_open * 1000,
                                                  endTime=window_close * 1000, interval=gran_string,
                                                  limit=1000)
 
             window_open = window_close
             need -= 1000
-            time.sleep(.2)
             utils.update_progress((initial_need - need) / initial_need)
 
         # Fill the remainder
+        get_rate_limiter('binance').acquire(2)
         history_block = history + calls.get_klines(symbol=symbol, startTime=window_open * 1000,
                                                    endTime=epoch_stop * 1000, interval=gran_string,
                                                    limit=1000)
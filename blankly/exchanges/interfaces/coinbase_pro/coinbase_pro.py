@@ -35,16 +35,19 @@ class CoinbasePro(Exchange):
         sandbox = super().evaluate_sandbox(auth)
 
         keys = auth.keys
+        pool_size = self.preferences['settings']['coinbase_pro']['connection_pool_size']
         if sandbox:
             calls = CoinbaseProAPI(api_key=keys['API_KEY'],
                                    api_secret=keys['API_SECRET'],
                                    api_pass=keys['API_PASS'],
-                                   api_url="https://api-public.sandbox.pro.coinbase.com/")
+                                   api_url="https://api-public.sandbox.pro.coinbase.com/",
+                                   pool_size=pool_size)
         else:
             # Create the authenticated object
             calls = CoinbaseProAPI(api_key=keys['API_KEY'],
                                    api_secret=keys['API_SECRET'],
-                                   api_pass=keys['API_PASS'])
+                                   api_pass=keys['API_PASS'],
+                                   pool_size=pool_size)
 
         # Always finish the method with this function
         super().construct_interface_and_cache(calls)
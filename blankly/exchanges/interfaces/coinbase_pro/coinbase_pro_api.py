@@ -17,12 +17,17 @@ import base64
 import hashlib
 import hmac
 import json
+import threading
 import time
+from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import AuthBase
+from urllib3.util.retry import Retry
 
 # Create custom authentication for Exchange
+from blankly.utils.rate_limiter import send_request
 from blankly.utils.utils import info_print
 
 
@@ -58,11 +63,48 @@ def get_auth_headers(timestamp, message, api_key, secret_key, passphrase):
     }
 
 
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(api_url: str, pool_size: int = 10) -> requests.Session:
+    """
+    Get the pooled session for a host. Sessions are shared by every API object talking to the same host so that
+    connections are kept alive between calls instead of paying for a new TLS handshake on each request.
+
+    Args:
+        api_url: The url of the API, only the host is used
+        pool_size: The number of connections kept open to the host. This only applies when the session is created.
+    """
+    host = urlparse(api_url).netloc
+    with _sessions_lock:
+        if host not in _sessions:
+            # Connection failures are always retried since nothing reached the exchange. Server errors are only
+            #  retried for requests that are safe to repeat so an order is never placed twice. Rate limiting is
+            #  handled by the shared rate limiter instead.
+            retries = Retry(total=3, connect=3, read=2, status=3, backoff_factor=0.25,
+                            status_forcelist=(500, 502, 503, 504), allowed_methods=frozenset(['GET', 'DELETE']),
+                            respect_retry_after_header=False, raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[host] = session
+        return _sessions[host]
+
+
 class API:
-    def __init__(self, api_key: str, api_secret: str, api_pass: str, api_url: str = 'https://api.pro.coinbase.com/'):
+    def __init__(self, api_key: str, api_secret: str, api_pass: str, api_url: str = 'https://api.pro.coinbase.com/',
+                 pool_size: int = 10):
         self.__auth = CoinbaseExchangeAuth(api_key, api_secret, api_pass)
         self.__api_url = api_url
-        self.session = requests.Session()
+        self.session = get_session(api_url, pool_size)
+
+    def _send(self, method: str, endpoint: str, endpoint_class: str, **kwargs) -> requests.Response:
+        # Every call shares the pooled connections & the process-wide coinbase pro rate limits
+        return send_request('coinbase_pro', endpoint_class,
+                            lambda: self.session.request(method, self.__api_url + endpoint, **kwargs))
 
     """
     Public Client Calls
@@ -87,7 +129,7 @@ class API:
                     }
                 ]
         """
-        return requests.get(self.__api_url + 'products', auth=self.__auth).json()
+        return self._send('GET', 'products', 'public', auth=self.__auth).json()
 
     def get_product_order_book(self, product_id, level=1):
         """Get a list of open orders for a product.
@@ -128,7 +170,7 @@ class API:
             info_print("Abuse of polling at level 3 can result in a block. Consider using the websocket.")
 
         params = {'level': level}
-        return requests.get(self.__api_url + "products/{}/book".format(product_id), params=params).json()
+        return self._send('GET', "products/{}/book".format(product_id), 'public', params=params).json()
 
     """ PAGINATED """ """ Full interface support """
 
@@ -210,7 +252,7 @@ class API:
 
         params['granularity'] = granularity
 
-        return requests.get(self.__api_url + 'products/{}/candles'.format(product_id), params=params).json()
+        return self._send('GET', 'products/{}/candles'.format(product_id), 'public', params=params).json()
 
     def get_product_24hr_stats(self, product_id):
         """Get 24 hr stats for the product.
@@ -229,7 +271,7 @@ class API:
                     }
 
         """
-        return requests.get(self.__api_url + 'products/{}/stats'.format(product_id), auth=self.__auth).json()
+        return self._send('GET', 'products/{}/stats'.format(product_id), 'public', auth=self.__auth).json()
 
     """ Full interface support """
 
@@ -249,7 +291,7 @@ class API:
                 }]
 
         """
-        return requests.get(self.__api_url + 'currencies', auth=self.__auth).json()
+        return self._send('GET', 'currencies', 'public', auth=self.__auth).json()
 
     def get_time(self):
         """Get the API server time.
@@ -263,7 +305,7 @@ class API:
                     }
 
         """
-        return requests.get(self.__api_url + 'time', auth=self.__auth).json()
+        return self._send('GET', 'time', 'public', auth=self.__auth).json()
 
     """
     Private API Calls
@@ -295,7 +337,7 @@ class API:
 
         * Additional info included in response for margin accounts.
         """
-        return requests.get(self.__api_url + 'accounts', auth=self.__auth).json()
+        return self._send('GET', 'accounts', 'private', auth=self.__auth).json()
 
     """ Full interface support """
 
@@ -317,7 +359,7 @@ class API:
                     "currency": "USD"
                 }
         """
-        return requests.get(self.__api_url + 'accounts/' + account_id, auth=self.__auth).json()
+        return self._send('GET', 'accounts/' + account_id, 'private', auth=self.__auth).json()
 
     """ PAGINATED """
 
@@ -492,7 +534,7 @@ class API:
                   'side': side,
                   'type': order_type}
         params.update(kwargs)
-        return requests.post(self.__api_url + 'orders', data=json.dumps(params), auth=self.__auth).json()
+        return self._send('POST', 'orders', 'order', data=json.dumps(params), auth=self.__auth).json()
 
     def place_limit_order(self, product_id, side, price, size,
                           client_oid=None,
@@ -656,7 +698,7 @@ class API:
                 [ "c5ab5eae-76be-480e-8961-00792dc7e138" ]
 
         """
-        return requests.delete(self.__api_url + 'orders/' + order_id, auth=self.__auth).json()
+        return self._send('DELETE', 'orders/' + order_id, 'order', auth=self.__auth).json()
 
     """ PAGINATED """
     """ Full interface support (untested) """
@@ -761,7 +803,7 @@ class API:
                 }
 
         """
-        return requests.get(self.__api_url + "orders/" + order_id, auth=self.__auth).json()
+        return self._send('GET', "orders/" + order_id, 'private', auth=self.__auth).json()
 
     """ PAGINATED """
 
@@ -835,7 +877,7 @@ class API:
                 'usd_volume': '37.69'
             }
         """
-        return requests.get(self.__api_url + "fees", auth=self.__auth).json()
+        return self._send('GET', "fees", 'private', auth=self.__auth).json()
 
     def _send_paginated_message(self, endpoint, params=None):
         """ Send API message that results in a paginated response.
@@ -863,8 +905,7 @@ class API:
         if params is None:
             params = dict()
         while True:
-            r = requests.get(self.__api_url + endpoint, params=params, auth=self.__auth, timeout=30)
-            # r = self.session.get(url, params=params, auth=self.auth, timeout=30)
+            r = self._send('GET', endpoint, 'private', params=params, auth=self.__auth, timeout=30)
             results = r.json()
             for result in results:
                 yield result
@@ -927,7 +968,7 @@ class API:
             params['account_id'] = account_id
         if email is not None:
             params['email'] = email
-        return requests.post(self.__api_url + "reports", data=json.dumps(params), auth=self.__auth).json()
+        return self._send('POST', "reports", 'private', data=json.dumps(params), auth=self.__auth).json()
 
     def get_report(self, report_id):
         """ Get report status.
@@ -941,7 +982,7 @@ class API:
             dict: Report details, including file url once it is created.
 
         """
-        return requests.get(self.__api_url + "reports/" + report_id, auth=self.__auth).json()
+        return self._send('GET', "reports/" + report_id, 'private', auth=self.__auth).json()
 
     def get_trailing_volume(self):
         """  Get your 30-day trailing volume for all products.
@@ -963,7 +1004,7 @@ class API:
                 ]
 
         """
-        return requests.get(self.__api_url + "users/self/trailing-volume", auth=self.__auth).json()
+        return self._send('GET', "users/self/trailing-volume", 'private', auth=self.__auth).json()
 
     def get_coinbase_accounts(self):
         """ Get a list of your coinbase accounts.
@@ -972,7 +1013,7 @@ class API:
             list: Coinbase account details.
 
         """
-        return requests.get(self.__api_url + 'coinbase-accounts', auth=self.__auth).json()
+        return self._send('GET', 'coinbase-accounts', 'private', auth=self.__auth).json()
 
     def get_product_ticker(self, product_id):
         """ Get recent market data for a product
@@ -989,7 +1030,7 @@ class API:
                 "time": "2015-11-14T20:46:03.511254Z"
             }
         """
-        return requests.get(self.__api_url + 'products/' + product_id + '/ticker', auth=self.__auth).json()
+        return self._send('GET', 'products/' + product_id + '/ticker', 'public', auth=self.__auth).json()
 
 # # Create custom authentication for Exchange
 # class CoinbaseExchangeAuth(AuthBase):
@@ -16,7 +16,6 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import time
 
 import pandas as pd
 
@@ -535,7 +534,6 @@ class CoinbaseProInterface(ExchangeInterface):
 
             window_open = window_close
             need -= 300
-            time.sleep(.2)
             utils.update_progress((initial_need - need) / initial_need)
 
         # Fill the remainder
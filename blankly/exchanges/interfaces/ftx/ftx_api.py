@@ -20,6 +20,7 @@
 import requests
 from typing import Optional, Dict, Any, List
 import urllib.parse
+from blankly.utils.rate_limiter import send_request
 from blankly.utils.utils import epoch_from_iso8601
 import time
 import hmac
@@ -42,9 +43,13 @@ class FTXAPI:
             self._header_prefix += 'US'
 
     def _signed_request(self, method: str, path: str, **kwargs):
-        request = requests.Request(method, self._api_url + path, **kwargs)
-        self._get_signature(request)
-        result = self._ftx_session.send(request.prepare())
+        def send():
+            request = requests.Request(method, self._api_url + path, **kwargs)
+            self._get_signature(request)
+            return self._ftx_session.send(request.prepare())
+
+        endpoint_class = 'order' if method != 'GET' and path.startswith(('orders', 'conditional_orders')) else 'private'
+        result = send_request('ftx', endpoint_class, send)
         return self._handle_response(result)
 
     def _get_signature(self, request: requests.Request):
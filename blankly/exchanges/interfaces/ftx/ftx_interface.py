@@ -17,7 +17,6 @@
 """
 
 import pandas as pd
-import time
 from blankly.exchanges.interfaces.exchange_interface import ExchangeInterface
 from blankly.exchanges.orders.market_order import MarketOrder
 from blankly.exchanges.orders.limit_order import LimitOrder
@@ -516,7 +515,6 @@ class FTXInterface(ExchangeInterface):
 
             window_open = window_close
             need -= 1500
-            time.sleep(.2)
             utils.update_progress((initial_need - need) / initial_need)
 
         # Fill the remainder
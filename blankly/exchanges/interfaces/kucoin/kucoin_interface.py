@@ -16,7 +16,6 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import time
 
 import pandas as pd
 
@@ -28,6 +27,7 @@ from blankly.exchanges.orders.market_order import MarketOrder
 from blankly.exchanges.orders.stop_loss import StopLossOrder
 from blankly.exchanges.orders.take_profit import TakeProfitOrder
 from blankly.utils.exceptions import APIException, InvalidOrder
+from blankly.utils.rate_limiter import get_rate_limiter
 
 
 class KucoinInterface(ExchangeInterface):
@@ -484,6 +484,7 @@ class KucoinInterface(ExchangeInterface):
         while need > 1500:
             # Close is always 300 points ahead
             window_close = int(window_open + 1500 * resolution)
+            get_rate_limiter('kucoin').acquire()
             response = self._market.get_kline(symbol, gran_string,
                                               startAt=window_open, endAt=window_close)
             response = self.__correct_api_call(response)
@@ -493,10 +494,10 @@ class KucoinInterface(ExchangeInterface):
 
             window_open = window_close
             need -= 1500
-            time.sleep(1)
             utils.update_progress((initial_need - need) / initial_need)
 
         # Fill the remainder
+        get_rate_limiter('kucoin').acquire()
         response = self._market.get_kline(symbol, gran_string,
                                           startAt=window_open, endAt=epoch_stop)
         response = self.__correct_api_call(response)
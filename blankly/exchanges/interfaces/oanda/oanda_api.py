@@ -23,6 +23,7 @@ import requests
 from collections import OrderedDict
 
 from blankly.utils.exceptions import APIException
+from blankly.utils.rate_limiter import send_request
 
 
 def api_error_handler(func):
@@ -68,7 +69,8 @@ class OandaAPI:
         else:
             assert isinstance(data, OrderedDict)
 
-        response = getattr(self.session, method)(url, params=params, data=json.dumps(data))
+        response = send_request('oanda', 'private' if method == 'get' else 'order',
+                                lambda: getattr(self.session, method)(url, params=params, data=json.dumps(data)))
         return response.json()
 
     """
@@ -5,6 +5,8 @@ import datetime
 # import time
 import json
 
+from blankly.utils.rate_limiter import send_request
+
 CONTENT_TYPE = 'Content-Type'
 OK_ACCESS_KEY = 'OK-ACCESS-KEY'
 OK_ACCESS_SIGN = 'OK-ACCESS-SIGN'
@@ -276,26 +278,33 @@ class Client(object):
         # url
         url = self.api_url + request_path
 
-        timestamp = get_timestamp()
+        body = json.dumps(params) if method == POST else ""
 
-        # sign & header
-        if self.use_server_time:
-            timestamp = self._get_timestamp()
+        def send():
+            timestamp = get_timestamp()
 
-        body = json.dumps(params) if method == POST else ""
+            # sign & header
+            if self.use_server_time:
+                timestamp = self._get_timestamp()
 
-        sign_ = sign(pre_hash(timestamp, method, request_path, str(body)), self.API_SECRET_KEY)
-        header = get_header(self.API_KEY, sign_, timestamp, self.PASSPHRASE, self.flag)
-        if self._sandbox:
-            header["x-simulated-trading"] = '1'
+            sign_ = sign(pre_hash(timestamp, method, request_path, str(body)), self.API_SECRET_KEY)
+            header = get_header(self.API_KEY, sign_, timestamp, self.PASSPHRASE, self.flag)
+            if self._sandbox:
+                header["x-simulated-trading"] = '1'
 
-        # send request
-        response = None
+            # send request
+            if method == GET:
+                return requests.get(url, headers=header)
+            elif method == POST:
+                return requests.post(url, data=body, headers=header)
 
-        if method == GET:
-            response = requests.get(url, headers=header)
-        elif method == POST:
-            response = requests.post(url, data=body, headers=header)
+        if request_path.startswith(('/api/v5/market', '/api/v5/public')):
+            endpoint_class = 'public'
+        elif request_path.startswith('/api/v5/trade') and method == POST:
+            endpoint_class = 'order'
+        else:
+            endpoint_class = 'private'
+        response = send_request('okx', endpoint_class, send)
 
         if not str(response.status_code).startswith('2'):
             raise OkxAPIException(response)
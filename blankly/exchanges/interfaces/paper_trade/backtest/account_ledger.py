@@ -0,0 +1,108 @@
+"""
+    Columnar account value history recorded during a backtest
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import typing
+
+import numpy as np
+import pandas as pd
+
+
+class AccountLedger:
+    """
+    A growable table with one float64 column per asset, the time and the account value.
+
+    Rows are written in place with append_row() followed by set() for each value, so recording the account doesn't
+    allocate anything until a column has to grow. Columns appear in the order they were first set and any value that
+    wasn't set on a row is NaN, the same as building a DataFrame from a list of dictionaries.
+    """
+    def __init__(self, capacity: int = 1024):
+        self.__capacity = max(int(capacity), 1)
+        self.__length = 0
+        self.__columns: typing.Dict[str, np.ndarray] = {}
+        # Columns first set on the last row, which are removed again if the row is discarded
+        self.__new_columns: typing.List[str] = []
+
+    def __grow(self):
+        self.__capacity *= 2
+        for name, column in self.__columns.items():
+            grown = np.empty(self.__capacity, dtype=np.float64)
+            grown[:self.__length] = column[:self.__length]
+            self.__columns[name] = grown
+
+    def append_row(self) -> int:
+        """
+        Start a new row where every value is NaN until it is set
+
+        Returns:
+            The index of the new row
+        """
+        if self.__length == self.__capacity:
+            self.__grow()
+        row = self.__length
+        for column in self.__columns.values():
+            column[row] = np.nan
+        self.__length += 1
+        self.__new_columns = []
+        return row
+
+    def discard_row(self):
+        """
+        Remove the last row, used when recording it failed part way through. Any columns the row added are removed too,
+        so they don't show up as columns of NaN.
+        """
+        if self.__length > 0:
+            self.__length -= 1
+            for name in self.__new_columns:
+                del self.__columns[name]
+            self.__new_columns = []
+
+    def set(self, name: str, value: float):
+        """
+        Write a value into the last row
+        """
+        try:
+            self.__columns[name][self.__length - 1] = value
+        except KeyError:
+            column = np.full(self.__capacity, np.nan, dtype=np.float64)
+            column[self.__length - 1] = value
+            self.__columns[name] = column
+            self.__new_columns.append(name)
+
+    def clear(self):
+        self.__length = 0
+        self.__columns = {}
+        self.__new_columns = []
+
+    @property
+    def columns(self) -> list:
+        return list(self.__columns.keys())
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get a view of the recorded values in a column
+        """
+        return self.__columns[name][:self.__length]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame({name: column[:self.__length] for name, column in self.__columns.items()}, copy=False)
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __repr__(self):
+        return f"AccountLedger(rows={self.__length}, columns={self.columns})"
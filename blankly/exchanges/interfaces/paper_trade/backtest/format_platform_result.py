@@ -81,6 +81,19 @@ def __parse_backtest_trades(trades: list, limit_executed: list, limit_canceled:
     :return: None
     """
 
+    def first_by_id(records: list, key: str) -> dict:
+        # Index the first record for each order id so that matching isn't quadratic in the number of orders
+        indexed = {}
+        for record in records:
+            indexed.setdefault(record['id'], record[key])
+        return indexed
+
+    executed_times = first_by_id(limit_executed, 'executed_time')
+    canceled_times = first_by_id(limit_canceled, 'canceled_time')
+    executed_prices = first_by_id(market_executed, 'executed_price')
+    # Limits only have an executed price when they filled at a better price than they were placed at
+    limit_prices = first_by_id([record for record in limit_executed if 'executed_price' in record], 'executed_price')
+
     # Now just parse if there should be an executed time or a canceled time
     for i in range(len(trades)):
         try:
@@ -88,23 +101,18 @@ def __parse_backtest_trades(trades: list, limit_executed: list, limit_canceled:
         except KeyError:
             pass
         if trades[i]['type'] == 'limit':
-            # TODO this wastes a few CPU cycles at the moment so it could be cleaned up
-            for j in limit_executed:
-                if trades[i]['id'] == j['id']:
-                    trades[i]['executed_time'] = j['executed_time']
-                    break
-
-            for j in limit_canceled:
-                if trades[i]['id'] == j['id']:
-                    trades[i]['canceled_time'] = j['canceled_time']
-                    break
+            if trades[i]['id'] in executed_times:
+                trades[i]['executed_time'] = executed_times[trades[i]['id']]
+            if trades[i]['id'] in limit_prices:
+                trades[i]['executed_price'] = limit_prices[trades[i]['id']]
+
+            if trades[i]['id'] in canceled_times:
+                trades[i]['canceled_time'] = canceled_times[trades[i]['id']]
         elif trades[i]['type'] == 'market':
             # This adds in the execution price for the market orders
             trades[i]['type'] = 'spot-market'
-            for j in market_executed:
-                if trades[i]['id'] == j['id']:
-                    trades[i]['price'] = j['executed_price']
-                    break
+            if trades[i]['id'] in executed_prices:
+                trades[i]['price'] = executed_prices[trades[i]['id']]
 
     return trades
 
@@ -0,0 +1,569 @@
+"""
+    Storage backends for the backtest price cache
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import abc
+import bisect
+import contextlib
+import itertools
+import json
+import math
+import os
+import typing
+import uuid
+
+import pandas as pd
+
+from blankly.utils.utils import info_print
+
+
+class CacheSegment(typing.NamedTuple):
+    """
+    A single cached file. The identifiers are encoded directly in the filename:
+    'coinbase_pro,True,BTC-USD,1622400000,1622510793,60.csv'
+    """
+    exchange: str
+    sandbox: bool
+    symbol: str
+    epoch_start: int
+    epoch_stop: int
+    resolution: int
+    file_name: str
+
+    @property
+    def key(self) -> tuple:
+        return self.exchange, self.sandbox, self.symbol, self.resolution
+
+
+def segment_name(exchange: str, sandbox: bool, symbol: str, epoch_start: [int, float], epoch_stop: [int, float],
+                 resolution: int, extension: str) -> str:
+    return f'{exchange},{sandbox},{symbol},{int(epoch_start)},{int(epoch_stop)},{int(resolution)}.{extension}'
+
+
+def parse_segment_name(file_name: str) -> typing.Optional[CacheSegment]:
+    """
+    Read the identifiers back out of a cache filename. Returns None if the name is not a valid cache segment.
+    """
+    identifier = os.path.splitext(file_name)[0].split(",")
+    try:
+        return CacheSegment(exchange=identifier[0],
+                            sandbox=identifier[1] == 'True',
+                            symbol=identifier[2],
+                            # Cast to float first before
+                            epoch_start=int(float(identifier[3])),
+                            epoch_stop=int(float(identifier[4])),
+                            resolution=int(float(identifier[5])),
+                            file_name=file_name)
+    except (IndexError, ValueError):
+        return None
+
+
+def temporary_path(path: str) -> str:
+    """
+    A unique name to write a file to before moving it into place at path, so that processes sharing a cache folder
+    never write to the same temporary file
+    """
+    return f'{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp'
+
+
+@contextlib.contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive lock on the file at path, creating it if needed. This blocks until any other process holding it
+    lets go.
+    """
+    with open(path, 'a+') as file:
+        if os.name == 'nt':
+            import msvcrt
+            file.seek(0)
+            # This retries for 10 seconds before raising
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class CompactionResult(typing.NamedTuple):
+    segments_merged: int
+    segments_written: int
+    bytes_reclaimed: int
+
+
+class CacheManifest:
+    """
+    On-disk index of the segments in a cache folder so that a backtest doesn't need to list and parse every file in
+    the folder on start-up. Segments are grouped by exchange/sandbox/symbol/resolution and kept sorted by start time:
+    {
+        'version': 1,
+        'segments': {
+            'coinbase_pro,True,BTC-USD,60': [[1622400000, 1622510793, 'coinbase_pro,True,BTC-USD,...,60.csv'], ...]
+        }
+    }
+    """
+    file_name = 'manifest.json'
+    # Held while the manifest is written, by every process using the cache folder
+    lock_name = 'manifest.lock'
+    version = 1
+
+    def __init__(self, segments: typing.Iterable[CacheSegment] = ()):
+        self.__segments: typing.Dict[tuple, typing.List[CacheSegment]] = {}
+        # Per key, the start times and the running maximum of the stop times. Both are non-decreasing so overlapping
+        #  segments can be found with two binary searches
+        self.__starts: typing.Dict[tuple, typing.List[int]] = {}
+        self.__max_stops: typing.Dict[tuple, typing.List[int]] = {}
+        # The changes made since the manifest was last read or saved, which save() applies on top of the manifest on
+        #  disk so that entries written by other processes in the meantime aren't lost
+        self.__added: typing.Dict[str, CacheSegment] = {}
+        self.__removed: typing.Set[str] = set()
+        for segment in segments:
+            self.__insert(segment)
+
+    def add(self, segment: CacheSegment):
+        self.__insert(segment)
+        self.__added[segment.file_name] = segment
+        self.__removed.discard(segment.file_name)
+
+    def __insert(self, segment: CacheSegment):
+        segments = self.__segments.setdefault(segment.key, [])
+        # Replace any entry for the same file
+        if any(existing.file_name == segment.file_name for existing in segments):
+            self.__delete(segment.file_name, segment.key)
+            segments = self.__segments.setdefault(segment.key, [])
+        index = bisect.bisect_right(self.__starts.get(segment.key, []), segment.epoch_start)
+        segments.insert(index, segment)
+        self.__reindex(segment.key)
+
+    def remove(self, file_name: str, key: tuple = None):
+        self.__delete(file_name, key)
+        self.__added.pop(file_name, None)
+        self.__removed.add(file_name)
+
+    def __delete(self, file_name: str, key: tuple = None):
+        keys = [key] if key is not None else list(self.__segments.keys())
+        for key_ in keys:
+            segments = [segment for segment in self.__segments.get(key_, []) if segment.file_name != file_name]
+            if segments:
+                self.__segments[key_] = segments
+                self.__reindex(key_)
+            elif key_ in self.__segments:
+                del self.__segments[key_], self.__starts[key_], self.__max_stops[key_]
+
+    def __reindex(self, key: tuple):
+        segments = self.__segments[key]
+        self.__starts[key] = [segment.epoch_start for segment in segments]
+        self.__max_stops[key] = list(itertools.accumulate((segment.epoch_stop for segment in segments), max))
+
+    def overlapping(self, key: tuple, epoch_start: [int, float], epoch_stop: [int, float]) -> typing.List[CacheSegment]:
+        """
+        Find the segments for a key which intersect [epoch_start, epoch_stop] in O(log n + k)
+        """
+        if key not in self.__segments:
+            return []
+        # Everything at or after this index starts after the requested window ends
+        upper = bisect.bisect_right(self.__starts[key], epoch_stop)
+        # Everything before this index ends before the requested window starts
+        lower = bisect.bisect_left(self.__max_stops[key], epoch_start, 0, upper)
+        return [segment for segment in self.__segments[key][lower:upper] if segment.epoch_stop >= epoch_start]
+
+    def segments(self) -> typing.List[CacheSegment]:
+        return [segment for segments in self.__segments.values() for segment in segments]
+
+    def __len__(self) -> int:
+        return sum(len(segments) for segments in self.__segments.values())
+
+    @staticmethod
+    def __key_string(key: tuple) -> str:
+        exchange, sandbox, symbol, resolution = key
+        return f'{exchange},{sandbox},{symbol},{resolution}'
+
+    def to_dict(self) -> dict:
+        return {
+            'version': self.version,
+            'segments': {self.__key_string(key): [[segment.epoch_start, segment.epoch_stop, segment.file_name]
+                                                  for segment in segments]
+                         for key, segments in self.__segments.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CacheManifest':
+        if data.get('version') != cls.version:
+            raise ValueError(f"Unsupported cache manifest version {data.get('version')}.")
+        segments = []
+        for key_string, entries in data['segments'].items():
+            exchange, sandbox, symbol, resolution = key_string.split(',')
+            for epoch_start, epoch_stop, file_name in entries:
+                segments.append(CacheSegment(exchange=exchange,
+                                             sandbox=sandbox == 'True',
+                                             symbol=symbol,
+                                             epoch_start=int(epoch_start),
+                                             epoch_stop=int(epoch_stop),
+                                             resolution=int(resolution),
+                                             file_name=file_name))
+        return cls(segments)
+
+    @classmethod
+    def load(cls, path: str) -> typing.Optional['CacheManifest']:
+        """
+        Read a manifest from disk. Returns None if it doesn't exist or can't be understood, in which case it should
+        be rebuilt from the folder contents.
+        """
+        try:
+            with open(path) as file:
+                return cls.from_dict(json.load(file))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path: str, merge: bool = True):
+        """
+        Write the manifest to disk. Other processes can share the cache folder, so by default this takes the lock, reads
+        the manifest on disk again and writes that with this manifest's changes applied, which this manifest then
+        becomes.
+
+        Args:
+            path: The path of the manifest file
+            merge: Set to False to replace the manifest on disk with this one, such as after re-indexing the folder
+        """
+        with file_lock(os.path.join(os.path.dirname(path), self.lock_name)):
+            on_disk = CacheManifest.load(path) if merge else None
+            if on_disk is not None:
+                changed = self.__removed | self.__added.keys()
+                segments = [segment for segment in on_disk.segments() if segment.file_name not in changed]
+                self.__segments, self.__starts, self.__max_stops = {}, {}, {}
+                for segment in itertools.chain(segments, self.__added.values()):
+                    self.__insert(segment)
+
+            writing = temporary_path(path)
+            with open(writing, 'w') as file:
+                json.dump(self.to_dict(), file)
+            os.replace(writing, path)
+        self.__added.clear()
+        self.__removed.clear()
+
+
+class PriceCacheBackend(abc.ABC):
+    # The file extension written by this backend
+    extension: str = None
+
+    def __init__(self, cache_folder: str):
+        self.cache_folder = cache_folder
+        self.__manifest = None
+
+    def path(self, file_name: str) -> str:
+        return os.path.join(self.cache_folder, file_name)
+
+    def segment_name(self, exchange: str, sandbox: bool, symbol: str, epoch_start: [int, float],
+                     epoch_stop: [int, float], resolution: int) -> str:
+        return segment_name(exchange, sandbox, symbol, epoch_start, epoch_stop, resolution, self.extension)
+
+    def list_segments(self, extensions: tuple = None) -> typing.List[CacheSegment]:
+        """
+        Find every cached segment in the cache folder by listing it, creating the folder if it doesn't exist. This
+        scales with the number of files, use the manifest for lookups.
+
+        Args:
+            extensions: The file extensions to consider, defaults to the ones this backend can read
+        """
+        if extensions is None:
+            extensions = self.readable_extensions()
+
+        try:
+            files = os.listdir(self.cache_folder)
+        except FileNotFoundError:
+            files = []
+            os.makedirs(self.cache_folder)
+
+        segments = []
+        for file_name in files:
+            if os.path.splitext(file_name)[1][1:] not in extensions:
+                continue
+            segment = parse_segment_name(file_name)
+            if segment is None:
+                # Remove each of the failed cache objects
+                os.remove(self.path(file_name))
+            else:
+                segments.append(segment)
+
+        return segments
+
+    def readable_extensions(self) -> tuple:
+        return self.extension,
+
+    def write_segment(self, df: pd.DataFrame, file_name: str):
+        """
+        Write a dataframe to the cache. This is written to a temporary file first and then moved into place so that
+        an interrupted write never leaves a partial segment behind.
+        """
+        # Loading the manifest also creates the cache folder if needed
+        manifest = self.manifest
+        self.__write_file(df, file_name)
+
+        segment = parse_segment_name(file_name)
+        if segment is not None:
+            manifest.add(segment)
+            self.save_manifest()
+
+    def __write_file(self, df: pd.DataFrame, file_name: str):
+        path = self.path(file_name)
+        writing = temporary_path(path)
+        self._write(df, writing)
+        os.replace(writing, path)
+
+    def remove_segment(self, file_name: str):
+        try:
+            os.remove(self.path(file_name))
+        except FileNotFoundError:
+            pass
+        self.manifest.remove(file_name)
+        self.save_manifest()
+
+    @property
+    def manifest(self) -> CacheManifest:
+        """
+        The index of the cache folder, loaded from disk on first use and rebuilt if it is missing or corrupt
+        """
+        if self.__manifest is None:
+            self.__manifest = CacheManifest.load(self.path(CacheManifest.file_name))
+            if self.__manifest is None:
+                self.rebuild_manifest()
+        return self.__manifest
+
+    def save_manifest(self):
+        self.manifest.save(self.path(CacheManifest.file_name))
+
+    def rebuild_manifest(self) -> CacheManifest:
+        """
+        Re-index the cache folder from its contents. Segments of every format are indexed so that the manifest can be
+        shared between backends.
+        """
+        self.__manifest = CacheManifest(self.list_segments(tuple(cache_backends.keys())))
+        self.manifest.save(self.path(CacheManifest.file_name), merge=False)
+        return self.__manifest
+
+    def verify_manifest(self) -> typing.Tuple[typing.List[str], typing.List[str]]:
+        """
+        Compare the manifest against the cache folder
+
+        Returns:
+            A tuple of (file names in the manifest that no longer exist, file names on disk missing from the manifest)
+        """
+        indexed = {segment.file_name for segment in self.manifest.segments()}
+        on_disk = {segment.file_name for segment in self.list_segments(tuple(cache_backends.keys()))}
+        return sorted(indexed - on_disk), sorted(on_disk - indexed)
+
+    def find_segments(self, exchange: str, sandbox: bool, symbol: str, resolution: int, epoch_start: [int, float],
+                      epoch_stop: [int, float]) -> typing.List[CacheSegment]:
+        """
+        Find the readable segments which overlap [epoch_start, epoch_stop]. Entries whose files were deleted outside
+        of blankly are dropped from the manifest.
+
+        If nothing is found, the folder is checked for segments missing from the manifest before giving up, such as
+        ones written by a process which stopped before indexing them.
+        """
+        key = (exchange, sandbox, symbol, int(resolution))
+        if not self.manifest.overlapping(key, epoch_start, epoch_stop):
+            self.__index_unlisted()
+
+        segments = []
+        pruned = False
+        for segment in self.manifest.overlapping(key, epoch_start, epoch_stop):
+            if os.path.splitext(segment.file_name)[1][1:] not in self.readable_extensions():
+                continue
+            if not os.path.exists(self.path(segment.file_name)):
+                self.manifest.remove(segment.file_name, segment.key)
+                pruned = True
+                continue
+            segments.append(self._prepare_segment(segment))
+
+        if pruned:
+            self.save_manifest()
+        return segments
+
+    def __index_unlisted(self):
+        """
+        Add any segments in the folder that the manifest is missing
+        """
+        indexed = {segment.file_name for segment in self.manifest.segments()}
+        unlisted = [segment for segment in self.list_segments(tuple(cache_backends.keys()))
+                    if segment.file_name not in indexed]
+        for segment in unlisted:
+            self.manifest.add(segment)
+        if unlisted:
+            self.save_manifest()
+
+    def _prepare_segment(self, segment: CacheSegment) -> CacheSegment:
+        """
+        Hook for backends to convert a segment before it is read
+        """
+        return segment
+
+    def compact(self, keys: typing.Iterable[tuple] = None) -> CompactionResult:
+        """
+        Merge every run of overlapping or touching segments into a single deduplicated, time sorted segment. Only
+        contiguous runs are merged, so the range covered by the cache is unchanged.
+
+        The merged segment is written and indexed before the originals are deleted, so an interruption at any point
+        leaves every cached price readable.
+
+        Args:
+            keys: The (exchange, sandbox, symbol, resolution) keys to compact, defaults to every key in the cache
+        """
+        if keys is None:
+            keys = {segment.key for segment in self.manifest.segments()}
+
+        segments_merged = 0
+        segments_written = 0
+        bytes_reclaimed = 0
+        for key in keys:
+            for run in self.__contiguous_runs(key):
+                exchange, sandbox, symbol, resolution = key
+                file_name = self.segment_name(exchange, sandbox, symbol, run[0].epoch_start,
+                                              max(segment.epoch_stop for segment in run), resolution)
+
+                merged = pd.concat([self.read_segment(segment.file_name) for segment in run], ignore_index=True)
+                # Later downloads win if the same bar was cached more than once
+                merged = merged.drop_duplicates(subset=['time'], keep='last').sort_values(by=['time'],
+                                                                                          ignore_index=True)
+
+                original_size = sum(os.path.getsize(self.path(segment.file_name)) for segment in run)
+                self.__write_file(merged, file_name)
+
+                # Swap the index over in a single write and only then remove the original files
+                for segment in run:
+                    self.manifest.remove(segment.file_name, key)
+                self.manifest.add(parse_segment_name(file_name))
+                self.save_manifest()
+                for segment in run:
+                    if segment.file_name != file_name:
+                        os.remove(self.path(segment.file_name))
+
+                segments_merged += len(run)
+                segments_written += 1
+                bytes_reclaimed += original_size - os.path.getsize(self.path(file_name))
+
+        return CompactionResult(segments_merged, segments_written, bytes_reclaimed)
+
+    def __contiguous_runs(self, key: tuple) -> typing.List[typing.List[CacheSegment]]:
+        """
+        Group the readable segments for a key into runs where each segment starts before the previous ones stop.
+        Runs of a single segment have nothing to merge and are skipped.
+        """
+        exchange, sandbox, symbol, resolution = key
+        segments = self.find_segments(exchange, sandbox, symbol, resolution, -math.inf, math.inf)
+
+        runs = []
+        run = []
+        run_stop = None
+        for segment in segments:
+            if run and segment.epoch_start > run_stop:
+                runs.append(run)
+                run = []
+            if not run:
+                run_stop = segment.epoch_stop
+            run.append(segment)
+            run_stop = max(run_stop, segment.epoch_stop)
+        runs.append(run)
+
+        return [run for run in runs if len(run) > 1]
+
+    def read_segment(self, file_name: str, epoch_start: [int, float] = None,
+                     epoch_stop: [int, float] = None) -> pd.DataFrame:
+        """
+        Read a cached segment, optionally limited to rows with epoch_start <= time <= epoch_stop
+        """
+        return self._read(self.path(file_name), epoch_start, epoch_stop)
+
+    @abc.abstractmethod
+    def _write(self, df: pd.DataFrame, path: str):
+        pass
+
+    @abc.abstractmethod
+    def _read(self, path: str, epoch_start: [int, float, None], epoch_stop: [int, float, None]) -> pd.DataFrame:
+        pass
+
+
+class CsvCacheBackend(PriceCacheBackend):
+    extension = 'csv'
+
+    def _write(self, df: pd.DataFrame, path: str):
+        df.to_csv(path, index=False)
+
+    def _read(self, path: str, epoch_start: [int, float, None], epoch_stop: [int, float, None]) -> pd.DataFrame:
+        # CSV has no way to skip rows by value, the controller trims to the requested window afterwards
+        return pd.read_csv(path)
+
+
+class ParquetCacheBackend(PriceCacheBackend):
+    extension = 'parquet'
+
+    def __init__(self, cache_folder: str):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Pyarrow not installed. Run 'pip install pyarrow' to use the parquet price cache or set "
+                              "\"cache_format\" to \"csv\" in backtest.json.")
+        super().__init__(cache_folder)
+        self.__csv = CsvCacheBackend(cache_folder)
+
+    def readable_extensions(self) -> tuple:
+        return self.extension, CsvCacheBackend.extension
+
+    def _prepare_segment(self, segment: CacheSegment) -> CacheSegment:
+        # Transparently move any csv segments written by earlier versions over to parquet
+        if not segment.file_name.endswith('.' + CsvCacheBackend.extension):
+            return segment
+
+        file_name = self.segment_name(segment.exchange, segment.sandbox, segment.symbol, segment.epoch_start,
+                                      segment.epoch_stop, segment.resolution)
+        info_print(f"Migrating {segment.file_name} to the parquet price cache.")
+        self.write_segment(self.__csv.read_segment(segment.file_name), file_name)
+        self.remove_segment(segment.file_name)
+        return segment._replace(file_name=file_name)
+
+    def _write(self, df: pd.DataFrame, path: str):
+        df.to_parquet(path, engine='pyarrow', index=False)
+
+    def _read(self, path: str, epoch_start: [int, float, None], epoch_stop: [int, float, None]) -> pd.DataFrame:
+        filters = []
+        if epoch_start is not None:
+            filters.append(('time', '>=', epoch_start))
+        if epoch_stop is not None:
+            filters.append(('time', '<=', epoch_stop))
+
+        # Only row groups that overlap the requested time window are read off disk
+        return pd.read_parquet(path, engine='pyarrow', filters=filters if filters else None)
+
+
+cache_backends = {
+    CsvCacheBackend.extension: CsvCacheBackend,
+    ParquetCacheBackend.extension: ParquetCacheBackend
+}
+
+
+def create_cache_backend(cache_format: str, cache_folder: str) -> PriceCacheBackend:
+    try:
+        return cache_backends[cache_format](cache_folder)
+    except KeyError:
+        raise ValueError(f"Unknown cache_format \"{cache_format}\", expected one of {list(cache_backends.keys())}.")
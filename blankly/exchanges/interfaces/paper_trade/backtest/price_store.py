@@ -0,0 +1,193 @@
+"""
+    Columnar price storage shared by the backtest controller, paper trade interface & results
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import typing
+
+import numpy as np
+import pandas as pd
+
+
+def _to_column(series: pd.Series) -> np.ndarray:
+    """
+    Convert a dataframe column into a contiguous typed array. Integer columns (such as epoch times) stay int64,
+    any other numeric column becomes float64.
+    """
+    if pd.api.types.is_integer_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        return np.ascontiguousarray(series.to_numpy(dtype=np.int64))
+    elif pd.api.types.is_numeric_dtype(series.dtype):
+        return np.ascontiguousarray(series.to_numpy(dtype=np.float64))
+    return series.to_numpy()
+
+
+class SymbolPrices:
+    """
+    The price history of a single symbol stored as one contiguous array per field.
+
+    Indexing by field name returns the whole column, so a single price is read with
+    prices['close'][index] rather than building a record for every row.
+    """
+    __slots__ = ('__columns', '__length')
+
+    def __init__(self, columns: typing.Dict[str, np.ndarray]):
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"All price columns must be the same length, got lengths {lengths}.")
+
+        self.__columns = columns
+        self.__length = lengths.pop() if len(lengths) == 1 else 0
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'SymbolPrices':
+        # Drop any index columns that were written into csv caches
+        return cls({str(column): _to_column(df[column]) for column in df.columns if column != 'index'})
+
+    @property
+    def columns(self) -> list:
+        return list(self.__columns.keys())
+
+    @property
+    def empty(self) -> bool:
+        return self.__length == 0
+
+    def column(self, field: str) -> np.ndarray:
+        return self.__columns[field]
+
+    def slice(self, start: int, stop: int) -> 'SymbolPrices':
+        """
+        Create a new set of prices which references (does not copy) rows [start, stop) of this one
+        """
+        return SymbolPrices({field: column[start:stop] for field, column in self.__columns.items()})
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.__columns, copy=False)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.__columns[field]
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.__columns
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __repr__(self):
+        return f"SymbolPrices(rows={self.__length}, columns={self.columns})"
+
+
+class PriceStore:
+    """
+    Columnar price storage for every symbol in a backtest:
+    {
+        'BTC-USD': SymbolPrices(time=[...], open=[...], high=[...], low=[...], close=[...], volume=[...])
+    }
+    """
+    def __init__(self, prices: typing.Dict[str, SymbolPrices] = None):
+        if prices is None:
+            prices = {}
+        self.__prices = prices
+
+    @classmethod
+    def from_dataframes(cls, dataframes: typing.Dict[str, pd.DataFrame]) -> 'PriceStore':
+        return cls({symbol: SymbolPrices.from_dataframe(df) for symbol, df in dataframes.items()})
+
+    def add(self, symbol: str, prices: [SymbolPrices, pd.DataFrame]):
+        if isinstance(prices, pd.DataFrame):
+            prices = SymbolPrices.from_dataframe(prices)
+        self.__prices[symbol] = prices
+
+    def column(self, symbol: str, field: str) -> np.ndarray:
+        return self.__prices[symbol][field]
+
+    def window(self, start: [int, float], stop: [int, float]) -> 'PriceStore':
+        """
+        Create a new store which references (does not copy) the rows of every symbol with start <= time <= stop
+        """
+        windowed = {}
+        for symbol, prices in self.__prices.items():
+            times = prices['time']
+            windowed[symbol] = prices.slice(int(np.searchsorted(times, start, side='left')),
+                                            int(np.searchsorted(times, stop, side='right')))
+        return PriceStore(windowed)
+
+    def keys(self):
+        return self.__prices.keys()
+
+    def items(self):
+        return self.__prices.items()
+
+    def values(self):
+        return self.__prices.values()
+
+    def __getitem__(self, symbol: str) -> SymbolPrices:
+        return self.__prices[symbol]
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.__prices
+
+    def __iter__(self):
+        return iter(self.__prices)
+
+    def __len__(self) -> int:
+        return len(self.__prices)
+
+    def __repr__(self):
+        return f"PriceStore({self.__prices})"
+
+
+class PriceCursor:
+    """
+    Forward-only position in a sorted time column.
+
+    Advancing jumps directly to the first row at or after the requested time using a binary search, so stepping a
+    fine resolution dataset with a coarse event costs O(log n) rather than one comparison per skipped row.
+    """
+    __slots__ = ('times', 'index', 'has_data', '__last_index')
+
+    def __init__(self, times: np.ndarray, index: int = 0):
+        self.times = times
+        self.index = index
+        self.has_data = len(times) > 0
+        self.__last_index = len(times) - 1
+
+    def advance(self, time: [int, float]) -> int:
+        """
+        Move to the first row with a time greater than or equal to the given time. If every remaining row is earlier
+        than the requested time, the cursor stays on the final row and has_data becomes False.
+
+        Args:
+            time: The epoch time to move the cursor up to
+        Returns:
+            The new row index
+        """
+        times = self.times
+        index = self.index
+        if times[index] >= time:
+            return index
+
+        last_index = self.__last_index
+        if index < last_index and times[index + 1] >= time:
+            # This is by far the most common step when events run at the data resolution
+            index += 1
+        else:
+            index += int(np.searchsorted(times[index:], time, side='left'))
+            if index > last_index:
+                index = last_index
+                self.has_data = False
+
+        self.index = index
+        return index
@@ -0,0 +1,174 @@
+"""
+    Per-phase timing & sampling profiler for backtests
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+import typing
+
+import pandas as pd
+
+# Phases inside the run are recorded as run/<name>
+RUN_PHASE = 'run'
+
+
+class StackSampler:
+    """
+    Low overhead statistical profiler. A background thread looks at the stack of the profiled thread every interval
+    and counts the functions it finds, so the profiled code runs at full speed between samples.
+    """
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        # Samples where the function was running itself & where it was anywhere on the stack
+        self.own_counts = collections.Counter()
+        self.total_counts = collections.Counter()
+
+        self.__thread_id = None
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    @staticmethod
+    def __label(code) -> str:
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def __sample(self):
+        while not self.__stop.wait(self.interval):
+            frame = sys._current_frames().get(self.__thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own_counts[self.__label(frame.f_code)] += 1
+
+            seen = set()
+            while frame is not None:
+                label = self.__label(frame.f_code)
+                if label not in seen:
+                    seen.add(label)
+                    self.total_counts[label] += 1
+                frame = frame.f_back
+
+    def start(self, thread_id: int = None):
+        """
+        Begin sampling a thread, defaults to the calling thread
+        """
+        self.__thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__sample, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        if self.__thread is not None:
+            self.__stop.set()
+            self.__thread.join()
+            self.__thread = None
+
+    def report(self, top: int = 20) -> pd.DataFrame:
+        """
+        The functions seen in the most samples, with the percent of samples where they were running (own) & where they
+        were on the stack (total)
+        """
+        rows = [{
+            'function': label,
+            'own_percent': 100 * self.own_counts[label] / self.samples,
+            'total_percent': 100 * count / self.samples
+        } for label, count in self.total_counts.most_common(top)] if self.samples else []
+        return pd.DataFrame(rows, columns=['function', 'own_percent', 'total_percent'])
+
+
+class BacktestProfiler:
+    """
+    Wall time & call counts for each phase of a backtest.
+
+    The setup & reporting phases are always recorded. The phases that run on every step of the backtest, such as limit
+    evaluation, account valuation & each user callback, are only recorded when detailed is enabled.
+    """
+    def __init__(self, detailed: bool = False, sample_interval: typing.Optional[float] = None):
+        self.detailed = detailed
+        self.__totals: typing.Dict[str, float] = {}
+        self.__calls: typing.Dict[str, int] = {}
+        self.sampler = StackSampler(sample_interval) if detailed and sample_interval else None
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        try:
+            self.__totals[name] += seconds
+            self.__calls[name] += calls
+        except KeyError:
+            self.__totals[name] = seconds
+            self.__calls[name] = calls
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def run(self):
+        """
+        Time the run of the model, sampling its stack when there is a sampler
+        """
+        if self.sampler is not None:
+            self.sampler.start()
+        try:
+            with self.phase(RUN_PHASE):
+                yield
+        finally:
+            if self.sampler is not None:
+                self.sampler.stop()
+
+    @property
+    def total(self) -> float:
+        return sum(seconds for name, seconds in self.__totals.items() if '/' not in name)
+
+    def report(self) -> pd.DataFrame:
+        """
+        A row for each phase with the number of calls, total & mean seconds and percent of the whole backtest
+        """
+        totals = dict(self.__totals)
+        calls = dict(self.__calls)
+
+        # Whatever the phases inside the run don't account for is the framework itself
+        inner = [name for name in totals if name.startswith(RUN_PHASE + '/')]
+        if inner and RUN_PHASE in totals:
+            name = RUN_PHASE + '/other'
+            totals[name] = max(totals[RUN_PHASE] - sum(totals[phase] for phase in inner), 0)
+            calls[name] = calls[RUN_PHASE]
+
+        total = self.total
+        report = pd.DataFrame({
+            'calls': pd.Series(calls, dtype='int64'),
+            'total_seconds': pd.Series(totals, dtype='float64')
+        }, index=list(totals.keys()))
+        report['mean_seconds'] = report['total_seconds'] / report['calls']
+        report['percent'] = 100 * report['total_seconds'] / total if total > 0 else 0.0
+        report.index.name = 'phase'
+        return report
+
+    def __str__(self):
+        lines = [f"Backtest profile ({self.total:.3f}s)", self.report().to_string(float_format=lambda x: f'{x:.4f}')]
+        if self.sampler is not None and self.sampler.samples:
+            lines.append(f"\nMost sampled functions ({self.sampler.samples} samples every "
+                         f"{self.sampler.interval * 1000:g}ms)")
+            lines.append(self.sampler.report().to_string(index=False, float_format=lambda x: f'{x:.1f}'))
+        return '\n'.join(lines)
@@ -0,0 +1,80 @@
+"""
+    Array-at-once fill and position simulation for signal based backtests
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import typing
+
+import numpy as np
+
+
+class PositionSimulation(typing.NamedTuple):
+    # Base asset held after the trade on each row
+    base: np.ndarray
+    # Running change to the quote balance caused by the trades up to and including each row
+    quote_delta: np.ndarray
+    # Signed base size ordered on each row, positive for buys and negative for sells
+    orders: np.ndarray
+
+
+def forward_fill(targets: np.ndarray, initial: float) -> np.ndarray:
+    """
+    Replace NaN targets with the previous target, NaNs before the first target hold the initial position
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    missing = np.isnan(targets)
+    if not missing.any():
+        return targets
+
+    last_valid = np.maximum.accumulate(np.where(missing, -1, np.arange(len(targets))))
+    return np.where(last_valid >= 0, targets[np.maximum(last_valid, 0)], initial)
+
+
+def align_rows(times: np.ndarray, timeline: np.ndarray) -> np.ndarray:
+    """
+    Find the row used at each time on the timeline. This matches PriceCursor: the first row at or after the time,
+    or the final row once the data runs out.
+    """
+    return np.minimum(np.searchsorted(times, timeline, side='left'), len(times) - 1)
+
+
+def simulate_positions(prices: np.ndarray, targets: np.ndarray, initial_base: float,
+                       fee_rate: float) -> PositionSimulation:
+    """
+    Trade to a target position on every row with market orders filled at that row's price.
+
+    Fees are charged the same way as paper trade market orders: buys receive their size less the fee and sells
+    receive their value less the fee. Buys are sized up to cover the fee so that the position after every row is
+    exactly the target, which keeps each order independent of how the previous ones were filled.
+
+    Args:
+        prices: The fill price on each row
+        targets: The desired base position on each row. NaN keeps the previous target.
+        initial_base: The base asset held before the first row
+        fee_rate: The taker fee rate such as 0.001
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    base = forward_fill(targets, initial_base)
+    if len(prices) != len(base):
+        raise ValueError(f"Got {len(base)} targets for {len(prices)} prices.")
+
+    change = np.diff(base, prepend=initial_base)
+    orders = np.where(change > 0, change / (1 - fee_rate), change)
+
+    # Rows without an order can't be poisoned by a missing price
+    quote_change = np.where(change > 0, -orders * prices, -orders * prices * (1 - fee_rate))
+    quote_delta = np.cumsum(np.where(change != 0, quote_change, 0))
+    return PositionSimulation(base, quote_delta, orders)
@@ -17,32 +17,34 @@
 """
 
 import json
-import os
 import time
 import traceback
 import typing
 from datetime import datetime as dt
 import copy
 import enum
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import blankly
 
 import numpy as np
 import pandas as pd
 import requests
-from bokeh.layouts import column as bokeh_columns
-from bokeh.models import HoverTool
-from bokeh.palettes import Category10_10
-from bokeh.plotting import ColumnDataSource, figure, show
 
 import blankly.exchanges.interfaces.paper_trade.metrics as metrics
 from blankly.exchanges.interfaces.paper_trade.backtest_result import BacktestResult
 from blankly.exchanges.interfaces.paper_trade.futures.futures_paper_trade_interface import FuturesPaperTradeInterface
 from blankly.exchanges.interfaces.paper_trade.paper_trade_interface import PaperTradeInterface
+import blankly.exchanges.interfaces.paper_trade.utils as paper_trade_utils
 from blankly.utils.time_builder import time_interval_to_seconds
 from blankly.utils.utils import load_backtest_preferences, write_backtest_preferences, info_print, update_progress, \
-    get_base_asset, get_quote_asset, aggregate_prices_by_resolution
+    get_base_asset, get_quote_asset, aggregate_prices_by_resolution, silence_progress
 from blankly.exchanges.interfaces.paper_trade.backtest.format_platform_result import \
     format_platform_result
+from blankly.exchanges.interfaces.paper_trade.backtest.account_ledger import AccountLedger
+from blankly.exchanges.interfaces.paper_trade.backtest.profiler import BacktestProfiler
+from blankly.exchanges.interfaces.paper_trade.backtest.price_store import PriceStore, PriceCursor, SymbolPrices
+from blankly.exchanges.interfaces.paper_trade.backtest.vectorized import align_rows, simulate_positions
+from blankly.exchanges.interfaces.paper_trade.backtest.price_cache import create_cache_backend
 
 from blankly.exchanges.interfaces.paper_trade.abc_backtest_controller import ABCBacktestController
 from blankly.exchanges.exchange import ABCExchange
@@ -160,11 +162,15 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         self.initial_time = None
         self.model = model
 
-        self.traded_account_values = []
-        self.no_trade_account_values = []
+        # Wall time spent in each phase of the most recent backtest
+        self.profiler = BacktestProfiler()
 
-        # Prices sorted by symbol and then records of prices
-        self.prices = {}
+        # The holdings & value of the account at each valuation, filled in place as the backtest runs
+        self.traded_account_values = AccountLedger()
+        self.no_trade_account_values = AccountLedger()
+
+        # Columnar prices sorted by symbol and then by field
+        self.prices = PriceStore()
         # A list of events sorted by time. All events are put into this single list
         self.events = []
 
@@ -173,6 +179,9 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
 
         # Open, high, low, close or volume
         self.use_price = None
+        # The order the high & low of a bar are assumed to be reached in, or None when orders are only filled at the
+        #  use_price
+        self.__intrabar_path = None
 
         # Should we write to the preferences?
         self.queue_backtest_write = False
@@ -181,8 +190,9 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         self.quote_currency = None
 
         # Create a global generator because a second yield function gets really nasty
-        # This is used for the colors of the graphs
-        self.__color_generator = Category10_10.__iter__()
+        # This is used for the colors of the graphs, it's created when the first graph is drawn so that bokeh is
+        #  only imported when the GUI is used
+        self.__color_generator = None
 
         # Some initial account value to store globally
         self.initial_account = None
@@ -203,14 +213,22 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         self.show_progress = False
         self.sleep_count = 0
 
-        # Use this global to retain where we are in the prices dictionary by index
-        self.price_indexes = {}
+        # Use this global to retain where we are in the prices for each symbol
+        self.price_cursors: typing.Dict[str, PriceCursor] = {}
         # Use this to keep trace globally of the event index we're using
         self.event_index = 0
 
         # Custom injected price readers and events readers
         self.__price_readers = []
         self.__event_readers = []
+        # Funding rate events are created for each run of a futures backtest
+        self.__funding_rate_readers = []
+
+        # Prices that were synced ahead of time and are reused by every following run, see preload_prices()
+        self.__preloaded_prices = None
+        self.__preloaded_range = None
+        # Part of the preloaded prices to run over, see set_backtest_window()
+        self.__window = None
         self.__tick_readers = []
 
     class PriceIdentifiers(enum.Enum):
@@ -233,7 +251,7 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         ]
         """
         # TODO some code duplication here for the different events
-        for reader in self.__event_readers:
+        for reader in self.__event_readers + self.__funding_rate_readers:
             # Get the data as dict of dataframes
             data = reader.data
             for event_type in data:
@@ -272,7 +290,67 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         # Now we just need to sort by time
         self.events = sorted(self.events, key=lambda d: d['time'])
 
-    def sync_prices(self) -> dict:
+    def __download_ranges(self, cache, exchange: str, download_keys: list) -> dict:
+        """
+        Download the missing ranges over a bounded thread pool. Requests are throttled by the exchange's shared rate
+        limiter and each range is written to the cache as soon as it arrives.
+
+        Args:
+            cache: The price cache backend to write into
+            exchange: The exchange type, used to name the cache segments
+            download_keys: List of (symbol, resolution, epoch_start, epoch_stop) to download
+        Returns:
+            Dictionary of download_key: DataFrame
+        """
+        downloads = {}
+        if len(download_keys) == 0:
+            return downloads
+
+        def write(download_key, download):
+            symbol, resolution, epoch_start, epoch_stop = download_key
+            # Write the file but this time include very accurately the start and end times
+            if self.preferences['settings']['continuous_caching'] and not download.empty:
+                cache.write_segment(download, cache.segment_name(exchange, True, symbol, epoch_start,
+                                                                 # This adds resolution back to the exported
+                                                                 #  time series
+                                                                 int(epoch_stop) + resolution,
+                                                                 resolution))
+            downloads[download_key] = download
+
+        threads = min(max(int(self.preferences['settings']['download_threads']), 1), len(download_keys))
+        if threads == 1:
+            for download_key in download_keys:
+                write(download_key, self.interface.get_product_history(*self.__history_arguments(download_key)))
+            return downloads
+
+        def download(download_key):
+            # The exchanges report the progress of each download, which would interleave between the threads
+            with silence_progress():
+                return self.interface.get_product_history(*self.__history_arguments(download_key))
+
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='blankly_download') as executor:
+            futures = {executor.submit(download, download_key): download_key for download_key in download_keys}
+            try:
+                # Cache writes & progress all happen on this thread, so the cache index is never written concurrently
+                #  and there is a single progress bar for the downloads
+                update_progress(0)
+                for completed, future in enumerate(as_completed(futures), 1):
+                    write(futures[future], future.result())
+                    update_progress(completed / len(futures))
+            except BaseException:
+                # Don't start anything new if a download failed
+                for future in futures:
+                    future.cancel()
+                raise
+
+        return downloads
+
+    @staticmethod
+    def __history_arguments(download_key: tuple) -> tuple:
+        symbol, resolution, epoch_start, epoch_stop = download_key
+        return symbol, epoch_start, epoch_stop, resolution
+
+    def sync_prices(self) -> PriceStore:
         """
         Parse the local file cache for the requested data, if it doesn't exist, request it from the exchange
 
@@ -280,11 +358,23 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
             items: list of lists organized as ['symbol', 'start_time', 'end_time', 'resolution']
 
         returns:
-            dictionary with keys for each 'symbol'
+            PriceStore with keys for each 'symbol'
         """
 
+        if self.__preloaded_prices is not None:
+            price_store, prices_by_resolution = self.__preloaded_prices
+            if self.__window is not None:
+                self.user_start, self.user_stop = self.__window
+                price_store = price_store.window(*self.__window)
+            else:
+                self.user_start, self.user_stop = self.__preloaded_range
+            # The price cache used by history() isn't windowed, so lookbacks can reach before the window starts
+            self.interface.receive_price_cache(prices_by_resolution)
+            return price_store
+
         # Make sure the cache folder exists and read files
         cache_folder = self.preferences['settings']["cache_location"]
+        cache = create_cache_backend(self.preferences['settings']['cache_format'], cache_folder)
 
         def sort_prices_by_resolution(price_dict):
             for symbol_ in price_dict:
@@ -294,87 +384,12 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
 
             return price_dict
 
-        def parse_identifiers() -> list:
-            try:
-                files = os.listdir(cache_folder)
-            except FileNotFoundError:
-                files = []
-                os.mkdir(cache_folder)
-
-            identifiers_ = []
-            for file in range(len(files)):
-                # example file name: 'coinbase_pro.sandbox.BTC-USD.1622400000.1622510793.60.csv'
-                # Remove the .csv from each of the files: BTC-USD.1622400000.1622510793.60
-                identifier = files[file][:-4].split(",")
-                # Cast to float first before
-                try:
-                    identifiers_.append({
-                        self.PriceIdentifiers.exchange: identifier[0],
-                        self.PriceIdentifiers.sandbox: identifier[1] == 'True',
-                        self.PriceIdentifiers.symbol: identifier[2],
-                        self.PriceIdentifiers.epoch_start: int(float(identifier[3])),
-                        self.PriceIdentifiers.epoch_stop: int(float(identifier[4])),
-                        self.PriceIdentifiers.resolution: int(float(identifier[5]))
-                    })
-                except IndexError:
-                    # Remove each of the failed cache objects
-                    os.remove(os.path.join(cache_folder, files[file]))
-
-            return identifiers_
-
-        def sort_identifiers(identifiers_: list) -> dict:
-            """
-            Create the hierarchy based on the identifiers
-            {
-                'coinbase_pro': {
-                    True: {
-                        'BTC-USD': [60, 3600, 86400]
-                    }
-                    False: {
-
-                    }
-                }
-            }
-            """
-            local_history_blocks_ = {}
-
-            def sort_identifier(identifier_: dict):
-                exchange_ = identifier_[self.PriceIdentifiers.exchange]
-                sandbox_ = identifier_[self.PriceIdentifiers.sandbox]
-                symbol_ = identifier_[self.PriceIdentifiers.symbol]
-                resolution_ = identifier_[self.PriceIdentifiers.resolution]
-
-                if exchange_ not in local_history_blocks_:
-                    local_history_blocks_[exchange_] = {}
-
-                if sandbox_ not in local_history_blocks_[exchange_]:
-                    local_history_blocks_[exchange_][sandbox_] = {}
-
-                if symbol_ not in local_history_blocks_[exchange_][sandbox_]:
-                    local_history_blocks_[exchange_][sandbox_][symbol_] = {}
+        exchange = self.interface.get_exchange_type()
+        sandbox = True
 
-                # Now we're checking the resolution array
-                if resolution_ not in local_history_blocks_[exchange_][sandbox_][symbol_]:
-                    local_history_blocks_[exchange_][sandbox_][symbol_][resolution_] = []
-
-                # Add these in as a dictionary
-                local_history_blocks_[exchange_][sandbox_][symbol_][resolution_].append({
-                    self.PriceIdentifiers.epoch_start: identifier_[self.PriceIdentifiers.epoch_start],
-                    self.PriceIdentifiers.epoch_stop: identifier_[self.PriceIdentifiers.epoch_stop]
-                })
-
-            # This is only the downloaded data
-            for identifier in identifiers_:
-                sort_identifier(identifier)
-
-            return local_history_blocks_
-
-        identifiers = parse_identifiers()
-
-        local_history_blocks = sort_identifiers(identifiers)
-
-        final_prices: dict = {}
-        prices_by_resolution: dict = {}
+        # First plan every read & download so that all the missing ranges can be fetched at once
+        plans = []
+        downloads = {}
         for i in range(len(self.__user_added_times)):
             if self.__user_added_times[i] is None:
                 continue
@@ -382,67 +397,47 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
             resolution = self.__user_added_times[i][self.PriceIdentifiers.resolution]
             start_time = self.__user_added_times[i][self.PriceIdentifiers.epoch_start]
             end_time = self.__user_added_times[i][self.PriceIdentifiers.epoch_stop] - resolution
-            exchange = self.interface.get_exchange_type()
-            sandbox = True
 
             if end_time < start_time:
                 raise RuntimeError("Must specify a longer timeframe to run the backtest.")
 
-            downloaded_ranges = []
-
-            # Attempt to find the same symbol/asset possibilities in the backtest blocks
-            try:
-                # Make sure to copy it because if you don't you delete this for any similar resolution
-                # If you don't copy it fails if you use two price events at the same resolution
-                available_prices = copy.deepcopy(local_history_blocks[exchange][sandbox][symbol][resolution])
-                # Pull the epoch start and epoch stop for this particular symbol / resolution
-                for price_set in available_prices:
-                    downloaded_ranges.append([
-                        price_set[self.PriceIdentifiers.epoch_start],
-                        price_set[self.PriceIdentifiers.epoch_stop]
-                    ])
-            except KeyError:
-                pass
+            # Ask the cache index for only the segments which overlap this window
+            segments = cache.find_segments(exchange, sandbox, symbol, resolution, start_time, end_time)
+            downloaded_ranges = [[segment.epoch_start, segment.epoch_stop] for segment in segments]
+            file_names = {(segment.epoch_start, segment.epoch_stop): segment.file_name for segment in segments}
 
             used_ranges, negative_ranges = split([start_time, end_time], downloaded_ranges)
 
             relevant_data = []
             for j in used_ranges:
-                relevant_data.append(pd.read_csv(os.path.join(cache_folder, to_string_key([exchange,
-                                                                                           True,
-                                                                                           symbol,
-                                                                                           j[0],
-                                                                                           j[1],
-                                                                                           resolution]) + ".csv")))
+                # Backends that support it only read the rows inside the requested window
+                relevant_data.append(cache.read_segment(file_names[(j[0], j[1])], start_time, end_time + resolution))
+
+            download_keys = []
+            for j in negative_ranges:
+                download_key = (symbol, resolution, j[0], j[1])
+                if download_key not in downloads:
+                    print("No cached data found for " + symbol + " from: " + str(j[0]) + " to " +
+                          str(j[1]) + " at a resolution of " + str(resolution) + " seconds.")
+                    downloads[download_key] = None
+                download_keys.append(download_key)
 
+            plans.append((symbol, resolution, start_time, end_time, relevant_data, download_keys))
+
+        downloads = self.__download_ranges(cache, exchange, list(downloads.keys()))
+
+        # Now assemble the prices in the same order they were requested
+        final_prices: dict = {}
+        prices_by_resolution: dict = {}
+        for symbol, resolution, start_time, end_time, relevant_data, download_keys in plans:
             if len(relevant_data) > 0:
                 final_prices[symbol] = pd.concat(relevant_data)
                 for dataset in relevant_data:
                     prices_by_resolution = aggregate_prices_by_resolution(prices_by_resolution, symbol, resolution,
                                                                           dataset)
 
-            # If there is any data left to download do it here
-            for j in negative_ranges:
-                print("No cached data found for " + symbol + " from: " + str(j[0]) + " to " +
-                      str(j[1]) + " at a resolution of " + str(resolution) + " seconds.")
-                download = self.interface.get_product_history(symbol,
-                                                              j[0],
-                                                              j[1],
-                                                              resolution)
-
-                # Write the file but this time include very accurately the start and end times
-                if self.preferences['settings']['continuous_caching']:
-                    if not download.empty:
-                        download.to_csv(os.path.join(cache_folder, f'{exchange},'
-                                                                   f'{True},'
-                                                                   f'{symbol},'
-                                                                   f'{int(j[0])},'
-                                                                   f'{int(j[1]) + resolution},'  # This adds resolution 
-                                                                                                 # back to the exported
-                                                                                                 # time series
-                                                                   f'{resolution}.csv'),
-                                        index=False)
-
+            for download_key in download_keys:
+                download = downloads[download_key]
                 prices_by_resolution = aggregate_prices_by_resolution(prices_by_resolution, symbol, resolution,
                                                                       download)
                 # Write these into the data array
@@ -459,6 +454,15 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
             final_prices[symbol] = final_prices[symbol][
                 final_prices[symbol]['time'] <= end_time + resolution]  # Add back
 
+        if self.preferences['settings']['compact_cache_after_sync']:
+            synced_keys = {(self.interface.get_exchange_type(), True, times[self.PriceIdentifiers.symbol],
+                            times[self.PriceIdentifiers.resolution])
+                           for times in self.__user_added_times if times is not None}
+            compaction = cache.compact(synced_keys)
+            if compaction.segments_merged > 0:
+                info_print(f"Compacted {compaction.segments_merged} cached segments into "
+                           f"{compaction.segments_written}, reclaiming {compaction.bytes_reclaimed} bytes.")
+
         # Now add any custom prices
         for price_reader in self.__price_readers:
             data = price_reader.data
@@ -484,11 +488,8 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         # Send the prices by resolution to the interface
         self.interface.receive_price_cache(sort_prices_by_resolution(prices_by_resolution))
 
-        # Finally, convert back into records
-        for symbol in final_prices:
-            final_prices[symbol] = final_prices[symbol].to_records()
-
-        return final_prices
+        # Finally, convert into contiguous columns which are shared with the interface & the result
+        return PriceStore.from_dataframes(final_prices)
 
     def add_prices(self,
                    symbol: str,
@@ -608,9 +609,18 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
                                           typing.Any],
                              typing.Union[
                                  int, typing.Any]]]:
+        true_available = {}
+        no_trade_available = {}
+        self.__write_account_data(interface, local_time, true_available.__setitem__, no_trade_available.__setitem__)
+        return true_available, no_trade_available
 
+    def __write_account_data(self, interface: PaperTradeInterface, local_time,
+                             write_traded: typing.Callable[[str, typing.Any], None],
+                             write_no_trade: typing.Callable[[str, typing.Any], None]):
+        """
+        Value the traded and untraded accounts, passing each column & value to the writers
+        """
         # This is done so that only traded assets are evaluated.
-        true_available: dict = {}
         true_account: dict = {}
         for i in interface.traded_assets:
             # Grab the account status
@@ -619,7 +629,6 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         # Create an account total value
         value_total = 0
 
-        no_trade_available = {}
         # No trade account total
         no_trade_value = 0
 
@@ -634,14 +643,16 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         except KeyError:
             pass
 
+        is_stonks = interface.get_exchange_type() == 'alpaca'
         for i in list(true_account.keys()):
             # Funds on hold are still added
-            true_available[i] = true_account[i]['available'] + true_account[i]['hold']
-            no_trade_available[i] = self.initial_account[i]['available'] + self.initial_account[i]['hold']
+            true_available = true_account[i]['available'] + true_account[i]['hold']
+            no_trade_available = self.initial_account[i]['available'] + self.initial_account[i]['hold']
+            write_traded(i, true_available)
+            write_no_trade(i, no_trade_available)
             currency_pair = i
 
-            # Convert to quote (this could be optimized a bit)
-            is_stonks = interface.get_exchange_type() == 'alpaca'
+            # Convert to quote
             is_future = currency_pair.endswith('PERP')
             if not (is_stonks or is_future):
                 currency_pair += '-'
@@ -660,28 +671,41 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
 
             # This is needed for futures apparently
             if is_future:
-                value_total += price * abs(true_available[i])
-                no_trade_value += price * abs(no_trade_available[i])
+                value_total += price * abs(true_available)
+                no_trade_value += price * abs(no_trade_available)
             else:
                 # For stocks make sure not to use an absolute value
-                value_total += price * true_available[i]
-                no_trade_value += price * no_trade_available[i]
+                value_total += price * true_available
+                no_trade_value += price * no_trade_available
 
         # Make sure to add the time key in
-        true_available['time'] = local_time
-        no_trade_available['time'] = local_time
+        write_traded('time', local_time)
+        write_no_trade('time', local_time)
 
         value_total += quote_value
-        true_available[self.quote_currency] = quote_value
+        write_traded(self.quote_currency, quote_value)
 
         no_trade_value += self.initial_account[self.quote_currency][
                               'available'] + self.initial_account[self.quote_currency]['hold']
 
-        true_available['Account Value (' + self.quote_currency + ')'] = value_total
+        write_traded('Account Value (' + self.quote_currency + ')', value_total)
 
-        no_trade_available['Account Value (No Trades)'] = no_trade_value
+        write_no_trade('Account Value (No Trades)', no_trade_value)
 
-        return true_available, no_trade_available
+    def __record_account_values(self, local_time):
+        """
+        Write the valuation of the account into a new row of each ledger
+        """
+        self.traded_account_values.append_row()
+        self.no_trade_account_values.append_row()
+        try:
+            self.__write_account_data(self.interface, local_time, self.traded_account_values.set,
+                                      self.no_trade_account_values.set)
+        except BaseException:
+            # Don't leave a partially valued row behind
+            self.traded_account_values.discard_row()
+            self.no_trade_account_values.discard_row()
+            raise
 
     def __account_was_used(self, column) -> bool:
         show_zero_delta = self.preferences['settings']['show_tickers_with_zero_delta']
@@ -694,6 +718,11 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         return output
 
     def __next_color(self):
+        from bokeh.palettes import Category10_10
+
+        if self.__color_generator is None:
+            self.__color_generator = Category10_10.__iter__()
+
         # This should be a generator, but it doesn't work without doing a foreach loop
         try:
             return next(self.__color_generator)
@@ -737,22 +766,30 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         # Now update the time to match
         self.interface.receive_time(self.time)
 
-        for symbol in self.prices:
-            # Make sure that each price column is at least at the current time
-
-            # This just incrementing the price indexes until it's less than time and ensuring that
-            #  it's less than the length of the price
-            price_length = len(self.prices[symbol]) - 2
-            while self.prices[symbol][self.price_indexes[symbol]]['time'] < self.time:
-                if price_length >= self.price_indexes[symbol]:
-                    self.price_indexes[symbol] += 1
-                else:
-                    self.model.has_data = False
-                    break
-
-            # Write this new price into the interface
-            self.interface.receive_price(symbol, new_price=self.prices[symbol][
-                self.price_indexes[symbol]][self.use_price])
+        detailed = self.profiler.detailed
+        if detailed:
+            start = time.perf_counter()
+        for symbol, symbol_prices in self.prices.items():
+            # Make sure that each price column is at least at the current time, this stops at the final row when the
+            #  data runs out
+            cursor = self.price_cursors[symbol]
+            previous_index = cursor.index
+            price_index = cursor.advance(self.time)
+            if not cursor.has_data:
+                self.model.has_data = False
+
+            # The interface reads the new price out of the store at this cursor
+            if self.__intrabar_path is not None:
+                # Nothing can fill until a new bar has been reached
+                path = self.__price_path(symbol_prices, previous_index + 1, price_index + 1) \
+                    if price_index > previous_index else ()
+                self.interface.receive_price_path(symbol, path)
+        if detailed:
+            self.profiler.add('run/advance_prices', time.perf_counter() - start)
+
+        if self.__intrabar_path is not None:
+            # Fill against the bars that were just stepped over, after the strategy placed its orders
+            self.__evaluate_limits()
 
         # Check has_data here also
         if self.time > self.user_stop:
@@ -760,9 +797,38 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
 
         run_events()
 
+    def __price_path(self, prices: SymbolPrices, start: int, stop: int) -> tuple:
+        """
+        The prices reached across rows [start, stop): the first open followed by the high & low in the order set by
+        intrabar_path
+        """
+        def column(field: str) -> np.ndarray:
+            return prices[field] if field in prices else prices[self.use_price]
+
+        open_ = column('open')[start]
+        high = column('high')[start:stop].max()
+        low = column('low')[start:stop].min()
+
+        if self.__intrabar_path == 'high_first':
+            high_first = True
+        elif self.__intrabar_path == 'low_first':
+            high_first = False
+        else:
+            # Assume the extreme closest to the open was reached first
+            high_first = high - open_ <= open_ - low
+        return (open_, high, low) if high_first else (open_, low, high)
+
+    def __evaluate_limits(self):
+        if self.profiler.detailed:
+            with self.profiler.phase('run/evaluate_limits'):
+                self.interface.evaluate_limits()
+        else:
+            self.interface.evaluate_limits()
+
     def sleep(self, seconds: [int, float]):
-        # Always evaluate limits
-        self.interface.evaluate_limits()
+        # Always evaluate limits. Intrabar fills are evaluated once the next bars are reached instead.
+        if self.__intrabar_path is None:
+            self.__evaluate_limits()
         self.sleep_count += 1
 
         if self.show_progress:
@@ -785,28 +851,78 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         if not self.backtesting:
             return
 
-        available_dict, no_trade_dict = self.format_account_data(self.interface, self.time)
+        if self.profiler.detailed:
+            with self.profiler.phase('run/value_account'):
+                self.__record_account_values(self.time)
+        else:
+            self.__record_account_values(self.time)
 
-        self.traded_account_values.append(available_dict)
-        self.no_trade_account_values.append(no_trade_dict)
+    def __load_preferences(self, backtest_settings_path: str, settings: dict):
+        # Copy the cached preferences so that the arguments of one run don't leak into the next
+        self.preferences = copy.deepcopy(load_backtest_preferences(backtest_settings_path))
+        # Write any dynamic arguments back into the backtest preferences
+        for setting in settings:
+            self.preferences['settings'][setting] = settings[setting]
 
-    # TODO this class should be constructed with a BacktestConfiguration object
-    def run(self,
-            args,
-            exchange: ABCExchange,
-            initial_account_values,
-            backtest_settings_path: str = None,
-            **kwargs) -> BacktestResult:
+        self.backtest_settings_path = backtest_settings_path
+
+    def preload_prices(self, exchange: ABCExchange, backtest_settings_path: str = None, **kwargs) -> PriceStore:
+        """
+        Sync the prices once and keep them in memory. Every following run on this controller reuses them rather than
+        reading the cache again, and processes forked afterwards share the same arrays.
+
+        Args:
+            exchange: The paper trade exchange
+            backtest_settings_path: Path to the backtest.json file
+        """
+        self.__load_preferences(backtest_settings_path, kwargs)
+        self.interface = exchange.get_interface()
+
+        self.clear_preloaded_prices()
+        price_store = self.sync_prices()
+        self.__preloaded_prices = (price_store, self.interface.full_prices)
+        self.__preloaded_range = (self.user_start, self.user_stop)
+        return price_store
+
+    def set_backtest_window(self, start: [int, float] = None, stop: [int, float] = None):
+        """
+        Run the following backtests over part of the preloaded prices. Calling this without a start and stop runs
+        over all the preloaded prices again.
+
+        Args:
+            start: The epoch time to start the backtests at, defaults to the start of the preloaded prices
+            stop: The epoch time to finish the backtests at, defaults to the end of the preloaded prices
         """
-        Setup
+        if self.__preloaded_prices is None:
+            raise RuntimeError("Prices must be preloaded before a backtest window can be set.")
+        if start is None and stop is None:
+            self.__window = None
+        else:
+            preloaded_start, preloaded_stop = self.__preloaded_range
+            self.__window = (preloaded_start if start is None else start, preloaded_stop if stop is None else stop)
+
+    def clear_preloaded_prices(self):
+        if self.__preloaded_range is not None:
+            self.user_start, self.user_stop = self.__preloaded_range
+        self.__preloaded_prices = None
+        self.__preloaded_range = None
+        self.__window = None
+
+    def __prepare_backtest(self, exchange: ABCExchange, initial_account_values, backtest_settings_path: str,
+                           settings: dict) -> list:
+        """
+        Load the settings, sync the prices and set up the paper trade account shared by every backtest engine.
+
+        Returns:
+            The columns of the account value history
         """
         self.backtesting = True
-        self.preferences = load_backtest_preferences(backtest_settings_path)
-        # Write any dynamic arguments back into the backtest preferences
-        for setting in kwargs:
-            self.preferences['settings'][setting] = kwargs[setting]
+        self.__load_preferences(backtest_settings_path, settings)
+
+        detailed = self.preferences['settings']['profile_backtest']
+        self.profiler = BacktestProfiler(detailed=detailed,
+                                         sample_interval=self.preferences['settings']['profile_sample_interval'])
 
-        self.backtest_settings_path = backtest_settings_path
         self.show_progress = self.preferences['settings']['show_progress_during_backtest']
 
         if not exchange.get_type().endswith("paper_trade"):
@@ -816,14 +932,25 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         # This is where we begin logging the backtest time
         start_clock = time.time()
 
+        # Clear anything left over from a previous run on this controller
+        self.traded_account_values = AccountLedger()
+        self.no_trade_account_values = AccountLedger()
+        self.events = []
+        self.event_index = 0
+        self.sleep_count = 0
+
         # Figure out our traded assets here
-        self.prices = self.sync_prices()
+        with self.profiler.phase('sync_prices'):
+            self.prices = self.sync_prices()
         # add funding rate events for futures trading
+        self.__funding_rate_readers = []
         if isinstance(self.interface, FuturesPaperTradeInterface):
             for symbol in self.prices:
-                self.add_custom_events(FundingRateEventReader(symbol, self.user_start, self.user_stop, self.interface))
+                self.__funding_rate_readers.append(FundingRateEventReader(symbol, self.user_start, self.user_stop,
+                                                                          self.interface))
         # Now ensure all events are processed
-        self.parse_events()
+        with self.profiler.phase('parse_events'):
+            self.parse_events()
         for symbol in self.prices:
             base = get_base_asset(symbol)
             quote = get_quote_asset(symbol)
@@ -855,23 +982,27 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         use_price = self.preferences['settings']['use_price']
         self.use_price = use_price
 
-        for frame_symbol, price_list in self.prices.items():
-            # This is a list of dictionaries
-            frame = price_list  # type: list
+        self.__intrabar_path = None
+        self.interface.clear_price_paths()
+        if self.preferences['settings']['intrabar_fills']:
+            if isinstance(self.interface, FuturesPaperTradeInterface):
+                raise NotImplementedError("Intrabar fills are only supported for spot backtests.")
+            intrabar_path = self.preferences['settings']['intrabar_path']
+            if intrabar_path not in ('nearest', 'high_first', 'low_first'):
+                raise ValueError(f"intrabar_path must be 'nearest', 'high_first' or 'low_first', got "
+                                 f"{intrabar_path}.")
+            self.__intrabar_path = intrabar_path
 
-            # Be sure to push these initial prices to the strategy
-            try:
-                self.interface.receive_price(frame_symbol, frame[0][use_price])
-            except IndexError:
-                def check_if_any_column_has_prices(price_dict: dict) -> bool:
+        for frame_symbol, price_list in self.prices.items():
+            if price_list.empty:
+                def check_if_any_column_has_prices(price_store: PriceStore) -> bool:
                     """
-                    In dictionary of symbols, check if at least one key has data
+                    In the store of symbols, check if at least one key has data
                     """
-                    for j in price_dict:
-                        # This handles the weird types
-                        if len(price_dict[j]) == 0:
+                    for j in price_store:
+                        if price_store[j].empty:
                             return False
-                        if not price_dict[j].empty:
+                        else:
                             return True
                     return False
 
@@ -887,13 +1018,16 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
             # Be sure to send in the initial time
             first_time = price_list['time'][0]
             self.interface.receive_time(first_time)
-            self.price_indexes[frame_symbol] = 0
+            self.price_cursors[frame_symbol] = PriceCursor(price_list['time'])
 
             # Find the first time in the list
             self.initial_time = copy.copy(self.user_start)
             self.interface.initial_time = self.initial_time
 
-        if self.prices == {} and self.events == []:
+        # The interface reads its prices straight out of the store at the position of each cursor
+        self.interface.receive_price_store(self.prices, self.price_cursors, use_price)
+
+        if len(self.prices) == 0 and self.events == []:
             raise ValueError("No data given. "
                              "Try setting an argument such as to='1y' in the .backtest() command.\n"
                              "Example: strategy.backtest(to='1y')")
@@ -922,21 +1056,27 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         # If they start a price event on something they don't own, this should also be included
         column_keys.append('time')
 
-        cycle_status = pd.DataFrame(columns=column_keys)
+        return column_keys
 
-        no_trade_cycle_status = pd.DataFrame(columns=column_keys)
+    # TODO this class should be constructed with a BacktestConfiguration object
+    def run(self,
+            args,
+            exchange: ABCExchange,
+            initial_account_values,
+            backtest_settings_path: str = None,
+            **kwargs) -> BacktestResult:
+        column_keys = self.__prepare_backtest(exchange, initial_account_values, backtest_settings_path, kwargs)
 
         # Add an initial account row here
         if self.preferences['settings']['save_initial_account_value']:
-            available_dict, no_trade_dict = self.format_account_data(self.interface, self.user_start)
-            self.traded_account_values.append(available_dict)
-            self.no_trade_account_values.append(no_trade_dict)
+            self.__record_account_values(self.user_start)
 
         print("\nBacktesting...")
 
         # Start the model here
         try:
-            self.model.main(args)
+            with self.profiler.run():
+                self.model.main(args)
             if self.show_progress:
                 # If it finishes give it 100%
                 update_progress(1)
@@ -948,14 +1088,170 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         # Reset time to indicate we are no longer in a backtest
         self.time = None
 
+        return self.__create_result(column_keys, self.traded_account_values.to_dataframe(),
+                                    self.no_trade_account_values.to_dataframe(), {
+            'created': self.interface.paper_trade_orders,
+            'limits_executed': self.interface.executed_orders,
+            'limits_canceled': self.interface.canceled_orders,
+            'executed_market_orders': self.interface.market_order_execution_details
+        }, self.interface.time())
+
+    def run_vectorized(self,
+                       signal: typing.Callable[[SymbolPrices, str], np.ndarray],
+                       symbols: list,
+                       exchange: ABCExchange,
+                       initial_account_values,
+                       backtest_settings_path: str = None,
+                       **kwargs) -> BacktestResult:
+        """
+        Backtest a strategy whose orders don't depend on fills by computing every position at once.
+
+        The signal is given the synced prices of each symbol (limited to the backtest window) and returns the base
+        position to hold on every row. Positions are reached with market orders at the `use_price` of that row,
+        paying the taker fee from get_fees. Orders are not checked against the account balance or the exchange's
+        order filters.
+
+        Args:
+            signal: Function of (prices, symbol) which returns an array with one target position per price row
+            symbols: The symbols to trade
+            exchange: The paper trade exchange
+            initial_account_values: Dictionary of initial value sizes (i.e { 'BTC': 3, 'USD': 5650})
+            backtest_settings_path: Path to the backtest.json file
+        """
+        if isinstance(exchange.get_interface(), FuturesPaperTradeInterface):
+            raise NotImplementedError("Vectorized backtests only support spot trading.")
+
+        column_keys = self.__prepare_backtest(exchange, initial_account_values, backtest_settings_path, kwargs)
+
+        print("\nBacktesting...")
+        run_start = time.perf_counter()
+
+        windows = {}
+        for symbol in symbols:
+            if get_quote_asset(symbol) != self.quote_currency:
+                raise ValueError(f"Cannot value {symbol} in {self.quote_currency}. Set \"quote_account_value_in\" "
+                                 f"in \"backtest.json\" to {get_quote_asset(symbol)}.")
+            prices = self.prices[symbol]
+            times = prices['time']
+            windows[symbol] = prices.slice(int(np.searchsorted(times, self.user_start, side='left')),
+                                           int(np.searchsorted(times, self.user_stop, side='right')))
+            if windows[symbol].empty:
+                raise IndexError(f"No prices for {symbol} between {self.user_start} and {self.user_stop}.")
+
+        # Every symbol is valued at each time that any of them has a price
+        timeline = np.unique(np.concatenate([window['time'] for window in windows.values()]))
+
+        def holding(asset: str) -> float:
+            account = self.initial_account[asset]
+            return account['available'] + account['hold']
+
+        account_values = {}
+        no_trade_account_values = {}
+        quote_holdings = np.full(len(timeline), holding(self.quote_currency), dtype=np.float64)
+        base_value = np.zeros(len(timeline))
+        no_trade_value = quote_holdings.copy()
+        initial_value = holding(self.quote_currency)
+
+        trades = {
+            'created': [],
+            'limits_executed': [],
+            'limits_canceled': [],
+            'executed_market_orders': []
+        }
+        for symbol, window in windows.items():
+            base_asset = get_base_asset(symbol)
+            rows = align_rows(window['time'], timeline)
+            prices = window[self.use_price][rows]
+
+            targets = np.asarray(signal(window, symbol), dtype=np.float64)
+            if len(targets) != len(window):
+                raise ValueError(f"The signal for {symbol} returned {len(targets)} positions for {len(window)} "
+                                 f"prices.")
+
+            fee_rate = float(self.interface.get_fees(symbol)['taker_fee_rate'])
+            simulation = simulate_positions(prices, targets[rows], holding(base_asset), fee_rate)
+
+            account_values[base_asset] = simulation.base
+            quote_holdings += simulation.quote_delta
+            base_value += simulation.base * prices
+            no_trade_account_values[base_asset] = np.full(len(timeline), holding(base_asset))
+            no_trade_value += holding(base_asset) * prices
+            initial_value += holding(base_asset) * prices[0]
+
+            for index in np.flatnonzero(simulation.orders):
+                order_id = paper_trade_utils.generate_coinbase_pro_id()
+                trades['created'].append({
+                    'symbol': symbol,
+                    'id': order_id,
+                    'created_at': float(timeline[index]),
+                    'size': float(abs(simulation.orders[index])),
+                    'status': 'done',
+                    'type': 'market',
+                    'side': 'buy' if simulation.orders[index] > 0 else 'sell',
+                    'exchange': self.interface.get_exchange_type()
+                })
+                trades['executed_market_orders'].append({
+                    'id': order_id,
+                    'executed_price': float(prices[index])
+                })
+
+        trades['created'].sort(key=lambda order: order['created_at'])
+
+        # Times are floats in the event driven backtest as well
+        timeline = timeline.astype(np.float64)
+        account_values['time'] = timeline
+        account_values[self.quote_currency] = quote_holdings
+        account_values['Account Value (' + self.quote_currency + ')'] = quote_holdings + base_value
+        no_trade_account_values['time'] = timeline
+        no_trade_account_values['Account Value (No Trades)'] = no_trade_value
+
+        account_values = pd.DataFrame(account_values)
+        no_trade_account_values = pd.DataFrame(no_trade_account_values)
+
+        # Add an initial account row here
+        if self.preferences['settings']['save_initial_account_value']:
+            initial_row = {asset: holding(asset) for asset in account_values.columns if asset in self.initial_account}
+            initial_row['time'] = self.user_start
+            initial_row['Account Value (' + self.quote_currency + ')'] = initial_value
+            account_values = pd.concat([pd.DataFrame([initial_row]), account_values], ignore_index=True)
+
+            initial_row = {asset: holding(asset) for asset in no_trade_account_values.columns
+                           if asset in self.initial_account}
+            initial_row['time'] = self.user_start
+            initial_row['Account Value (No Trades)'] = initial_value
+            no_trade_account_values = pd.concat([pd.DataFrame([initial_row]), no_trade_account_values],
+                                                ignore_index=True)
+
+        self.time = None
+
+        self.profiler.add('run', time.perf_counter() - run_start)
+        return self.__create_result(column_keys, account_values, no_trade_account_values, trades,
+                                    float(timeline[-1]))
+
+    def __create_result(self, column_keys: list, account_values, no_trade_account_values, trades: dict,
+                        stop_time) -> BacktestResult:
+        """
+        Compute the metrics, draw the figures & export the result of a finished backtest
+
+        Args:
+            column_keys: The leading columns of the account value history
+            account_values: A dataframe of the account holdings and value over time
+            no_trade_account_values: A dataframe of the value of the initial account over time
+            trades: The created, executed and canceled orders
+            stop_time: The time that the backtest finished
+        """
+        benchmark_symbol = self.preferences["settings"]["benchmark_symbol"]
+        use_price = self.use_price
+        metrics_start = time.perf_counter()
+
         # Push the accounts to the dataframe
-        cycle_status = pd.concat([cycle_status, pd.DataFrame(self.traded_account_values)],
+        cycle_status = pd.concat([pd.DataFrame(columns=column_keys), pd.DataFrame(account_values)],
                                  ignore_index=True).sort_values(by=['time'])
 
         if len(cycle_status) == 0:
             raise RuntimeError("Empty result - no valid backtesting events occurred. Was there an error?.")
 
-        no_trade_cycle_status = pd.concat([no_trade_cycle_status, pd.DataFrame(self.no_trade_account_values)],
+        no_trade_cycle_status = pd.concat([pd.DataFrame(columns=column_keys), pd.DataFrame(no_trade_account_values)],
                                           ignore_index=True).sort_values(by=['time'])
 
         def is_number(s):
@@ -972,12 +1268,8 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         metrics_indicators = {}
         user_callbacks = {}
 
-        result_object = BacktestResult(history_and_returns, {
-            'created': self.interface.paper_trade_orders,
-            'limits_executed': self.interface.executed_orders,
-            'limits_canceled': self.interface.canceled_orders,
-            'executed_market_orders': self.interface.market_order_execution_details
-        }, self.prices, self.initial_time, self.interface.time(), self.quote_currency, [])
+        result_object = BacktestResult(history_and_returns, trades, self.prices, self.initial_time, stop_time,
+                                       self.quote_currency, [])
 
         # If they set resampling we use resampling for everything
         resample_setting = self.preferences['settings']['resample_account_value_for_metrics']
@@ -1081,11 +1373,19 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         result_object.user_callbacks = user_callbacks
         result_object.exchange = self.interface.get_exchange_type()
 
+        self.profiler.add('metrics', time.perf_counter() - metrics_start)
+
         figures = []
         # This modifies the platform result in place
-        platform_result = format_platform_result(result_object)
+        with self.profiler.phase('format_result'):
+            platform_result = format_platform_result(result_object)
         if self.preferences['settings']['GUI_output']:
             def internal_backtest_viewer():
+                # The plotting stack is only loaded when it is actually used
+                from bokeh.layouts import column as bokeh_columns
+                from bokeh.models import HoverTool
+                from bokeh.plotting import ColumnDataSource, figure, show
+
                 # for i in self.prices:
                 #     result_index = cycle_status['time'].sub(i[0]).abs().idxmin()
                 #     for i in cycle_status.iloc[result_index]:
@@ -1176,7 +1476,8 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
             # This is where we end the backtesting time
             stop_clock = time.time()
 
-            internal_backtest_viewer()
+            with self.profiler.phase('figures'):
+                internal_backtest_viewer()
             # TODO this code does a good job uploading finished backtests to the platform. This should be fixed to
             #  allow configuration in the settings to reference any self hosted version of the platform
             # try:
@@ -1223,6 +1524,11 @@ class BackTestController(ABCBacktestController):  # circular import to type mode
         self.backtesting = False
 
         # Export to the platform here
-        blankly.reporter.export_backtest_result(platform_result)
+        with self.profiler.phase('export'):
+            blankly.reporter.export_backtest_result(platform_result)
+
+        result_object.profile = self.profiler
+        if self.profiler.detailed:
+            print(f"\n{self.profiler}")
 
         return result_object
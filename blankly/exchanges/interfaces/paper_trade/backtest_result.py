@@ -18,18 +18,23 @@
 import pandas as pd
 from pandas import DataFrame, to_datetime, Timestamp
 from blankly.utils import time_interval_to_seconds as _time_interval_to_seconds, info_print
+from blankly.exchanges.interfaces.paper_trade.backtest.price_store import PriceStore
 
 
 class BacktestResult:
-    def __init__(self, history_and_returns: dict, trades: dict, history: dict,
+    def __init__(self, history_and_returns: dict, trades: dict, history: PriceStore,
                  start_time: float, stop_time: float, quote_currency: str, figures: list):
         # This can use a ton of memory if these attributes are not cleared
         self.history_and_returns = history_and_returns
         self.metrics = None  # Assigned after construction
         self.user_callbacks = None  # Assigned after construction
         self.exchange = None  # Assigned after construction
+        # The time spent in each phase of the backtest
+        self.profile = None  # Assigned after construction
         self.trades = trades
-        self.history = history
+        # This is the same columnar price store used by the backtest controller
+        self.prices = history
+        self.__history = None
 
         self.quote_currency = quote_currency
 
@@ -38,6 +43,17 @@ class BacktestResult:
 
         self.figures = figures
 
+    @property
+    def history(self) -> dict:
+        """
+        The prices of each symbol as record arrays, such as history['BTC-USD'][0]['close'] or
+        history['BTC-USD']['close']. These are converted from the columns in self.prices on first use, so read from
+        self.prices to avoid the copy.
+        """
+        if self.__history is None:
+            self.__history = {symbol: prices.to_dataframe().to_records() for symbol, prices in self.prices.items()}
+        return self.__history
+
     def get_account_history(self) -> DataFrame:
         return self.history_and_returns['history']
 
@@ -53,6 +69,9 @@ class BacktestResult:
     def get_metrics(self) -> dict:
         return self.metrics
 
+    def get_profile(self) -> DataFrame:
+        return self.profile.report()
+
     def resample_account(self, symbol, interval: [str, float],
                          use_asset_history: bool = False,
                          use_price=None) -> DataFrame:
@@ -100,8 +119,8 @@ class BacktestResult:
 
         if use_asset_history:
             # Find the necessary values to assemble the resamples
-            time_array = self.history[symbol]['time'].tolist()
-            price_array = self.history[symbol][use_price].tolist()
+            time_array = self.prices[symbol]['time'].tolist()
+            price_array = self.prices[symbol][use_price].tolist()
         else:
             # Find the necessary values to assemble the resamples
             time_array = self.history_and_returns['history']['time'].tolist()
@@ -17,12 +17,15 @@
 """
 import time
 
+from blankly.exchanges.interfaces.paper_trade.backtest.price_store import PriceStore
+
 
 class BacktestingWrapper:
     def __init__(self):
         self.backtesting = False
         self.frame = {
-            'prices': {},
+            # The prices visited by each symbol since limits were last evaluated, when filling orders intrabar
+            'paths': {},
             'time': 0
         }
 
@@ -31,25 +34,43 @@ class BacktestingWrapper:
 
         self.full_prices = {}
 
+        # Columnar store of the prices being stepped through by the backtest controller, along with its cursor for
+        #  each symbol
+        self.price_store = PriceStore()
+        self.price_cursors = {}
+        self.use_price = 'close'
+
     def set_backtesting(self, status: bool):
         self.backtesting = status
 
     def receive_time(self, new_time):
         self.frame['time'] = new_time
 
-    def receive_price(self, asset_id, new_price):
-        self.frame['prices'][asset_id] = new_price
+    def receive_price_path(self, asset_id, path: tuple):
+        self.frame['paths'][asset_id] = path
+
+    def clear_price_paths(self):
+        self.frame['paths'] = {}
 
     def receive_price_cache(self, prices: dict):
         self.full_prices = prices
 
+    def receive_price_store(self, price_store: PriceStore, price_cursors: dict, use_price: str):
+        """
+        Share the controller's price store & cursors. The controller moves the cursors forward as time advances, so
+        the current price of a symbol is read out of the store without being copied in on each step.
+        """
+        self.price_store = price_store
+        self.price_cursors = price_cursors
+        self.use_price = use_price
+
     """
     Override functions for manipulating backtesting
     """
 
     def get_backtesting_price(self, asset_id):
         try:
-            return self.frame['prices'][asset_id]
+            return self.price_store[asset_id][self.use_price][self.price_cursors[asset_id].index]
         except KeyError:
             raise KeyError(f"Price not found in recent frame. Have prices for {asset_id} been downloaded?")
 
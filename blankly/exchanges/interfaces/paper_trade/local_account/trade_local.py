@@ -16,8 +16,6 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import copy
-
 import blankly.utils.utils as utils
 from blankly.utils.exceptions import InvalidOrder
 
@@ -33,12 +31,30 @@ class LocalAccount:
         # This is used for shorting. It largely corresponds with margin
         self.__granted_value = {}
         self.local_account = utils.AttributeDict(currencies)
+        # Read-only snapshots handed out by get_account(s). These are dropped whenever a balance changes.
+        self.__snapshots = {}
+        self.__accounts_snapshot = None
+
+    def __invalidate(self, *asset_ids):
+        self.__accounts_snapshot = None
+        for asset_id in asset_ids:
+            self.__snapshots.pop(asset_id, None)
+
+    def __snapshot(self, asset_id) -> utils.FrozenAttributeDict:
+        try:
+            return self.__snapshots[asset_id]
+        except KeyError:
+            snapshot = utils.FrozenAttributeDict(self.local_account[asset_id])
+            self.__snapshots[asset_id] = snapshot
+            return snapshot
 
     def override_local_account(self, currencies: dict) -> None:
         """
         After initialization, this is a setter for overriding the internal values
         """
         self.local_account = currencies
+        self.__snapshots = {}
+        self.__accounts_snapshot = None
 
     def trade_local(self, symbol, side, base_delta, quote_delta, quote_resolution, base_resolution) -> None:
         """
@@ -58,6 +74,7 @@ class LocalAccount:
         # Extract the base and quote pairs of the currency
         base = utils.get_base_asset(symbol)
         quote = utils.get_quote_asset(symbol)
+        self.__invalidate(base, quote)
 
         # Push these abstracted deltas to the local account
         try:
@@ -208,20 +225,25 @@ class LocalAccount:
 
         raise LookupError("Invalid purchase side")
 
-    def get_accounts(self) -> utils.AttributeDict:
+    def get_accounts(self) -> utils.FrozenAttributeDict:
         """
-        Get the paper trading local account
+        Get a read-only snapshot of the paper trading local account. Use copy.copy() on it for a mutable version.
         """
-        return copy.deepcopy(utils.AttributeDict(self.local_account))
+        if self.__accounts_snapshot is None:
+            self.__accounts_snapshot = utils.FrozenAttributeDict({asset_id: self.__snapshot(asset_id)
+                                                                  for asset_id in self.local_account})
+        return self.__accounts_snapshot
 
-    def get_account(self, asset_id) -> utils.AttributeDict:
+    def get_account(self, asset_id) -> utils.FrozenAttributeDict:
         """
-        Get a single account under an asset id
+        Get a read-only snapshot of a single account under an asset id
         """
-        return copy.deepcopy(utils.AttributeDict(self.local_account[asset_id]))
+        return self.__snapshot(asset_id)
 
     def update_available(self, asset_id, new_value):
         self.local_account[asset_id]['available'] = new_value
+        self.__invalidate(asset_id)
 
     def update_hold(self, asset_id, new_value):
         self.local_account[asset_id]['hold'] = new_value
+        self.__invalidate(asset_id)
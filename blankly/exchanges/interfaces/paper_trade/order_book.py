@@ -0,0 +1,162 @@
+"""
+    Indexed storage of the orders placed on the paper trade interface
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import heapq
+import typing
+
+
+class PaperOrderBook:
+    """
+    Every order placed on the paper trade interface, indexed by id, along with price ladders of the pending limit and
+    stop orders for each symbol.
+
+    The ladders are heaps ordered so the order closest to triggering is on top:
+        buy: highest price first, these fill when the price drops below the order price
+        sell_limit: lowest price first, these fill when the price rises above the order price
+        sell_stop: highest price first, these fill when the price drops to or below the order price
+    Checking a symbol only touches the orders that actually trigger. Canceled or filled orders are left in the heaps
+    and skipped when they reach the top.
+    """
+    def __init__(self):
+        # Every order that hasn't been canceled, in creation order
+        self.__orders: typing.Dict[str, dict] = {}
+        # Pending orders by id with the sequence number they were created with
+        self.__pending: typing.Dict[str, typing.Tuple[int, dict]] = {}
+        self.__ladders: typing.Dict[str, typing.Dict[str, list]] = {}
+        # The number of pending ladder orders for each symbol
+        self.__pending_symbols: typing.Dict[str, int] = {}
+        self.__sequence = 0
+
+    @staticmethod
+    def __ladder_entry(order: dict, sequence: int) -> typing.Optional[typing.Tuple[str, tuple]]:
+        if order['type'] not in ('limit', 'stop_loss'):
+            return None
+        if order['side'] == 'buy':
+            return 'buy', (-order['price'], sequence, order['id'])
+        elif order['side'] == 'sell':
+            if order['type'] == 'limit':
+                return 'sell_limit', (order['price'], sequence, order['id'])
+            return 'sell_stop', (-order['price'], sequence, order['id'])
+        return None
+
+    def add(self, order: dict):
+        sequence = self.__sequence
+        self.__sequence += 1
+
+        self.__orders[order['id']] = order
+        if order['status'] != 'pending':
+            return
+
+        self.__pending[order['id']] = (sequence, order)
+        entry = self.__ladder_entry(order, sequence)
+        if entry is not None:
+            side, item = entry
+            symbol = order['symbol']
+            if symbol not in self.__ladders:
+                self.__ladders[symbol] = {'buy': [], 'sell_limit': [], 'sell_stop': []}
+            heapq.heappush(self.__ladders[symbol][side], item)
+            self.__pending_symbols[symbol] = self.__pending_symbols.get(symbol, 0) + 1
+
+    def __remove_pending(self, order_id: str) -> typing.Optional[dict]:
+        try:
+            sequence, order = self.__pending.pop(order_id)
+        except KeyError:
+            return None
+
+        if self.__ladder_entry(order, sequence) is not None:
+            symbol = order['symbol']
+            self.__pending_symbols[symbol] -= 1
+            if self.__pending_symbols[symbol] == 0:
+                del self.__pending_symbols[symbol]
+                # Drop the leftover entries so the heaps don't grow forever
+                del self.__ladders[symbol]
+        return order
+
+    def complete(self, order_id: str):
+        """
+        Mark a pending order as no longer pending, it stays in the book
+        """
+        self.__remove_pending(order_id)
+
+    def cancel(self, order_id: str) -> typing.Optional[dict]:
+        """
+        Remove a pending order from the book
+
+        Returns:
+            The canceled order or None if there is no pending order with that id
+        """
+        order = self.__remove_pending(order_id)
+        if order is not None:
+            del self.__orders[order_id]
+        return order
+
+    def pending_symbols(self) -> typing.List[str]:
+        """
+        The symbols with pending limit or stop orders
+        """
+        return list(self.__pending_symbols.keys())
+
+    def pop_triggered(self, symbol: str, price: float) -> typing.List[typing.Tuple[int, dict]]:
+        """
+        Take the pending orders that trigger at this price off the ladders of a symbol. The orders stay pending until
+        complete() is called, use requeue() to put back any that weren't filled.
+
+        Returns:
+            (sequence, order) for each triggered order
+        """
+        ladders = self.__ladders.get(symbol)
+        if ladders is None:
+            return []
+
+        triggered = []
+
+        def pop_while(heap: list, crossed: typing.Callable[[float], bool]):
+            while heap and crossed(heap[0][0]):
+                _, sequence, order_id = heapq.heappop(heap)
+                pending = self.__pending.get(order_id)
+                # Skip entries for orders that were canceled or filled
+                if pending is not None and pending[0] == sequence and pending[1]['status'] == 'pending':
+                    triggered.append(pending)
+
+        pop_while(ladders['buy'], lambda negative_price: -negative_price > price)
+        pop_while(ladders['sell_limit'], lambda limit_price: limit_price < price)
+        pop_while(ladders['sell_stop'], lambda negative_price: price <= -negative_price)
+        return triggered
+
+    def requeue(self, triggered: typing.Iterable[typing.Tuple[int, dict]]):
+        """
+        Put triggered orders that are still pending back on their ladders
+        """
+        for sequence, order in triggered:
+            if order['id'] in self.__pending and order['symbol'] in self.__ladders:
+                side, item = self.__ladder_entry(order, sequence)
+                heapq.heappush(self.__ladders[order['symbol']][side], item)
+
+    def get(self, order_id: str) -> typing.Optional[dict]:
+        return self.__orders.get(order_id)
+
+    @property
+    def orders(self) -> typing.List[dict]:
+        return list(self.__orders.values())
+
+    @property
+    def open_orders(self) -> typing.List[dict]:
+        return [order for _, order in self.__pending.values() if order['status'] == 'pending']
+
+    def __len__(self) -> int:
+        return len(self.__orders)
@@ -24,6 +24,8 @@ import warnings
 import blankly.exchanges.interfaces.paper_trade.utils as paper_trade
 import blankly.utils.utils as utils
 from blankly.exchanges.interfaces.paper_trade.local_account.trade_local import LocalAccount
+from blankly.exchanges.interfaces.paper_trade.order_book import PaperOrderBook
+from blankly.exchanges.interfaces.paper_trade.trading_rules import TradingRules, exceeds_decimals
 from blankly.exchanges.interfaces.abc_exchange_interface import ABCExchangeInterface
 from blankly.exchanges.interfaces.exchange_interface import ExchangeInterface
 from blankly.exchanges.interfaces.paper_trade.backtesting_wrapper import BacktestingWrapper
@@ -36,8 +38,8 @@ from blankly.utils.exceptions import APIException, InvalidOrder
 
 class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
     def __init__(self, derived_interface: ABCExchangeInterface, initial_account_values: dict = None):
-        # This paper trade orders keeps a live track of the orders
-        self.paper_trade_orders = []
+        # This keeps a live track of the orders, indexed by id & with the pending orders on price ladders
+        self.__order_book = PaperOrderBook()
         # These two keep track of which limit orders and when the order finishes
         self.canceled_orders = []
         self.executed_orders = []
@@ -48,6 +50,8 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
         self.get_products_cache = None
         self.get_fees_cache = {}
         self.get_order_filter_cache = {}
+        # The order filter & fees of each symbol resolved into the numbers used when placing orders
+        self.__trading_rules = {}
 
         self.__run_watchdog = True
 
@@ -77,6 +81,13 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
             self.__ticker_manager = TickerManager(self.get_exchange_type(), default_symbol='')
             self._websocket_update = lambda *args: None
 
+    @property
+    def paper_trade_orders(self) -> list:
+        """
+        Every order that was placed and not canceled, in creation order
+        """
+        return self.__order_book.orders
+
     @property
     def local_account(self):
         if self.__local_account_cache is None:
@@ -179,10 +190,6 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
                 break
             self.evaluate_limits()
 
-    @staticmethod
-    def __get_decimals(number) -> int:
-        return utils.count_decimals(number)
-
     def override_local_account(self, value_dictionary: dict):
         """
         Push a new set of initial account values to the algorithm. All values not given in the
@@ -191,7 +198,7 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
         Args:
             value_dictionary (dict): Account dictionary of format {'BTC': 2.3, 'GRT': 1.1}
         """
-        current_account = self.local_account.get_accounts()
+        current_account = utils.AttributeDict(self.local_account.get_accounts())
         for k, v in current_account.items():
             if k in value_dictionary.keys():
                 current_account[k] = utils.AttributeDict({
@@ -209,122 +216,131 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
         """
         When this is run it checks the local paper trade orders to see if any need to go through
         """
-        used_currencies = []
-        for i in self.paper_trade_orders:
-            if i["symbol"] not in used_currencies:
-                used_currencies.append(i['symbol'])
+        # Only symbols with pending orders need to be checked
+        used_currencies = self.__order_book.pending_symbols()
         prices = {}
 
         decimals_dict = {}
         # get the market limits so that we can get accurate rounding
         for i in used_currencies:
-            market_limits = self.get_order_filter(i)
-            decimals_dict[i] = {}
-            decimals_dict[i]['quantity_decimals'] = self.__get_decimals(market_limits['limit_order']['base_increment'])
-            decimals_dict[i]['quote_decimals'] = self.__get_decimals(market_limits['market_order']['quote_increment'])
+            rules = self.trading_rules(i)
+            decimals_dict[i] = {
+                'quantity_decimals': rules.limit_base_decimals,
+                'quote_decimals': rules.quote_decimals
+            }
 
         for i in used_currencies:
             prices[i] = self.get_price(i)
             if not self.backtesting:
                 time.sleep(.2)
 
-        for i in range(len(self.paper_trade_orders)):
-            index = self.paper_trade_orders[i]
-            """
-            Coinbase pro example
-            {
-                "id": "d0c5340b-6d6c-49d9-b567-48c4bfca13d2",
-                "price": "0.10000000",
-                "size": "0.01000000",
-                "product_id": "BTC-USD",
-                "side": "buy",
-                "stp": "dc",
-                "type": "limit",
-                "time_in_force": "GTC",
-                "post_only": false,
-                "created_at": "2016-12-08T20:02:28.53864Z",
-                "fill_fees": "0.0000000000000000",
-                "filled_size": "0.00000000",
-                "executed_value": "0.0000000000000000",
-                "status": "pending",
-                "settled": false
-            }
-            """
-            if index['type'] in ('limit', 'stop_loss') and index['status'] == 'pending':
-                current_price = prices[index['symbol']]
-                limit_price = index['price']
-
-                if index['side'] == 'buy':
-                    if index['price'] > current_price:
-                        # Take everything off hold
-                        asset_id = index['symbol']
-                        quote = utils.get_quote_asset(asset_id)
-
-                        available = self.local_account.get_account(quote)['available']
-                        # Put it back into available
-                        self.local_account.update_available(quote, available + (index['size'] * index['price']))
-
-                        # Take it out of hold
-                        hold = self.local_account.get_account(quote)['hold']
-                        self.local_account.update_hold(quote, hold - (index['size'] * index['price']))
-
-                        order, funds, executed_value, fill_fees, filled_size = self.evaluate_paper_trade(index,
-                                                                                                         index['price'])
-                        self.local_account.trade_local(symbol=index['symbol'],
-                                                       side='buy',
-                                                       base_delta=filled_size,  # Gain filled size after fees
-                                                       quote_delta=funds * -1,  # Loose the original fund amount
-                                                       base_resolution=decimals_dict[index['symbol']]
-                                                       ['quantity_decimals'],
-                                                       quote_resolution=decimals_dict[index['symbol']]
-                                                       ['quote_decimals'])
-                        order['status'] = 'done'
-                        order['settled'] = 'true'
-
-                        # Add this to the executed orders
-                        self.executed_orders.append({
-                            'id': index['id'],
-                            'executed_time': self.time(),
-                        })
+        # When backtesting with intrabar fills each symbol has the open, high & low reached since the last check, in
+        #  the order they were reached. Otherwise, orders are checked against the current price.
+        paths = self.frame['paths'] if self.backtesting else {}
+        for stage in range(3):
+            triggered = []
+            for i in used_currencies:
+                path = paths.get(i)
+                if path is None:
+                    if stage == 0:
+                        triggered.extend((sequence, order, None)
+                                         for sequence, order in self.__order_book.pop_triggered(i, prices[i]))
+                elif stage < len(path):
+                    # Orders crossed by the open gapped past their price & fill at the open. Later ones were
+                    #  reached on the way to the high or low and fill at their own price.
+                    fill_price = path[0] if stage == 0 else None
+                    triggered.extend((sequence, order, fill_price)
+                                     for sequence, order in self.__order_book.pop_triggered(i, path[stage]))
+            # Fill in the order the orders were created
+            triggered.sort(key=lambda entry: entry[0])
 
-                        self.paper_trade_orders[i] = order
-                elif index['side'] == 'sell':
-                    if limit_price < current_price and index['type'] == 'limit' \
-                            or current_price <= limit_price and index['type'] == 'stop_loss':
-                        # Take everything off hold
-
-                        asset_id = index['symbol']
-                        base = utils.get_base_asset(asset_id)
-
-                        available = self.local_account.get_account(base)['available']
-                        # Put it back into available
-                        self.local_account.update_available(base, available + index['size'])
-
-                        # Remove it from hold
-                        hold = self.local_account.get_account(base)['hold']
-                        self.local_account.update_hold(base, hold - index['size'])
-
-                        order, funds, executed_value, fill_fees, filled_size = self.evaluate_paper_trade(index,
-                                                                                                         index['price'])
-                        self.local_account.trade_local(symbol=index['symbol'],
-                                                       side='sell',
-                                                       base_delta=float(order['size'] * - 1),
-                                                       # Loose size before any fees
-                                                       quote_delta=executed_value,  # Executed value after fees
-                                                       base_resolution=decimals_dict[index['symbol']]
-                                                       ['quantity_decimals'],
-                                                       quote_resolution=decimals_dict[index['symbol']]['quote_decimals']
-                                                       )
-                        order['status'] = 'done'
-                        order['settled'] = 'true'
-
-                        # Add this to the executed orders
-                        self.executed_orders.append({
-                            'id': index['id'],
-                            'executed_time': self.time(),
-                        })
+            try:
+                for _, index, fill_price in triggered:
+                    self.__fill_limit(index, decimals_dict, fill_price)
+            finally:
+                # Anything that wasn't filled because of an error goes back on the ladders
+                self.__order_book.requeue((sequence, order) for sequence, order, _ in triggered)
 
-                        self.paper_trade_orders[i] = order
+    def __fill_limit(self, index: dict, decimals_dict: dict, fill_price: float = None):
+        """
+        Fill a pending limit or stop order whose price has been crossed, at the order price unless a fill price is
+        given
+
+        Coinbase pro example
+        {
+            "id": "d0c5340b-6d6c-49d9-b567-48c4bfca13d2",
+            "price": "0.10000000",
+            "size": "0.01000000",
+            "product_id": "BTC-USD",
+            "side": "buy",
+            "stp": "dc",
+            "type": "limit",
+            "time_in_force": "GTC",
+            "post_only": false,
+            "created_at": "2016-12-08T20:02:28.53864Z",
+            "fill_fees": "0.0000000000000000",
+            "filled_size": "0.00000000",
+            "executed_value": "0.0000000000000000",
+            "status": "pending",
+            "settled": false
+        }
+        """
+        if fill_price is None:
+            fill_price = index['price']
+
+        if index['side'] == 'buy':
+            # Take everything off hold
+            asset_id = index['symbol']
+            quote = utils.get_quote_asset(asset_id)
+
+            available = self.local_account.get_account(quote)['available']
+            # Put it back into available
+            self.local_account.update_available(quote, available + (index['size'] * index['price']))
+
+            # Take it out of hold
+            hold = self.local_account.get_account(quote)['hold']
+            self.local_account.update_hold(quote, hold - (index['size'] * index['price']))
+
+            order, funds, executed_value, fill_fees, filled_size = self.evaluate_paper_trade(index, fill_price)
+            self.local_account.trade_local(symbol=index['symbol'],
+                                           side='buy',
+                                           base_delta=filled_size,  # Gain filled size after fees
+                                           quote_delta=funds * -1,  # Loose the original fund amount
+                                           base_resolution=decimals_dict[index['symbol']]['quantity_decimals'],
+                                           quote_resolution=decimals_dict[index['symbol']]['quote_decimals'])
+        else:
+            # Take everything off hold
+            asset_id = index['symbol']
+            base = utils.get_base_asset(asset_id)
+
+            available = self.local_account.get_account(base)['available']
+            # Put it back into available
+            self.local_account.update_available(base, available + index['size'])
+
+            # Remove it from hold
+            hold = self.local_account.get_account(base)['hold']
+            self.local_account.update_hold(base, hold - index['size'])
+
+            order, funds, executed_value, fill_fees, filled_size = self.evaluate_paper_trade(index, fill_price)
+            self.local_account.trade_local(symbol=index['symbol'],
+                                           side='sell',
+                                           base_delta=float(order['size'] * - 1),  # Loose size before any fees
+                                           quote_delta=executed_value,  # Executed value after fees
+                                           base_resolution=decimals_dict[index['symbol']]['quantity_decimals'],
+                                           quote_resolution=decimals_dict[index['symbol']]['quote_decimals'])
+        order['status'] = 'done'
+        order['settled'] = 'true'
+        self.__order_book.complete(order['id'])
+
+        # Add this to the executed orders
+        executed = {
+            'id': index['id'],
+            'executed_time': self.time(),
+        }
+        if fill_price != index['price']:
+            # The price gapped through the order
+            executed['executed_price'] = fill_price
+        self.executed_orders.append(executed)
 
     def evaluate_paper_trade(self, order, current_price):
         """
@@ -333,10 +349,11 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
             order (dict): Order dictionary to derive the order attributes
             current_price (float): The current price of the currency pair the limit order was created on
         """
+        maker_fee_rate = self.trading_rules(order['symbol']).maker_fee_rate
         funds = order['size'] * current_price
-        executed_value = funds - funds * float((self.get_fees(order['symbol'])["maker_fee_rate"]))
-        fill_fees = funds * float((self.get_fees(order['symbol'])["maker_fee_rate"]))
-        fill_size = order['size'] - order['size'] * float((self.get_fees(order['symbol'])["maker_fee_rate"]))
+        executed_value = funds - funds * maker_fee_rate
+        fill_fees = funds * maker_fee_rate
+        fill_size = order['size'] - order['size'] * maker_fee_rate
 
         return order, funds, executed_value, fill_fees, fill_size
 
@@ -373,11 +390,11 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
         price = self.get_price(symbol)
         funds = price*size
 
-        market_limits = self.get_order_filter(symbol)
+        rules = self.trading_rules(symbol)
 
-        min_size = market_limits['market_order']["base_min_size"]
+        min_size = rules.market_base_min
 
-        max_size = market_limits['market_order']["base_max_size"]
+        max_size = rules.market_base_max
 
         if size < min_size:
             raise InvalidOrder(f"Size is too small. Minimum is: {min_size}. You requested {size}.")
@@ -385,24 +402,19 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
         if size > max_size:
             raise InvalidOrder(f"Size is too large. Maximum is: {max_size}. You requested {size}.")
 
-        base_increment = market_limits['market_order']['base_increment']
-        base_decimals = self.__get_decimals(base_increment)
+        base_increment = rules.market_base_increment
+        base_decimals = rules.market_base_decimals
 
         # Test if funds has more decimals than the increment. The increment is the maximum resolution of the quote.
         if self.should_auto_trunc:
             size = utils.trunc(size, base_decimals)
-        elif self.__get_decimals(size) > base_decimals:
+        elif exceeds_decimals(size, base_decimals):
             raise InvalidOrder("Size resolution is too high, the highest resolution allowed for this symbol is: " +
                                str(base_increment) + ". You specified " + str(size) +
                                ". Try using blankly.trunc(size, decimal_number) to match the exchange resolution.")
 
-        if self.get_exchange_type() == 'alpaca':
-            # This could break, but there appears that 10 decimals is about right for alpaca
-            quantity_decimals = 10
-            shortable = market_limits['exchange_specific']['shortable']
-        else:
-            shortable = False
-            quantity_decimals = self.__get_decimals(market_limits['limit_order']['base_increment'])
+        quantity_decimals = rules.quantity_decimals
+        shortable = rules.shortable
 
         order = {
             'size': size,
@@ -413,7 +425,7 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
         qty = size
 
         # Test the purchase
-        self.local_account.test_trade(symbol, side, qty, price, market_limits['market_order']["quote_increment"],
+        self.local_account.test_trade(symbol, side, qty, price, rules.market_quote_increment,
                                       quantity_decimals,
                                       (shortable and self.__enable_shorting) or self.__force_shorting,
                                       calculate_margin=self.__calculate_margin)
@@ -445,17 +457,15 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
             'exchange_specific': {}
         }
         response = utils.isolate_specific(needed, response)
-        self.paper_trade_orders.append(response)
+        self.__order_book.add(response)
         # Identify the trade also by exchange
         if self.backtesting:
-            self.paper_trade_orders[-1]['exchange'] = self.get_exchange_type()
+            response['exchange'] = self.get_exchange_type()
 
         if side == "buy":
             self.local_account.trade_local(symbol=symbol,
                                            side=side,
-                                           base_delta=utils.trunc(qty -
-                                                                  qty *
-                                                                  float((self.get_fees(symbol)["taker_fee_rate"])),
+                                           base_delta=utils.trunc(qty - qty * rules.taker_fee_rate,
                                                                   quantity_decimals),
                                            # Gain filled size after fees
                                            quote_delta=utils.trunc(funds * -1,
@@ -466,9 +476,7 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
                                            side=side,
                                            base_delta=utils.trunc(float(qty * -1), quantity_decimals),
                                            # Loose size before any fees
-                                           quote_delta=utils.trunc(funds - funds *
-                                                                   float((self.get_fees(symbol)[
-                                                                       "taker_fee_rate"])),
+                                           quote_delta=utils.trunc(funds - funds * rules.taker_fee_rate,
                                                                    base_decimals),  # Gain executed value after fees
                                            quote_resolution=base_decimals, base_resolution=quantity_decimals)
         else:
@@ -520,10 +528,10 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
         }
         creation_time = self.time()
 
-        order_filter = self.get_order_filter(symbol)
+        rules = self.trading_rules(symbol)
 
-        min_base = float(order_filter['limit_order']["base_min_size"])
-        max_base = float(order_filter['limit_order']["base_max_size"])
+        min_base = rules.limit_base_min
+        max_base = rules.limit_base_max
 
         if size < min_base:
             raise InvalidOrder("Order quantity is too small. Minimum is: " + str(min_base))
@@ -531,8 +539,9 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
         if size > max_base:
             raise InvalidOrder("Order quantity is too large. Maximum is: " + str(max_base))
 
-        min_price = float(order_filter['limit_order']["min_price"])
-        max_price = float(order_filter['limit_order']["max_price"])
+        # Only binance needs the current price to find the allowed band
+        current_price = self.get_price(symbol) if rules.limit_multiplier_down is not None else None
+        min_price, max_price = rules.price_limits(current_price)
 
         if price < min_price:
             raise InvalidOrder("Limit price is too small. Minimum is: " + str(min_price))
@@ -542,21 +551,21 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
 
         # Check if the passed parameters are more accurate than either of the max base resolution or max price
         # resolution
-        price_increment = order_filter['limit_order']['price_increment']
-        price_increment_decimals = self.__get_decimals(price_increment)
+        price_increment = rules.price_increment
+        price_increment_decimals = rules.price_decimals
 
         if self.should_auto_trunc:
             price = utils.trunc(price, price_increment_decimals)
-        elif self.__get_decimals(price) > price_increment_decimals:
+        elif exceeds_decimals(price, price_increment_decimals):
             raise InvalidOrder("Fund resolution is too high, minimum resolution is: " + str(price_increment) +
                                ". Try using blankly.trunc(size, decimal_number) to match the exchange resolution.")
 
-        base_increment = order_filter['limit_order']['base_increment']
-        base_decimals = self.__get_decimals(base_increment)
+        base_increment = rules.limit_base_increment
+        base_decimals = rules.limit_base_decimals
 
         if self.should_auto_trunc:
             size = utils.trunc(size, base_decimals)
-        elif self.__get_decimals(size) > base_decimals:
+        elif exceeds_decimals(size, base_decimals):
             raise InvalidOrder("Fund resolution is too high, minimum resolution is: " + str(base_increment) +
                                '. Try using blankly.trunc(size, decimal_number) to match the exchange resolution.')
 
@@ -596,9 +605,9 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
             'exchange_specific': {}
         }
         response = utils.isolate_specific(needed, response)
-        self.paper_trade_orders.append(response)
+        self.__order_book.add(response)
         # Identify the trade also by exchange
-        self.paper_trade_orders[-1]['exchange'] = self.get_exchange_type()
+        response['exchange'] = self.get_exchange_type()
 
         base = utils.get_base_asset(symbol)
         quote = utils.get_quote_asset(symbol)
@@ -629,16 +638,10 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
         This block could potentially work for both exchanges
         """
         del symbol
-        order_index = None
-        for i in range(len(self.paper_trade_orders)):
-            index = self.paper_trade_orders[i]
-            if index['status'] == 'pending' and index['id'] == order_id:
-                order_index = i
-                break
+        order = self.__order_book.cancel(order_id)
 
-        if order_index is not None:
+        if order is not None:
             # Now that we found it make sure that we move the funds back on available
-            order = self.paper_trade_orders[order_index]
             side = order['side']
             size = order['size']
             symbol = order['symbol']
@@ -668,26 +671,19 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
             # Make sure to save this as a canceled order just before closing it
             # Make sure to write in the time also
             self.canceled_orders.append({
-                'id': self.paper_trade_orders[order_index]['id'],
+                'id': order['id'],
                 'canceled_time': self.time()
             })
 
-            del self.paper_trade_orders[order_index]
             return {"order_id": order_id}
         else:
             raise APIException("Order ID not found.")
 
     def get_open_orders(self, symbol=None):
-        open_orders = []
-        for i in self.paper_trade_orders:
-            if i["status"] == "pending":
-                open_orders.append(i)
-        return open_orders
+        return self.__order_book.open_orders
 
     def get_order(self, symbol, order_id) -> dict:
-        for i in self.paper_trade_orders:
-            if i["id"] == order_id:
-                return i
+        return self.__order_book.get(order_id)
 
     def get_products(self):
         def get_keyless_products():
@@ -737,6 +733,37 @@ class PaperTradeInterface(ExchangeInterface, BacktestingWrapper):
         else:
             return self.calls.get_product_history(symbol, epoch_start, epoch_stop, resolution)
 
+    def trading_rules(self, symbol) -> TradingRules:
+        """
+        Get the cached order filter & fee numbers used to place and fill orders on a symbol
+        """
+        try:
+            return self.__trading_rules[symbol]
+        except KeyError:
+            if symbol not in self.get_order_filter_cache:
+                self.get_order_filter_cache[symbol] = self.calls.get_order_filter(symbol)
+            rules = TradingRules.create(self.get_order_filter_cache[symbol], self.get_fees(symbol),
+                                        self.get_exchange_type())
+            self.__trading_rules[symbol] = rules
+            return rules
+
+    def invalidate_trading_rules(self, symbol: str = None):
+        """
+        Re-query the order filter & fees of a symbol (or every symbol) the next time an order is placed. Use this
+        when paper trading live and the exchange may have changed them.
+        """
+        if symbol is None:
+            self.__trading_rules = {}
+            self.get_order_filter_cache = {}
+            self.get_fees_cache = {}
+        else:
+            self.__trading_rules.pop(symbol, None)
+            self.get_order_filter_cache.pop(symbol, None)
+            if self.get_exchange_type() in ('okx', 'binance'):
+                self.get_fees_cache.pop(symbol, None)
+            else:
+                self.get_fees_cache = {}
+
     def get_order_filter(self, symbol):
         # Don't re-query order filter if its cached
         if symbol not in self.get_order_filter_cache:
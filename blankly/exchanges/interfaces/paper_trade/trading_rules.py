@@ -0,0 +1,119 @@
+"""
+    Per-symbol order filters & fees resolved once for the paper trade order path
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import typing
+
+from blankly.utils.utils import count_decimals
+
+
+def exceeds_decimals(number: float, decimals: int) -> bool:
+    """
+    Check if a number has more decimals than allowed, giving the same answer as count_decimals(number) > decimals.
+
+    Numbers that are already at the resolution are answered with a round() instead of parsing a Decimal.
+    """
+    # Large floats are written in exponent form & whole floats such as 100.0 count as one decimal, so leave those to
+    #  count_decimals
+    if decimals > 0 and -1e16 < number < 1e16 and round(number, decimals) == number:
+        return False
+    return count_decimals(number) > decimals
+
+
+class TradingRules(typing.NamedTuple):
+    """
+    The increments, resolutions, size & price limits and fee rates for ordering a symbol, taken from its order filter
+    and fees.
+    """
+    market_base_min: float
+    market_base_max: float
+    market_base_increment: float
+    market_base_decimals: int
+    # This is passed straight through to the local account as the quote resolution of market orders
+    market_quote_increment: float
+    # The resolution of the base when filling orders
+    quantity_decimals: int
+    # The resolution of the quote when filling limit orders
+    quote_decimals: int
+
+    limit_base_min: float
+    limit_base_max: float
+    limit_base_increment: float
+    limit_base_decimals: int
+    limit_min_price: float
+    limit_max_price: float
+    price_increment: float
+    price_decimals: int
+    # Binance limits prices to a band around the current price
+    limit_multiplier_down: typing.Optional[float]
+    limit_multiplier_up: typing.Optional[float]
+
+    shortable: bool
+    maker_fee_rate: float
+    taker_fee_rate: float
+
+    @classmethod
+    def create(cls, order_filter: dict, fees: dict, exchange_type: str) -> 'TradingRules':
+        market = order_filter['market_order']
+        limit = order_filter['limit_order']
+        exchange_specific = order_filter.get('exchange_specific', {})
+
+        if exchange_type == 'binance':
+            multiplier_down = exchange_specific['limit_multiplier_down']
+            multiplier_up = exchange_specific['limit_multiplier_up']
+        else:
+            multiplier_down = multiplier_up = None
+
+        if exchange_type == 'alpaca':
+            # This could break, but there appears that 10 decimals is about right for alpaca
+            quantity_decimals = 10
+            shortable = exchange_specific['shortable']
+        else:
+            quantity_decimals = count_decimals(limit['base_increment'])
+            shortable = False
+
+        return cls(
+            market_base_min=market['base_min_size'],
+            market_base_max=market['base_max_size'],
+            market_base_increment=market['base_increment'],
+            market_base_decimals=count_decimals(market['base_increment']),
+            market_quote_increment=market['quote_increment'],
+            quantity_decimals=quantity_decimals,
+            quote_decimals=count_decimals(market['quote_increment']),
+            limit_base_min=float(limit['base_min_size']),
+            limit_base_max=float(limit['base_max_size']),
+            limit_base_increment=limit['base_increment'],
+            limit_base_decimals=count_decimals(limit['base_increment']),
+            limit_min_price=float(limit['min_price']) if multiplier_down is None else None,
+            limit_max_price=float(limit['max_price']) if multiplier_up is None else None,
+            price_increment=limit['price_increment'],
+            price_decimals=count_decimals(limit['price_increment']),
+            limit_multiplier_down=multiplier_down,
+            limit_multiplier_up=multiplier_up,
+            shortable=shortable,
+            maker_fee_rate=float(fees['maker_fee_rate']),
+            taker_fee_rate=float(fees['taker_fee_rate'])
+        )
+
+    def price_limits(self, price: typing.Optional[float]) -> typing.Tuple[float, float]:
+        """
+        The (minimum, maximum) limit price allowed when the symbol is at this price. The price is only needed when the
+        limits are multipliers of it.
+        """
+        if self.limit_multiplier_down is None:
+            return self.limit_min_price, self.limit_max_price
+        return self.limit_multiplier_down * price, self.limit_multiplier_up * price
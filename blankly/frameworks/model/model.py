@@ -48,10 +48,40 @@ class Model(abc.ABC):
         self.__backtester: BackTestController = self.backtester
 
     def backtest(self, args, initial_values: dict = None, settings_path: str = None, kwargs=None) -> BacktestResult:
-        # Construct the backtest controller
         if kwargs is None:
             kwargs = {}
 
+        return self.__paper_trade(lambda exchange: self.__backtester.run(args,
+                                                                          initial_account_values=initial_values,
+                                                                          exchange=exchange,
+                                                                          backtest_settings_path=settings_path,
+                                                                          **kwargs
+                                                                          ))
+
+    def backtest_vectorized(self, signal: typing.Callable, symbols: list, initial_values: dict = None,
+                            settings_path: str = None, kwargs=None) -> BacktestResult:
+        if kwargs is None:
+            kwargs = {}
+
+        return self.__paper_trade(lambda exchange: self.__backtester.run_vectorized(
+            signal, symbols, exchange=exchange, initial_account_values=initial_values,
+            backtest_settings_path=settings_path, **kwargs))
+
+    def preload_backtest_prices(self, settings_path: str = None, kwargs=None):
+        """
+        Sync the backtest prices once so that the following backtests reuse them
+        """
+        if kwargs is None:
+            kwargs = {}
+
+        self.__paper_trade(lambda exchange: self.__backtester.preload_prices(exchange,
+                                                                             backtest_settings_path=settings_path,
+                                                                             **kwargs))
+
+    def __paper_trade(self, run_backtest: typing.Callable) -> BacktestResult:
+        """
+        Swap in a paper trade exchange while the backtest controller runs
+        """
         # Toggle backtesting
         self.is_backtesting = True
         if isinstance(self.__exchange, Exchange):
@@ -61,12 +91,7 @@ class Model(abc.ABC):
         else:
             raise NotImplementedError
         self.interface = self.__exchange.interface
-        backtest = self.__backtester.run(args,
-                                         initial_account_values=initial_values,
-                                         exchange=self.__exchange,
-                                         backtest_settings_path=settings_path,
-                                         **kwargs
-                                         )
+        backtest = run_backtest(self.__exchange)
 
         self.is_backtesting = False
         self.__exchange = self.__exchange_cache
@@ -17,8 +17,10 @@
 """
 
 import time
+import typing
 
 from blankly.exchanges.interfaces.abc_exchange_interface import ABCExchangeInterface as Interface
+from blankly.indicators.batch import history_matrix
 from blankly.utils.utils import AttributeDict, format_with_new_line
 
 
@@ -53,6 +55,14 @@ class ScreenerState:
         """
         return time.time()
 
+    def history_matrix(self, to: typing.Union[str, int] = 200, resolution: typing.Union[str, float] = '1d',
+                       column: str = 'close'):
+        """
+        Get the history of every screened symbol as a symbols x time DataFrame, which can be passed to the indicators
+        in blankly.indicators.batch to evaluate every symbol at once
+        """
+        return history_matrix(self.interface, self.symbols, to, resolution, column)
+
     def notify(self, message=None) -> None:
         """
         Send the formatted results as an email
@@ -15,12 +15,17 @@
     You should have received a copy of the GNU Lesser General Public License
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
+import copy
+import heapq
+import math
 import threading
 import time
 import traceback
 import typing
 import warnings
 
+import numpy as np
+
 import blankly
 from blankly.exchanges.abc_base_exchange import ABCBaseExchange
 from blankly.exchanges.exchange import Exchange
@@ -30,6 +35,9 @@ from blankly.exchanges.strategy_logger import StrategyLogger
 from blankly.frameworks.model.model import Model
 from blankly.frameworks.strategy.strategy_base import StrategyBase, EventType
 from blankly.frameworks.strategy import StrategyState
+from blankly.frameworks.strategy.sweep import parameter_grid, run_sweep, walk_forward_windows, summarize_windows, \
+    WalkForwardResult
+from blankly.utils.time_builder import time_interval_to_seconds
 from blankly.utils.utils import info_print
 
 
@@ -94,6 +102,8 @@ class StrategyStructure(Model):
         elif type_ == EventType.price_event:
             data = self.interface.get_price(symbol)
             args = [data, symbol, state]
+            if event['indicators']:
+                self.__update_indicators(event, data)
         elif type_ == EventType.scheduled_event:
             args = [state]
         elif type_ == EventType.arbitrage_event:
@@ -123,34 +133,88 @@ class StrategyStructure(Model):
         else:
             return
 
+        profiler = self.backtester.profiler if self.is_backtesting else None
+        if profiler is not None and profiler.detailed:
+            start = time.perf_counter()
         try:
             callback(*args)
         except Exception:
             traceback.print_exc()
+        if profiler is not None and profiler.detailed:
+            # Scheduled events don't have a symbol
+            name = f'run/{type_.value}'
+            if symbol:
+                name += ' ' + (', '.join(symbol) if isinstance(symbol, list) else symbol)
+            profiler.add(name, time.perf_counter() - start)
+
+    def __update_indicators(self, event: dict, price: float):
+        state = event['state']  # type: StrategyState
+        if self.is_backtesting:
+            # Like the price cursor, read the first of the event's own bars at or after the current price's time
+            symbol = event['symbol']
+            times = event['indicator_times']
+            price_time = self.backtester.prices[symbol]['time'][self.backtester.price_cursors[symbol].index]
+            row = min(int(np.searchsorted(times, price_time)), len(times) - 1)
+            for name, precomputed in event['precomputed_indicators'].items():
+                state.indicators[name] = precomputed.value(row)
+        else:
+            for name, indicator in event['indicators'].items():
+                state.indicators[name] = indicator.update(price)
+
+    def __precompute_indicators(self, events: list):
+        """
+        Compute the declared indicators over the bars of their event's symbol & resolution, which are the prices the
+        event samples. Other events on the symbol can add bars at other resolutions to the backtest's prices, which
+        would otherwise end up in the indicator. Each value only depends on bars up to its own, so reading the bar of
+        the current price doesn't look ahead.
+        """
+        for event in events:
+            if event.get('indicators'):
+                bars = self.interface.full_prices[event['symbol']][int(event['resolution'])]
+                event['indicator_times'] = bars['time'].to_numpy()
+                prices = bars[self.backtester.use_price]
+                event['precomputed_indicators'] = {name: indicator.precompute(prices)
+                                                   for name, indicator in event['indicators'].items()}
 
     def run_price_events(self, events: list):
+        batch_events = self.backtester.preferences['settings']['batch_simultaneous_events']
+
         # run all events once at start
-        for event in events:
+        # The queue is ordered by (next_run, order). Events that tie on time run in the order they were added at first,
+        #  and after that a rescheduled event always runs ahead of anything already waiting at that same time
+        queue = []
+        for order, event in enumerate(events):
             event['next_run'] = self.backtester.initial_time
+            queue.append((event['next_run'], order, event))
+        heapq.heapify(queue)
+        reschedule_order = 0
 
         while self.has_data:
-            events.sort(key=lambda d: d['next_run'])
-            event = events[0]
+            next_run, _, event = heapq.heappop(queue)
+            batch = [event]
+            if batch_events:
+                # Pull everything at this timestamp so the clock only has to advance once
+                while queue and queue[0][0] == next_run:
+                    batch.append(heapq.heappop(queue)[2])
 
             # Sleep the difference
-            self.sleep(event['next_run'] - self.time)
-
-            # Run the event
-            next_run = self.rest_event(**event)
-            if next_run:
-                # if rest_event returns something, run this event again at that time
-                # this implies the event did *not* run
-                event['next_run'] = next_run
-                event['was_delayed'] = True
-            else:
-                # otherwise, the event ran. we can revalue account and re-run normally @ `resolution` intervals
-                self.backtester.value_account()
-                event['next_run'] += event['resolution']
+            self.sleep(next_run - self.time)
+
+            for event in batch:
+                # Run the event
+                next_run = self.rest_event(**event)
+                if next_run:
+                    # if rest_event returns something, run this event again at that time
+                    # this implies the event did *not* run
+                    event['next_run'] = next_run
+                    event['was_delayed'] = True
+                else:
+                    # otherwise, the event ran. we can revalue account and re-run normally @ `resolution` intervals
+                    self.backtester.value_account()
+                    event['next_run'] += event['resolution']
+
+                reschedule_order -= 1
+                heapq.heappush(queue, (event['next_run'], reschedule_order, event))
 
     def main(self, args):
         if self.is_backtesting:
@@ -170,6 +234,7 @@ class StrategyStructure(Model):
         for scheduler in self.schedulers:
             events.append(scheduler.get_kwargs())
 
+        self.__precompute_indicators(events)
         self.run_price_events(events)
 
     def __run_init(self):
@@ -288,10 +353,23 @@ class Strategy(StrategyBase):
                 cache_location: str = './price_caches'
                     Set a location for the price cache csv's to be written to
 
+                cache_format: str = 'csv'
+                    The file format used for the price cache. Set this to 'parquet' (requires pyarrow) to store typed
+                        columns and only read the requested time window. Existing csv caches are migrated automatically.
+
                 continuous_caching: bool
                     Utilize the advanced price caching system built into the backtest. Automatically aggregate and prune
                     downloaded data.
 
+                compact_cache_after_sync: bool = False
+                    After the prices are synced, merge overlapping or touching cache segments for the backtested
+                        symbols into a single file each. This can also be run with `blankly cache compact`.
+
+                download_threads: int = 4
+                    The number of price history ranges that are downloaded at once when the cache is missing data.
+                        Requests are still throttled to each exchange's documented rate limits. Set to 1 to download
+                        sequentially.
+
                 resample_account_value_for_metrics: str or bool = '1d' or False
                     Because backtest data can be input at a variety of resolutions, account value often needs to be
                         recalculated at consistent intervals for use in metrics & indicators.
@@ -310,6 +388,28 @@ class Strategy(StrategyBase):
 
                 risk_free_return_rate: float = 0.0
                     Set this to be the theoretical rate of return with no risk
+
+                batch_simultaneous_events: bool = False
+                    Run every event scheduled for the same time after a single advance of the backtest clock. Limit
+                        orders are then evaluated once per timestamp rather than once per event.
+
+                intrabar_fills: bool = False
+                    Fill limit & stop orders when the high or low of the following bars crosses them instead of only
+                        comparing against the use_price. This allows realistic fills at the strategy's own resolution.
+                        Orders crossed by the open fill at the open.
+
+                intrabar_path: str = 'nearest'
+                    The order the high & low of a bar are assumed to be reached in when using intrabar_fills.
+                        'nearest' visits whichever is closer to the open first, 'high_first' and 'low_first' always
+                        visit that side first (use 'low_first' for a pessimistic long-only backtest).
+
+                profile_backtest: bool = False
+                    Time every limit evaluation, account valuation & user callback (by event type and symbol) and
+                        sample the stack while the backtest runs, then print the report. The setup & reporting phases
+                        are always timed and available with result.get_profile().
+
+                profile_sample_interval: float = 0.005
+                    Seconds between stack samples when profile_backtest is enabled. Set to 0 to only record timings.
         """
         self.setup_model()
         if len(self.orderbook_websockets) != 0 or len(self.ticker_websockets) != 0:
@@ -321,6 +421,208 @@ class Strategy(StrategyBase):
         self.model.teardown()
         return res
 
+    def backtest_vectorized(self,
+                            signal: typing.Callable,
+                            symbols: typing.Union[str, list],
+                            resolution: typing.Union[str, int, float],
+                            to: str = None,
+                            initial_values: dict = None,
+                            start_date: typing.Union[str, float, int] = None,
+                            end_date: typing.Union[str, float, int] = None,
+                            settings_path: str = None,
+                            **kwargs
+                            ) -> BacktestResult:
+        """
+        Backtest a signal by computing every position at once rather than running the strategy's events. This is
+        much faster for research on strategies whose decisions don't depend on how their orders were filled.
+
+        The prices are synced from the same cache as backtest(), and the result has the same account history and
+        metrics. Orders are filled at the `use_price` of each row with the exchange's taker fee, but they aren't
+        checked against the account balance or the exchange's minimum sizes & increments.
+
+        Args:
+            signal: Function which is given (prices, symbol) and returns the base position to hold at each row. The
+                prices have a numpy array per column such as prices['close']. NaN positions keep the previous one.
+                Example: lambda prices, symbol: np.where(prices['close'] > prices['open'], 1, 0)
+            symbols (str or list): The symbols to backtest
+            resolution (str or number): Resolution of the prices such as '1h' or 3600
+            to (str): Declare an amount of time before now to backtest from: ex: '5y' or '10h'
+            initial_values (dict): Dictionary of initial value sizes (i.e { 'BTC': 3, 'USD': 5650}).
+            start_date (str): Override argument "to" by specifying a start date such as "03/06/2018".
+            end_date (str): End the backtest at a date such as "03/06/2018".
+            settings_path (str): Path to the backtest.json file.
+
+            Keyword Arguments:
+                **Use these to override parameters in the backtest.json file, see backtest()**
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+
+        for symbol in symbols:
+            self.model.backtester.add_prices(to=to, start_date=start_date, stop_date=end_date, symbol=symbol,
+                                             resolution=resolution)
+
+        return self.model.backtest_vectorized(signal, symbols, initial_values=initial_values,
+                                              settings_path=settings_path, kwargs=kwargs)
+
+    def backtest_sweep(self,
+                       param_grid: typing.Union[dict, list],
+                       processes: int = None,
+                       to: str = None,
+                       initial_values: dict = None,
+                       start_date: typing.Union[str, float, int] = None,
+                       end_date: typing.Union[str, float, int] = None,
+                       settings_path: str = None,
+                       callback: typing.Callable[[dict, dict], None] = None,
+                       **kwargs):
+        """
+        Backtest this strategy once for every set of parameters, such as a grid search over indicator periods.
+
+        The prices are synced once and shared with worker processes which run the backtests in parallel. Each
+        parameter set is written into the variables of every event before its init is called, so read them with
+        state.variables['period'] in the events.
+
+        Args:
+            param_grid (dict or list): Dictionary of parameter name to the values to try, every combination is run.
+                Example: {'period': [10, 20, 50], 'threshold': [0.5, 1]}. A list of dictionaries runs exactly those
+                parameter sets.
+            processes (int): The number of worker processes, defaults to the number of CPUs. The backtests run one
+                after another in this process on platforms other than Linux, where workers can't be forked safely.
+            to (str): Declare an amount of time before now to backtest from: ex: '5y' or '10h'
+            initial_values (dict): Dictionary of initial value sizes (i.e { 'BTC': 3, 'USD': 5650}).
+            start_date (str): Override argument "to" by specifying a start date such as "03/06/2018".
+            end_date (str): End the backtest at a date such as "03/06/2018".
+            settings_path (str): Path to the backtest.json file.
+            callback: Called with (parameters, metrics) as each backtest finishes so that partial results can be
+                used before the sweep is done.
+
+            Keyword Arguments:
+                **Use these to override parameters in the backtest.json file, see backtest(). The GUI and progress
+                bar are off unless they are set here.**
+
+        Returns:
+            A pandas DataFrame with a row of parameters & metrics for each parameter set. Backtests that failed have
+                their exception in the 'error' column.
+        """
+        run_backtest = self.__preload_backtests(to, start_date, end_date, initial_values, settings_path, kwargs)
+        try:
+            return run_sweep(run_backtest, parameter_grid(param_grid), processes, callback)
+        finally:
+            self.model.backtester.clear_preloaded_prices()
+
+    def backtest_walk_forward(self,
+                              train: typing.Union[str, int, float],
+                              test: typing.Union[str, int, float],
+                              param_grid: typing.Union[dict, list] = None,
+                              objective: str = 'sharpe',
+                              step: typing.Union[str, int, float] = None,
+                              anchored: bool = False,
+                              processes: int = None,
+                              to: str = None,
+                              initial_values: dict = None,
+                              start_date: typing.Union[str, float, int] = None,
+                              end_date: typing.Union[str, float, int] = None,
+                              settings_path: str = None,
+                              callback: typing.Callable[[dict, dict], None] = None,
+                              **kwargs) -> WalkForwardResult:
+        """
+        Walk-forward analysis: split the backtest range into training windows each followed by a test window. For
+        each window the parameter set with the best in-sample objective is chosen and then backtested out-of-sample
+        on the test window.
+
+        The prices are synced once for the whole range and every window backtests a slice of them, with the windows
+        spread over worker processes. History requests in the events can still reach back before a window starts,
+        so indicators warm up from memory without loading any more data.
+
+        Args:
+            train (str or number): Length of each training window such as '90d', or in seconds
+            test (str or number): Length of each test window such as '30d', or in seconds
+            param_grid (dict or list): The parameter sets to choose from, see backtest_sweep(). Without this each
+                window is only backtested out-of-sample using the variables the events were created with.
+            objective (str): The metric which is maximized in-sample, such as 'sharpe', 'sortino' or 'cum_returns'
+            step (str or number): Time between the start of each test window, defaults to the test length
+            anchored (bool): Start every training window at the beginning of the range instead of rolling forward
+            processes (int): The number of worker processes, defaults to the number of CPUs
+            to (str): Declare an amount of time before now to backtest from: ex: '5y' or '10h'
+            initial_values (dict): Dictionary of initial value sizes (i.e { 'BTC': 3, 'USD': 5650}).
+            start_date (str): Override argument "to" by specifying a start date such as "03/06/2018".
+            end_date (str): End the backtest at a date such as "03/06/2018".
+            settings_path (str): Path to the backtest.json file.
+            callback: Called with (window, metrics) as each window finishes.
+
+            Keyword Arguments:
+                **Use these to override parameters in the backtest.json file, see backtest()**
+
+        Returns:
+            A WalkForwardResult with a `windows` DataFrame (times, chosen parameters, in-sample objective and
+                out-of-sample metrics of each window) and `metrics`, the mean out-of-sample metrics.
+        """
+        parameter_sets = parameter_grid(param_grid) if param_grid is not None else [{}]
+        run_backtest = self.__preload_backtests(to, start_date, end_date, initial_values, settings_path, kwargs)
+        backtester = self.model.backtester
+        windows = walk_forward_windows(backtester.user_start, backtester.user_stop,
+                                       time_interval_to_seconds(train), time_interval_to_seconds(test),
+                                       None if step is None else time_interval_to_seconds(step), anchored)
+
+        def run_window(window: dict) -> dict:
+            best_parameters, best_score = parameter_sets[0], None
+            if len(parameter_sets) > 1:
+                backtester.set_backtest_window(window['train_start'], window['train_stop'])
+                for parameters in parameter_sets:
+                    score = run_backtest(parameters)[objective]
+                    if isinstance(score, (int, float)) and not math.isnan(score) and \
+                            (best_score is None or score > best_score):
+                        best_parameters, best_score = parameters, score
+
+            backtester.set_backtest_window(window['test_start'], window['test_stop'])
+            metrics = run_backtest(best_parameters)
+            return {**best_parameters, f'in_sample_{objective}': best_score, **metrics}
+
+        try:
+            results = run_sweep(run_window, windows, processes, callback)
+        finally:
+            backtester.clear_preloaded_prices()
+
+        metric_names = [name for name in results.columns if name not in windows[0] and name not in
+                        parameter_sets[0] and name != f'in_sample_{objective}' and name != 'error']
+        return WalkForwardResult(results, summarize_windows(results, metric_names))
+
+    def __preload_backtests(self, to, start_date, end_date, initial_values, settings_path,
+                            kwargs: dict) -> typing.Callable[[dict], dict]:
+        """
+        Sync the prices once and create a function which backtests a set of parameters and returns the metrics
+        """
+        kwargs.setdefault('GUI_output', False)
+        kwargs.setdefault('show_progress_during_backtest', False)
+
+        self.setup_model()
+        self.__add_prices(to, start_date, end_date)
+        self.model.preload_backtest_prices(settings_path=settings_path, kwargs=kwargs)
+
+        # Every run starts from the variables the events were created with
+        initial_variables = [(scheduler.get_kwargs()['variables'],
+                              copy.deepcopy(dict(scheduler.get_kwargs()['variables'])))
+                             for scheduler in self.schedulers]
+
+        def reset_variables(parameters: dict):
+            for variables, initial in initial_variables:
+                variables.clear()
+                variables.update(copy.deepcopy(initial))
+                variables.update(parameters)
+
+        def run_backtest(parameters: dict) -> dict:
+            reset_variables(parameters)
+            try:
+                result = self.model.backtest(args={}, initial_values=initial_values, settings_path=settings_path,
+                                             kwargs=dict(kwargs))
+                self.model.teardown()
+            finally:
+                # Runs in this process would otherwise leave the events with the last run's variables
+                reset_variables({})
+            return {name: metric['value'] for name, metric in result.metrics.items()}
+
+        return run_backtest
+
     def __add_prices(self, to, start_date, end_date):
         for scheduler in self.schedulers:
             event_element = scheduler.get_kwargs()
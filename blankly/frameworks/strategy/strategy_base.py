@@ -16,6 +16,7 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import copy
 import threading
 import typing
 import enum
@@ -26,6 +27,7 @@ from blankly.exchanges.abc_base_exchange import ABCBaseExchange
 from blankly.exchanges.interfaces.abc_base_exchange_interface import ABCBaseExchangeInterface
 from blankly.exchanges.interfaces.paper_trade.backtest_result import BacktestResult
 from blankly.frameworks.strategy.strategy_state import StrategyState
+from blankly.indicators.stream import StreamingIndicator
 from blankly.utils.time_builder import time_interval_to_seconds
 from blankly.utils.utils import AttributeDict
 
@@ -82,7 +84,7 @@ class StrategyBase:
 
     def add_price_event(self, callback: typing.Callable, symbol: str, resolution: typing.Union[str, float],
                         init: typing.Callable = None, teardown: typing.Callable = None, synced: bool = False,
-                        variables: dict = None):
+                        variables: dict = None, indicators: dict = None):
         """
         Add Price Event. This will provide you with an updated price every time the callback is run
         Args:
@@ -95,9 +97,21 @@ class StrategyBase:
                 positions, writing or cleaning up data or anything else useful
             synced: Sync the function to
             variables: A dictionary to initialize the state's internal values
+            indicators: A dictionary of names to streaming indicators of the price, such as
+                {'rsi': blankly.indicators.stream.RSI(14)}. Their current values are in state.indicators. Backtests
+                compute each one over the whole price series before running, while live strategies update them with
+                every new price. Each event keeps its own copy, so the same dictionary can be passed for every symbol.
         """
+        if indicators:
+            for name, indicator in indicators.items():
+                if not isinstance(indicator, StreamingIndicator):
+                    raise TypeError(f"The indicator {name} must be a blankly.indicators.stream indicator.")
+                if len(indicator.inputs) != 1:
+                    raise ValueError(f"The indicator {name} takes {', '.join(indicator.inputs)}, but price events "
+                                     f"only have the price.")
         self.__custom_price_event(callback=callback, symbol=symbol, resolution=resolution, init=init, synced=synced,
-                                  teardown=teardown, variables=variables, type_=EventType.price_event)
+                                  teardown=teardown, variables=variables, type_=EventType.price_event,
+                                  indicators=indicators)
 
     def add_scheduled_event(self, callback: typing.Callable, resolution: typing.Union[str, float],
                             init: typing.Callable = None, teardown: typing.Callable = None,
@@ -161,7 +175,7 @@ class StrategyBase:
                              resolution: typing.Union[str, float] = None,
                              init: typing.Callable = None,
                              synced: bool = False,
-                             teardown: typing.Callable = None, variables: dict = None):
+                             teardown: typing.Callable = None, variables: dict = None, indicators: dict = None):
         """
         Add Price Event
         Args:
@@ -175,6 +189,7 @@ class StrategyBase:
                 positions, writing or cleaning up data or anything else useful
             synced: Sync the function to
             variables: Initial dictionary to write into the state variable
+            indicators: Streaming indicators to keep up to date in state.indicators
         """
         # Make sure variables is always an empty dictionary if None
         if variables is None:
@@ -196,7 +211,9 @@ class StrategyBase:
                               type=type_,
                               init=init,
                               teardown=teardown,
-                              symbol=symbol)
+                              symbol=symbol,
+                              # Copied so that events declared with the same indicators don't share their state
+                              indicators=copy.deepcopy(indicators) if indicators else {})
         )
 
         # Export a new symbol to the backend
@@ -16,7 +16,11 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import typing
+
 from blankly.exchanges.interfaces.abc_exchange_interface import ABCExchangeInterface as Interface
+from blankly.indicators.batch import history_matrix
+from blankly.utils.ring_buffer import PriceHistory
 from blankly.utils.utils import AttributeDict, get_base_asset, get_quote_asset, format_with_new_line, pretty_print_json
 
 
@@ -31,6 +35,8 @@ class StrategyState:
         self.variables = variables
         self.resolution = resolution
         self.symbol = symbol
+        # The current values of the indicators declared on the event
+        self.indicators = AttributeDict()
 
         # Base & quotes are conditionally defined
         self.base_asset = None
@@ -41,6 +47,9 @@ class StrategyState:
 
     @staticmethod
     def append_bar(history_reference, new_bar: dict):
+        if isinstance(history_reference, PriceHistory):
+            history_reference.append_bar(new_bar)
+            return
         history_reference['open'].append(new_bar['open'])
         history_reference['high'].append(new_bar['high'])
         history_reference['low'].append(new_bar['low'])
@@ -55,6 +64,14 @@ class StrategyState:
         """
         return self.strategy.interface
 
+    def history_matrix(self, to: typing.Union[str, int] = 200, column: str = 'close'):
+        """
+        Get the history of the event's symbols at its resolution as a symbols x time DataFrame, which can be passed to
+        the indicators in blankly.indicators.batch to evaluate an arbitrage event's symbols at once
+        """
+        symbols = self.symbol if isinstance(self.symbol, list) else [self.symbol]
+        return history_matrix(self.interface, symbols, to, self.resolution, column)
+
     @property
     def time(self) -> float:
         """
@@ -0,0 +1,160 @@
+"""
+    Run many backtests of one strategy across a pool of processes, for parameter sweeps & walk-forward analysis
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import itertools
+import multiprocessing
+import os
+import sys
+import traceback
+import typing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+# The backtest being swept. Workers are forked after this is set, so they inherit it along with any prices it has
+#  already loaded instead of receiving a pickled copy.
+_sweep_run = None
+
+
+def parameter_grid(param_grid: typing.Union[dict, list]) -> typing.List[dict]:
+    """
+    Expand {'period': [10, 20], 'threshold': [1, 2]} into every combination of the values. A list of dictionaries
+    is used as the parameter sets directly.
+    """
+    if isinstance(param_grid, dict):
+        names = list(param_grid.keys())
+        return [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+    return [dict(parameters) for parameters in param_grid]
+
+
+class WalkForwardResult(typing.NamedTuple):
+    # A row for each window with its times, the parameters chosen in-sample and the out-of-sample metrics
+    windows: pd.DataFrame
+    # The mean of each out-of-sample metric across the windows
+    metrics: dict
+
+
+def walk_forward_windows(start: float, stop: float, train: float, test: float, step: float = None,
+                         anchored: bool = False) -> typing.List[dict]:
+    """
+    Split a time range into training windows each followed by an out-of-sample test window.
+
+    Args:
+        start: Epoch time of the beginning of the range
+        stop: Epoch time of the end of the range
+        train: Length of each training window in seconds
+        test: Length of each test window in seconds
+        step: Seconds between the start of each test window, defaults to the test length so tests don't overlap
+        anchored: Keep every training window starting at the beginning of the range instead of rolling it forward
+    """
+    if step is None:
+        step = test
+    if train < 0 or test <= 0 or step <= 0:
+        raise ValueError("The test window & step must be longer than zero and the train window can't be negative.")
+
+    windows = []
+    test_start = start + train
+    while test_start + test <= stop:
+        windows.append({
+            'train_start': start if anchored else test_start - train,
+            'train_stop': test_start,
+            'test_start': test_start,
+            'test_stop': test_start + test
+        })
+        test_start += step
+
+    if len(windows) == 0:
+        raise ValueError(f"The backtest range of {stop - start} seconds is too short for a {train} second train "
+                         f"window and a {test} second test window.")
+    return windows
+
+
+def summarize_windows(windows: pd.DataFrame, metric_names: typing.Iterable[str]) -> dict:
+    """
+    Average each metric over the windows, ignoring windows where it failed to compute
+    """
+    summary = {}
+    for name in metric_names:
+        if name in windows:
+            summary[name] = pd.to_numeric(windows[name], errors='coerce').mean()
+    return summary
+
+
+def _run_parameters(index: int, parameters: dict) -> tuple:
+    try:
+        return index, _sweep_run(parameters), None
+    except Exception as e:
+        traceback.print_exc()
+        return index, None, f'{type(e).__name__}: {e}'
+
+
+def can_fork() -> bool:
+    # macOS also offers fork, but CPython defaults to spawn there because forking isn't safe with its system libraries.
+    #  Spawned workers would have to pickle the strategy, so sweeps only run in parallel on Linux.
+    return sys.platform.startswith('linux') and 'fork' in multiprocessing.get_all_start_methods()
+
+
+def run_sweep(run_backtest: typing.Callable[[dict], dict], parameter_sets: typing.List[dict],
+              processes: int = None, callback: typing.Callable[[dict, dict], None] = None) -> pd.DataFrame:
+    """
+    Call run_backtest once for each parameter set, spread over forked worker processes.
+
+    Args:
+        run_backtest: Function which runs one backtest with the given parameters and returns its metrics
+        parameter_sets: The parameters for each run
+        processes: The number of worker processes, defaults to the number of CPUs. Runs happen one after another in
+            this process if this is 1 or when not running on Linux.
+        callback: Called with (parameters, metrics) as each run finishes. Failed runs pass metrics with an 'error'.
+    Returns:
+        A dataframe with a row of parameters & metrics for each parameter set, in the order they were given
+    """
+    global _sweep_run
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(parameter_sets)))
+
+    rows: typing.List[typing.Optional[dict]] = [None] * len(parameter_sets)
+
+    def finish(index: int, metrics: typing.Optional[dict], error: typing.Optional[str]):
+        metrics = {'error': error} if metrics is None else metrics
+        rows[index] = {**parameter_sets[index], **metrics}
+        if callback is not None:
+            callback(parameter_sets[index], metrics)
+
+    _sweep_run = run_backtest
+    try:
+        if processes == 1 or not can_fork():
+            for index, parameters in enumerate(parameter_sets):
+                finish(*_run_parameters(index, parameters))
+        else:
+            with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('fork')) as pool:
+                futures = [pool.submit(_run_parameters, index, parameters)
+                           for index, parameters in enumerate(parameter_sets)]
+                try:
+                    # Results are handed back as soon as each run finishes
+                    for future in as_completed(futures):
+                        finish(*future.result())
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+    finally:
+        _sweep_run = None
+
+    return pd.DataFrame(rows)
@@ -3,3 +3,4 @@ from blankly.indicators.moving_averages import *
 from blankly.indicators.oscillators import *
 from blankly.indicators.statistics import *
 from blankly.indicators.utils import *
+from blankly.indicators.cache import *
@@ -0,0 +1,395 @@
+"""
+    Indicators for many symbols at once over symbols x time matrices
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Each function takes one row per symbol & one column per time, computes every symbol in the same numpy operations and
+#  returns a DataFrame indexed by symbol. The values match the single symbol versions in blankly.indicators, aligned so
+#  that column i is the indicator at time i (NaN while warming up). For example in a screener:
+#
+#   closes = state.history_matrix(to=40, resolution='1d')
+#   oversold = batch.rsi(closes, 14).iloc[:, -1] < 30
+#
+# Symbols with less history are aligned to the most recent time & padded with NaN at the start. A symbol missing a bar in
+#  the middle of its history (such as history_matrix() of symbols which didn't all trade at the same times) is calculated
+#  without that bar, the same as the single symbol version on its own history, and keeps its last value at that time.
+#
+# Internally every indicator runs on a time x symbols array so each step is a single operation over every symbol.
+
+import typing
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+def to_matrix(data: Any, symbols: list = None) -> pd.DataFrame:
+    """
+    Create a symbols x time DataFrame from a DataFrame in that layout, a dictionary of symbols to price series or a 2D
+    array with one row per symbol
+    """
+    if isinstance(data, pd.DataFrame):
+        return data.astype(float)
+    elif isinstance(data, dict):
+        rows = {symbol: np.asarray(values, dtype=float) for symbol, values in data.items()}
+        length = max((len(row) for row in rows.values()), default=0)
+        matrix = np.full((len(rows), length), np.nan)
+        for i, row in enumerate(rows.values()):
+            if len(row):
+                matrix[i, length - len(row):] = row
+        return pd.DataFrame(matrix, index=list(rows.keys()))
+
+    matrix = np.asarray(data, dtype=float)
+    if matrix.ndim != 2:
+        raise ValueError("Batch indicators need one row of prices per symbol.")
+    return pd.DataFrame(matrix, index=symbols)
+
+
+def history_matrix(interface, symbols: typing.List[str], to: typing.Union[str, int] = 200,
+                   resolution: typing.Union[str, float] = '1d', column: str = 'close') -> pd.DataFrame:
+    """
+    Download the history of each symbol into a symbols x time DataFrame with a column for each bar time
+    """
+    rows = {}
+    for symbol in symbols:
+        history = interface.history(symbol, to=to, resolution=resolution)
+        rows[symbol] = pd.Series(history[column].to_numpy(dtype=float), index=history['time'].to_numpy())
+    return pd.DataFrame(rows).sort_index().T
+
+
+def _like(values: np.ndarray, frame: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(values, index=frame.index, columns=frame.columns)
+
+
+class _Layout:
+    """
+    Where each symbol's values were taken from by _by_time, so that _by_symbol can put the outputs back
+    """
+    def __init__(self, values: np.ndarray):
+        self.length = values.shape[1]
+        self.gapped = np.empty(0, dtype=int)
+        missing = np.isnan(values)
+        if not missing.any():
+            self.starts = np.zeros(len(values), dtype=int)
+            self.aligned = True
+            return
+        present = ~missing
+        self.starts = np.argmax(present, axis=1)
+        counts = present.sum(axis=1)
+        # Most rows are one run of values up to the last time, the rest have gaps (or no values at all)
+        runs = counts == self.length - self.starts
+        self.gapped = np.flatnonzero(~runs)
+        if len(self.gapped):
+            gapped = present[self.gapped]
+            # Each time's position among the symbol's own values, counting the latest value before a missing time
+            self.positions = np.cumsum(gapped, axis=1) - 1
+            # The times which have values, in order followed by the missing ones
+            self.order = np.argsort(~gapped, axis=1, kind='stable')
+        self.starts[self.gapped] = -1
+        self.aligned = not self.starts.any()
+
+    def groups(self) -> typing.Iterator[typing.Tuple[int, np.ndarray]]:
+        # Rows with the same start are moved together, there are usually only a few different starts
+        for start in np.unique(self.starts):
+            if start >= 0:
+                yield start, self.starts == start
+
+
+def _by_time(values: np.ndarray) -> typing.Tuple[np.ndarray, _Layout]:
+    """
+    Move each row's values to the start of the row, leaving out any missing times, and transpose so that each time is
+    contiguous. The recursive indicators then update every symbol with a single operation per time.
+    """
+    layout = _Layout(values)
+    if layout.aligned:
+        return np.ascontiguousarray(values.T), layout
+
+    by_time = np.full(values.shape[::-1], np.nan)
+    for start, rows in layout.groups():
+        by_time[:layout.length - start, rows] = values[rows, start:].T
+    if len(layout.gapped):
+        by_time[:, layout.gapped] = np.take_along_axis(values[layout.gapped], layout.order, axis=1).T
+    return by_time, layout
+
+
+def _by_symbol(values: np.ndarray, layout: _Layout) -> np.ndarray:
+    """
+    Undo _by_time. Times a symbol was missing keep its previous value.
+
+    The result is a transposed view, which is the layout pandas keeps a DataFrame's values in, so it isn't copied again.
+    """
+    if layout.aligned:
+        return values.T
+
+    output = np.full(values.shape, np.nan)
+    for start, rows in layout.groups():
+        output[start:, rows] = values[:layout.length - start, rows]
+    if len(layout.gapped):
+        gapped = np.take_along_axis(values[:, layout.gapped], np.maximum(layout.positions, 0).T, axis=0)
+        gapped[layout.positions.T < 0] = np.nan
+        output[:, layout.gapped] = gapped
+    return output.T
+
+
+def _apply(data: Any, function: typing.Callable, *args) -> typing.Any:
+    """
+    Run a function of a time x symbols array & return its outputs as symbols x time DataFrames. The array is a copy, so
+    the function can reuse it.
+    """
+    frame = to_matrix(data)
+    by_time, layout = _by_time(frame.to_numpy())
+    output = function(by_time, *args)
+    if isinstance(output, tuple):
+        return tuple(_like(_by_symbol(values, layout), frame) for values in output)
+    return _like(_by_symbol(output, layout), frame)
+
+
+# The kernels below work on time x symbols arrays in place, one row (every symbol at one time) per operation. Operating
+#  in place is faster than whole array operations here, which would each allocate another array the size of the input.
+
+def _cumulative_sum(by_time: np.ndarray):
+    """
+    Replace a time x symbols array in place with the running totals down each column
+    """
+    for i in range(1, len(by_time)):
+        by_time[i] += by_time[i - 1]
+
+
+def _rolling_sum(by_time: np.ndarray, period: int):
+    """
+    Replace a time x symbols array in place with the sum of each window of `period` rows, kept as a running sum like
+    tulipy. The original rows which are still in the window are kept aside to subtract as they leave it.
+    """
+    if len(by_time) < period:
+        by_time.fill(np.nan)
+        return
+    window = [row.copy() for row in by_time[:period]]
+    by_time[period - 1] = np.sum(window, axis=0)
+    spare = np.empty(by_time.shape[1])
+    for i in range(period, len(by_time)):
+        row = by_time[i]
+        spare[:] = row
+        np.add(by_time[i - 1], spare, out=row)
+        oldest = window[i % period]
+        row -= oldest
+        window[i % period], spare = spare, oldest
+    by_time[:period - 1] = np.nan
+
+
+def _rolling_extreme(by_time: np.ndarray, period: int, combine: np.ufunc):
+    """
+    Replace a time x symbols array in place with the maximum or minimum of each window of `period` rows. Each pass
+    doubles the span of rows that each row covers, then every window is the combination of two (overlapping) spans.
+    """
+    length = len(by_time)
+    if length < period:
+        by_time.fill(np.nan)
+        return
+    span = 1
+    while span * 2 <= period:
+        # Row i now covers rows i to i + span * 2 - 1
+        for i in range(length - span):
+            combine(by_time[i], by_time[i + span], out=by_time[i])
+        span *= 2
+    # The window ending at row i starts at i - period + 1. Going backwards only overwrites rows that aren't needed again.
+    offset = period - span
+    for i in range(length - 1, period - 2, -1):
+        start = i - period + 1
+        combine(by_time[start], by_time[start + offset], out=by_time[i])
+    by_time[:period - 1] = np.nan
+
+
+def _ema(by_time: np.ndarray, smoothing: float):
+    """
+    Exponential smoothing of a time x symbols array in place, starting from the first row like tulipy
+    """
+    if len(by_time):
+        current = by_time[0]
+        for row in by_time[1:]:
+            row -= current
+            row *= smoothing
+            row += current
+            current = row
+
+
+def _wilders(by_time: np.ndarray, period: int):
+    """
+    Replace a time x symbols array in place with the average of the first `period` rows followed by Wilder's smoothing
+    """
+    if len(by_time) < period:
+        by_time.fill(np.nan)
+        return
+    current = by_time[:period].mean(axis=0)
+    by_time[:period - 1] = np.nan
+    by_time[period - 1] = current
+    for row in by_time[period:]:
+        row -= current
+        row /= period
+        row += current
+        current = row
+
+
+def _sma(values: np.ndarray, period: int) -> np.ndarray:
+    _rolling_sum(values, period)
+    values /= period
+    return values
+
+
+def sma(data: Any, period: int = 50) -> pd.DataFrame:
+    return _apply(data, _sma, period)
+
+
+def _ema_of(values: np.ndarray, period: int) -> np.ndarray:
+    _ema(values, 2 / (period + 1))
+    return values
+
+
+def ema(data: Any, period: int = 50) -> pd.DataFrame:
+    return _apply(data, _ema_of, period)
+
+
+def _wma(values: np.ndarray, period: int) -> np.ndarray:
+    if len(values) < period:
+        values.fill(np.nan)
+        return values
+    # Each window's weighted sum is the previous one plus the new value at full weight, minus one of each previous value
+    weighted = values * period
+    weighted[period - 1] = np.tensordot(np.arange(1, period + 1, dtype=float), values[:period], axes=1)
+    _rolling_sum(values, period)
+    weighted[period:] -= values[period - 1:-1]
+    _cumulative_sum(weighted[period - 1:])
+    weighted /= period * (period + 1) / 2
+    weighted[:period - 1] = np.nan
+    return weighted
+
+
+def wma(data: Any, period: int = 50) -> pd.DataFrame:
+    return _apply(data, _wma, period)
+
+
+def _rsi(values: np.ndarray, period: int) -> np.ndarray:
+    symbols = values.shape[1]
+    # The gains & losses side by side, so both are smoothed in one pass
+    moves = np.empty((len(values) - 1, 2 * symbols))
+    up, down = moves[:, :symbols], moves[:, symbols:]
+    np.subtract(values[1:], values[:-1], out=down)
+    np.maximum(down, 0, out=up)
+    np.subtract(up, down, out=down)
+    _wilders(moves, period)
+
+    # The RSI replaces the prices
+    values[0] = np.nan
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.add(up, down, out=down)
+        np.divide(up, down, out=values[1:])
+    values[1:] *= 100
+    return values
+
+
+def rsi(data: Any, period: int = 14) -> pd.DataFrame:
+    return _apply(data, _rsi, period)
+
+
+def _macd(values: np.ndarray, short_period: int, long_period: int,
+          signal_period: int) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # tulipy uses the traditional smoothing for the common 12/26 periods
+    short_smoothing, long_smoothing = (0.15, 0.075) if (short_period, long_period) == (12, 26) else \
+        (2 / (short_period + 1), 2 / (long_period + 1))
+    line = values.copy()
+    _ema(line, short_smoothing)
+    _ema(values, long_smoothing)
+    line -= values
+
+    # The line starts once the long average has seen a full period, which is where the signal begins
+    line[:long_period - 1] = np.nan
+    signal = values
+    signal[:] = line
+    _ema(signal[long_period - 1:], 2 / (signal_period + 1))
+    return line, signal, line - signal
+
+
+def macd(data: Any, short_period: int = 12, long_period: int = 26,
+         signal_period: int = 9) -> typing.Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Returns:
+        The (macd, macd_signal, macd_histogram) DataFrames
+    """
+    return _apply(data, _macd, short_period, long_period, signal_period)
+
+
+def _variance(values: np.ndarray, period: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    The rolling (mean, population variance), calculated from the sums of the values & their squares like tulipy. The
+    values become the mean.
+    """
+    scale = 1 / period
+    variance = values * values
+    _rolling_sum(values, period)
+    _rolling_sum(variance, period)
+    mean = values
+    mean *= scale
+    variance *= scale
+    variance -= mean * mean
+    # Rounding can leave a flat window very slightly negative (NaN stays NaN)
+    np.maximum(variance, 0, out=variance)
+    return mean, variance
+
+
+def var_period(data: Any, period: int = 14) -> pd.DataFrame:
+    return _apply(data, lambda values: _variance(values, period)[1])
+
+
+def stddev_period(data: Any, period: int = 14) -> pd.DataFrame:
+    return _apply(data, lambda values: np.sqrt(_variance(values, period)[1]))
+
+
+def _bbands(values: np.ndarray, period: int, stddev: float) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    middle, width = _variance(values, period)
+    np.sqrt(width, out=width)
+    width *= stddev
+    upper = middle + width
+    np.subtract(middle, width, out=width)
+    return width, middle, upper
+
+
+def bbands(data: Any, period: int = 14, stddev: float = 2) -> typing.Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Returns:
+        The (lower, middle, upper) DataFrames
+    """
+    return _apply(data, _bbands, period, stddev)
+
+
+def _sum(values: np.ndarray, period: int) -> np.ndarray:
+    _rolling_sum(values, period)
+    return values
+
+
+def sum_period(data: Any, period: int) -> pd.DataFrame:
+    return _apply(data, _sum, period)
+
+
+def _extreme(values: np.ndarray, period: int, combine: np.ufunc) -> np.ndarray:
+    _rolling_extreme(values, period, combine)
+    return values
+
+
+def min_period(data: Any, period: int) -> pd.DataFrame:
+    return _apply(data, _extreme, period, np.minimum)
+
+
+def max_period(data: Any, period: int) -> pd.DataFrame:
+    return _apply(data, _extreme, period, np.maximum)
@@ -0,0 +1,144 @@
+"""
+    Bounded cache for indicator results
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from blankly.utils.ring_buffer import RingBuffer
+
+__all__ = ['IndicatorCache', 'indicator_cache', 'cached']
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+def _digest(data: np.ndarray) -> bytes:
+    data = np.ascontiguousarray(data)
+    return hashlib.blake2b(memoryview(data).cast('B'), digest_size=16).digest()
+
+
+def _data_key(data: Any) -> Any:
+    """
+    Identify an argument by its contents. Ring buffers are identified by their uid & version without reading them,
+    everything else is hashed.
+    """
+    if isinstance(data, RingBuffer):
+        return 'ring', data.uid, data.version
+    elif data is None or isinstance(data, (int, float, str, bool)):
+        return data
+    elif isinstance(data, np.ndarray):
+        return 'array', data.dtype.str, data.shape, _digest(data)
+    elif isinstance(data, pd.Series):
+        return 'series', _data_key(data.to_numpy())
+    elif isinstance(data, (list, deque, tuple)):
+        try:
+            return 'sequence', _digest(np.fromiter(data, float))
+        except (TypeError, ValueError):
+            raise _Uncacheable
+    raise _Uncacheable
+
+
+def _freeze(result: Any) -> Any:
+    # The same result is handed to every caller, so arrays are made read only to keep one caller from changing another's
+    if isinstance(result, np.ndarray):
+        result.flags.writeable = False
+    elif isinstance(result, tuple):
+        for item in result:
+            _freeze(item)
+    return result
+
+
+class IndicatorCache:
+    """
+    Keeps the results of the last `maxsize` indicator calls, keyed by the indicator, its data & its parameters.
+
+    Calling the same indicator on the same data, such as sma(close, 50) from several events of one symbol during a step,
+    only computes it once. Ring buffers are keyed without being read, so they are the cheapest data to cache on.
+    Numpy results are returned read only because they are shared between callers.
+    """
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__results = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __call__(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Find function(*args, **kwargs) in the cache or compute it
+        """
+        try:
+            key = (function, tuple(_data_key(arg) for arg in args),
+                   tuple(sorted((name, _data_key(value)) for name, value in kwargs.items())))
+        except _Uncacheable:
+            with self.__lock:
+                self.misses += 1
+            return function(*args, **kwargs)
+
+        with self.__lock:
+            try:
+                result = self.__results[key]
+                self.__results.move_to_end(key)
+                self.hits += 1
+                return result
+            except KeyError:
+                self.misses += 1
+
+        result = _freeze(function(*args, **kwargs))
+        with self.__lock:
+            self.__results[key] = result
+            if len(self.__results) > self.maxsize:
+                # Evict the least recently used
+                self.__results.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self.__lock:
+            self.__results.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self.__results),
+            'maxsize': self.maxsize
+        }
+
+    def __len__(self):
+        return len(self.__results)
+
+
+# Shared by every strategy in the process
+indicator_cache = IndicatorCache()
+
+
+def cached(function: Callable, *args, **kwargs) -> Any:
+    """
+    Compute an indicator through the shared cache, for example cached(sma, state.variables['history']['close'], 50)
+    """
+    return indicator_cache(function, *args, **kwargs)
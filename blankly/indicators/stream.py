@@ -0,0 +1,611 @@
+"""
+    Streaming indicators which update in constant time for each new value
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Each indicator gives the same values as the batch version in blankly.indicators (which use tulipy), but keeps just
+#  enough state to take one value at a time. Instead of appending to a history list and recomputing every bar:
+#
+#   def init(symbol, state):
+#       state.variables['rsi'] = stream.RSI(14).seed(state.interface.history(symbol, 50))
+#
+#   def price_event(price, symbol, state):
+#       rsi = state.variables['rsi'].update(price)
+#       if rsi is not None and rsi < 30:
+#           ...
+#
+# update() returns the new value, which is also available as .value. The value is None until enough data has been
+#  seen, exactly where the batch version's output would begin.
+
+import abc
+import math
+from collections import deque
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from blankly.indicators.indicators import bbands, wilders, true_range, average_true_range, willr
+from blankly.indicators.moving_averages import sma, ema, wma, vwma, macd
+from blankly.indicators.oscillators import rsi, chande_momentum_oscillator, absolute_price_oscillator, \
+    percentage_price_oscillator, stochastic_oscillator
+from blankly.indicators.statistics import var_period, stddev_period, sum_period, min_period, max_period
+from blankly.indicators.utils import convert_to_numpy
+
+
+class StreamingIndicator(abc.ABC):
+    # The columns of a history() DataFrame or keys of a bar that update() takes, in order
+    inputs = ('close',)
+
+    def __init__(self):
+        self.value = None
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    @abc.abstractmethod
+    def update(self, *values) -> Any:
+        pass
+
+    @abc.abstractmethod
+    def batch(self, *columns: np.ndarray) -> Any:
+        """
+        Compute the indicator over whole columns at once with the batch version. This doesn't use or change the
+        indicator's own state.
+
+        Returns:
+            The batch output, which starts where the indicator would first be ready. Indicators with several values
+            return a tuple of outputs.
+        """
+
+    def precompute(self, data: Any) -> 'Precomputed':
+        """
+        Compute the indicator over a DataFrame of columns (or the single column) so it can be read row by row
+        """
+        if len(self.inputs) == 1 and not isinstance(data, pd.DataFrame):
+            columns = [data]
+        else:
+            columns = [data[name] for name in self.inputs]
+        columns = [np.ascontiguousarray(convert_to_numpy(column), dtype=float) for column in columns]
+        return Precomputed(self.batch(*columns), len(columns[0]))
+
+    def update_bar(self, bar: dict) -> Any:
+        """
+        Update from a bar such as the one passed to a bar event
+        """
+        return self.update(*(bar[name] for name in self.inputs))
+
+    def seed(self, data: Any) -> 'StreamingIndicator':
+        """
+        Feed in past data, for example the DataFrame returned by interface.history(). Indicators of a single input also
+        accept a list, array or Series.
+
+        Returns:
+            The indicator, so that it can be created & seeded in one line
+        """
+        if isinstance(data, pd.DataFrame):
+            columns = [data[name].to_numpy(dtype=float).tolist() for name in self.inputs]
+        elif len(self.inputs) == 1:
+            columns = [convert_to_numpy(data).tolist()]
+        else:
+            raise ValueError(f"{type(self).__name__} needs a DataFrame with the columns {', '.join(self.inputs)}.")
+
+        for values in zip(*columns):
+            self.update(*values)
+        return self
+
+
+class Precomputed:
+    """
+    The batch output of an indicator, read by the row of the input data. value(row) is the same as what update() would
+    have returned after being given every row up to & including that one.
+    """
+    def __init__(self, output: Any, length: int):
+        self.__multiple = isinstance(output, tuple)
+        self.__output = output
+        # Rows before the output begins have no value
+        self.__warmup = length - len(output[0] if self.__multiple else output)
+
+    def value(self, row: int) -> Any:
+        row -= self.__warmup
+        if row < 0:
+            return None
+        if self.__multiple:
+            return tuple(float(output[row]) for output in self.__output)
+        return float(self.__output[row])
+
+
+class _RollingSum:
+    """
+    The sum of the last `period` values
+    """
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+
+    @property
+    def full(self) -> bool:
+        return len(self.window) == self.period
+
+    def push(self, value: float):
+        if len(self.window) == self.period:
+            self.total -= self.window.popleft()
+        self.window.append(value)
+        self.total += value
+
+
+class _RollingExtreme:
+    """
+    The minimum or maximum of the last `period` values, kept with a monotonic queue
+    """
+    def __init__(self, period: int, maximum: bool):
+        self.period = period
+        self.maximum = maximum
+        self.count = 0
+        # (index, value) pairs where each value beats everything after it
+        self.queue = deque()
+
+    @property
+    def value(self) -> float:
+        return self.queue[0][1]
+
+    def push(self, value: float):
+        queue = self.queue
+        if self.maximum:
+            while queue and queue[-1][1] <= value:
+                queue.pop()
+        else:
+            while queue and queue[-1][1] >= value:
+                queue.pop()
+        queue.append((self.count, value))
+        if queue[0][0] <= self.count - self.period:
+            queue.popleft()
+        self.count += 1
+
+
+class SMA(StreamingIndicator):
+    def __init__(self, period: int = 50):
+        super().__init__()
+        self.period = period
+        self.__sum = _RollingSum(period)
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return sma(close, self.period)
+
+    def update(self, value: float) -> Optional[float]:
+        self.__sum.push(value)
+        if self.__sum.full:
+            self.value = self.__sum.total / self.period
+        return self.value
+
+
+class EMA(StreamingIndicator):
+    def __init__(self, period: int = 50):
+        super().__init__()
+        self.period = period
+        self.smoothing = 2 / (period + 1)
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return ema(close, self.period)
+
+    def update(self, value: float) -> float:
+        # Starts from the first value, like tulipy
+        if self.value is None:
+            self.value = value
+        else:
+            self.value = (value - self.value) * self.smoothing + self.value
+        return self.value
+
+
+class WMA(StreamingIndicator):
+    def __init__(self, period: int = 50):
+        super().__init__()
+        self.period = period
+        self.__weights = period * (period + 1) / 2
+        self.__window = deque()
+        self.__sum = 0.0
+        self.__weighted_sum = 0.0
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return wma(close, self.period)
+
+    def update(self, value: float) -> Optional[float]:
+        window = self.__window
+        if len(window) < self.period - 1:
+            self.__weighted_sum += value * (len(window) + 1)
+            self.__sum += value
+            window.append(value)
+            return self.value
+
+        self.__weighted_sum += value * self.period
+        self.__sum += value
+        window.append(value)
+        self.value = self.__weighted_sum / self.__weights
+        # Every value loses one weight as the window moves forward
+        self.__weighted_sum -= self.__sum
+        self.__sum -= window.popleft()
+        return self.value
+
+
+class VWMA(StreamingIndicator):
+    inputs = ('close', 'volume')
+
+    def __init__(self, period: int = 50):
+        super().__init__()
+        self.period = period
+        self.__weighted = _RollingSum(period)
+        self.__volume = _RollingSum(period)
+
+    def batch(self, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        return vwma(close, volume, self.period)
+
+    def update(self, value: float, volume: float) -> Optional[float]:
+        self.__weighted.push(value * volume)
+        self.__volume.push(volume)
+        if self.__weighted.full:
+            self.value = self.__weighted.total / self.__volume.total
+        return self.value
+
+
+class Wilders(StreamingIndicator):
+    def __init__(self, period: int = 50):
+        super().__init__()
+        self.period = period
+        self.__count = 0
+        self.__sum = 0.0
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return wilders(close, self.period)
+
+    def update(self, value: float) -> Optional[float]:
+        if self.value is not None:
+            self.value = (value - self.value) / self.period + self.value
+            return self.value
+
+        # The first value is the average of the first period
+        self.__count += 1
+        self.__sum += value
+        if self.__count == self.period:
+            self.value = self.__sum / self.period
+        return self.value
+
+
+class RSI(StreamingIndicator):
+    def __init__(self, period: int = 14):
+        super().__init__()
+        self.period = period
+        self.__previous = None
+        self.__count = 0
+        self.__up = 0.0
+        self.__down = 0.0
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return rsi(close, self.period)
+
+    def update(self, value: float) -> Optional[float]:
+        previous, self.__previous = self.__previous, value
+        if previous is None:
+            return self.value
+        up = max(value - previous, 0.0)
+        down = max(previous - value, 0.0)
+
+        if self.__count < self.period:
+            # Average the first period of changes
+            self.__count += 1
+            self.__up += up
+            self.__down += down
+            if self.__count < self.period:
+                return self.value
+            self.__up /= self.period
+            self.__down /= self.period
+        else:
+            self.__up = (up - self.__up) / self.period + self.__up
+            self.__down = (down - self.__down) / self.period + self.__down
+
+        total = self.__up + self.__down
+        self.value = 100 * (self.__up / total) if total else math.nan
+        return self.value
+
+
+class CMO(StreamingIndicator):
+    def __init__(self, period: int = 14):
+        super().__init__()
+        self.period = period
+        self.__previous = None
+        self.__up = _RollingSum(period)
+        self.__down = _RollingSum(period)
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return chande_momentum_oscillator(close, self.period)
+
+    def update(self, value: float) -> Optional[float]:
+        previous, self.__previous = self.__previous, value
+        if previous is None:
+            return self.value
+        self.__up.push(max(value - previous, 0.0))
+        self.__down.push(max(previous - value, 0.0))
+        if self.__up.full:
+            up, down = self.__up.total, self.__down.total
+            self.value = 100 * (up - down) / (up + down) if up + down else math.nan
+        return self.value
+
+
+class APO(StreamingIndicator):
+    def __init__(self, short_period: int = 12, long_period: int = 26):
+        super().__init__()
+        self.short = EMA(short_period)
+        self.long = EMA(long_period)
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return absolute_price_oscillator(close, self.short.period, self.long.period)
+
+    def update(self, value: float) -> Optional[float]:
+        first = self.short.value is None
+        short, long = self.short.update(value), self.long.update(value)
+        if not first:
+            self.value = short - long
+        return self.value
+
+
+class PPO(StreamingIndicator):
+    def __init__(self, short_period: int = 12, long_period: int = 26):
+        super().__init__()
+        self.short = EMA(short_period)
+        self.long = EMA(long_period)
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return percentage_price_oscillator(close, self.short.period, self.long.period)
+
+    def update(self, value: float) -> Optional[float]:
+        first = self.short.value is None
+        short, long = self.short.update(value), self.long.update(value)
+        if not first:
+            self.value = 100 * (short - long) / long
+        return self.value
+
+
+class MACD(StreamingIndicator):
+    """
+    The value is a (macd, macd_signal, macd_histogram) tuple
+    """
+    def __init__(self, short_period: int = 12, long_period: int = 26, signal_period: int = 9):
+        super().__init__()
+        self.short_period = short_period
+        self.long_period = long_period
+        self.signal_period = signal_period
+        self.__short = EMA(short_period)
+        self.__long = EMA(long_period)
+        # tulipy uses the traditional smoothing for the common 12/26 periods
+        if (short_period, long_period) == (12, 26):
+            self.__short.smoothing = 0.15
+            self.__long.smoothing = 0.075
+        self.__signal = EMA(signal_period)
+        self.__count = 0
+
+    def batch(self, close: np.ndarray) -> tuple:
+        return tuple(macd(close, self.short_period, self.long_period, self.signal_period))
+
+    def update(self, value: float) -> Optional[tuple]:
+        short, long = self.__short.update(value), self.__long.update(value)
+        self.__count += 1
+        if self.__count >= self.long_period:
+            macd = short - long
+            signal = self.__signal.update(macd)
+            self.value = (macd, signal, macd - signal)
+        return self.value
+
+
+class _Moments(StreamingIndicator):
+    def __init__(self, period: int = 14):
+        super().__init__()
+        self.period = period
+        self._sum = _RollingSum(period)
+        self._squares = _RollingSum(period)
+
+    def _variance(self, value: float) -> Optional[float]:
+        self._sum.push(value)
+        self._squares.push(value * value)
+        if not self._sum.full:
+            return None
+        scale = 1 / self.period
+        return self._squares.total * scale - (self._sum.total * scale) ** 2
+
+
+class Variance(_Moments):
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return var_period(close, self.period)
+
+    def update(self, value: float) -> Optional[float]:
+        variance = self._variance(value)
+        if variance is not None:
+            self.value = variance
+        return self.value
+
+
+class StdDev(_Moments):
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return stddev_period(close, self.period)
+
+    def update(self, value: float) -> Optional[float]:
+        variance = self._variance(value)
+        if variance is not None:
+            self.value = math.sqrt(variance)
+        return self.value
+
+
+class BollingerBands(_Moments):
+    """
+    The value is a (lower, middle, upper) tuple
+    """
+    def __init__(self, period: int = 14, stddev: float = 2):
+        super().__init__(period)
+        self.stddev = stddev
+
+    def batch(self, close: np.ndarray) -> tuple:
+        return tuple(bbands(close, self.period, self.stddev))
+
+    def update(self, value: float) -> Optional[tuple]:
+        variance = self._variance(value)
+        if variance is not None:
+            middle = self._sum.total / self.period
+            width = self.stddev * math.sqrt(variance)
+            self.value = (middle - width, middle, middle + width)
+        return self.value
+
+
+class Sum(StreamingIndicator):
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = period
+        self.__sum = _RollingSum(period)
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return sum_period(close, self.period)
+
+    def update(self, value: float) -> Optional[float]:
+        self.__sum.push(value)
+        if self.__sum.full:
+            self.value = self.__sum.total
+        return self.value
+
+
+class Min(StreamingIndicator):
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = period
+        self.__extreme = _RollingExtreme(period, maximum=False)
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return min_period(close, self.period)
+
+    def update(self, value: float) -> Optional[float]:
+        self.__extreme.push(value)
+        if self.__extreme.count >= self.period:
+            self.value = self.__extreme.value
+        return self.value
+
+
+class Max(StreamingIndicator):
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = period
+        self.__extreme = _RollingExtreme(period, maximum=True)
+
+    def batch(self, close: np.ndarray) -> np.ndarray:
+        return max_period(close, self.period)
+
+    def update(self, value: float) -> Optional[float]:
+        self.__extreme.push(value)
+        if self.__extreme.count >= self.period:
+            self.value = self.__extreme.value
+        return self.value
+
+
+class TrueRange(StreamingIndicator):
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self):
+        super().__init__()
+        self.__close = None
+
+    def batch(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        return true_range(high, low, close)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        previous, self.__close = self.__close, close
+        if previous is None:
+            self.value = high - low
+        else:
+            self.value = max(high - low, abs(high - previous), abs(low - previous))
+        return self.value
+
+
+class ATR(StreamingIndicator):
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, period: int = 50):
+        super().__init__()
+        self.period = period
+        self.__true_range = TrueRange()
+        self.__wilders = Wilders(period)
+
+    def batch(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        return average_true_range(high, low, close, self.period)
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        self.value = self.__wilders.update(self.__true_range.update(high, low, close))
+        return self.value
+
+
+class WillR(StreamingIndicator):
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, period: int = 50):
+        super().__init__()
+        self.period = period
+        self.__high = _RollingExtreme(period, maximum=True)
+        self.__low = _RollingExtreme(period, maximum=False)
+
+    def batch(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        return willr(high, low, close, self.period)
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        self.__high.push(high)
+        self.__low.push(low)
+        if self.__high.count >= self.period:
+            highest, lowest = self.__high.value, self.__low.value
+            self.value = -100 * (highest - close) / (highest - lowest) if highest != lowest else 0.0
+        return self.value
+
+
+class Stochastic(StreamingIndicator):
+    """
+    The value is a (%K, %D) tuple
+    """
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, pct_k_period: int = 14, pct_k_slowing_period: int = 3, pct_d_period: int = 3):
+        super().__init__()
+        self.pct_k_period = pct_k_period
+        self.pct_k_slowing_period = pct_k_slowing_period
+        self.pct_d_period = pct_d_period
+        self.__high = _RollingExtreme(pct_k_period, maximum=True)
+        self.__low = _RollingExtreme(pct_k_period, maximum=False)
+        self.__k = _RollingSum(pct_k_slowing_period)
+        self.__d = _RollingSum(pct_d_period)
+
+    def batch(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> tuple:
+        return tuple(stochastic_oscillator(high, low, close, self.pct_k_period, self.pct_k_slowing_period,
+                                           self.pct_d_period))
+
+    def update(self, high: float, low: float, close: float) -> Optional[tuple]:
+        self.__high.push(high)
+        self.__low.push(low)
+        if self.__high.count < self.pct_k_period:
+            return self.value
+
+        highest, lowest = self.__high.value, self.__low.value
+        self.__k.push(100 * ((close - lowest) / (highest - lowest)) if highest != lowest else 0.0)
+        if not self.__k.full:
+            return self.value
+
+        k = self.__k.total / self.__k.period
+        self.__d.push(k)
+        if self.__d.full:
+            self.value = (k, self.__d.total / self.__d.period)
+        return self.value
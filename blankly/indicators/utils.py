@@ -22,13 +22,18 @@ from collections import deque
 import numpy as np
 import pandas as pd
 
+from blankly.utils.ring_buffer import RingBuffer
+
 
 def to_historical_returns(data: Any):
     return pd.Series(data).diff().tolist()
 
 
 def convert_to_numpy(data: Any):
-    if isinstance(data, list) or isinstance(data, deque):
+    if isinstance(data, RingBuffer):
+        # Already contiguous, so no copy is needed
+        return data.to_numpy()
+    elif isinstance(data, list) or isinstance(data, deque):
         return np.fromiter(data, float)
     elif isinstance(data, pd.Series):
         return data.to_numpy()
@@ -0,0 +1,235 @@
+"""
+    Token bucket rate limiting shared by everything in the process that talks to an exchange.
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+import time
+import typing
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Thread safe token bucket. Tokens refill continuously at `rate` per second up to `capacity`, and each request
+        spends its weight in tokens.
+
+        Args:
+            rate: Tokens (request weight) added per second
+            capacity: The largest burst allowed, defaults to one second of tokens
+        """
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+
+        self.__tokens = self.capacity
+        self.__last = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def __refill(self, now: float):
+        self.__tokens = min(self.capacity, self.__tokens + (now - self.__last) * self.rate)
+        self.__last = now
+
+    def acquire(self, weight: float = 1) -> float:
+        """
+        Block until `weight` tokens are available and spend them. Waiting callers reserve their tokens up front so
+        they are served in the order they arrived.
+
+        Returns:
+            The number of seconds spent waiting
+        """
+        with self.__lock:
+            self.__refill(time.monotonic())
+            self.__tokens -= weight
+            wait = -self.__tokens / self.rate if self.__tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RateLimiter(TokenBucket):
+    def __init__(self, rate: float, capacity: float = None, max_backoff: float = 60):
+        """
+        Token bucket for one class of endpoints on an exchange which also backs off when the exchange reports that
+        it is being rate limited, and keeps track of how long callers spent waiting.
+
+        Args:
+            rate: Request weight allowed per second
+            capacity: The largest burst allowed, defaults to one second of tokens
+            max_backoff: The longest time to block requests after repeated 429 responses
+        """
+        super().__init__(rate, capacity)
+        self.max_backoff = max_backoff
+
+        self.__blocked_until = 0
+        self.__consecutive_throttles = 0
+        self.__lock = threading.Lock()
+
+        self.requests = 0
+        self.weight = 0
+        self.throttled_responses = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self, weight: float = 1) -> float:
+        # Everyone waits out a backoff before spending tokens
+        blocked_for = self.__blocked_until - time.monotonic()
+        if blocked_for > 0:
+            time.sleep(blocked_for)
+        else:
+            blocked_for = 0
+
+        wait = blocked_for + super().acquire(weight)
+        with self.__lock:
+            self.requests += 1
+            self.weight += weight
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def throttle(self, retry_after: float = None) -> float:
+        """
+        Record a rate limit response (HTTP 429 or 418) and block every caller until the exchange should accept
+        requests again. Without a Retry-After hint the delay doubles with each consecutive throttle.
+
+        Returns:
+            The number of seconds that requests are blocked for
+        """
+        with self.__lock:
+            self.throttled_responses += 1
+            if retry_after is None:
+                retry_after = min(self.max_backoff, 2 ** self.__consecutive_throttles)
+            self.__consecutive_throttles += 1
+            self.__blocked_until = max(self.__blocked_until, time.monotonic() + retry_after)
+        return retry_after
+
+    def succeeded(self):
+        self.__consecutive_throttles = 0
+
+    def metrics(self) -> dict:
+        return {
+            'requests': self.requests,
+            'weight': self.weight,
+            'throttled_responses': self.throttled_responses,
+            'total_wait': self.total_wait,
+            'max_wait': self.max_wait
+        }
+
+
+# Documented limits per exchange and endpoint class as (weight per second, burst). Classes that share one budget at
+#  the exchange point at the class that owns it.
+exchange_rate_limits = {
+    'coinbase_pro': {'public': (10, 15), 'private': (15, 30), 'order': 'private'},
+    # 1200 request weight per minute shared by every endpoint, orders are additionally limited to 10 per second
+    'binance': {'public': (20, 100), 'private': 'public', 'order': (10, 10)},
+    'ftx': {'public': (30, 30), 'private': 'public', 'order': 'public'},
+    'kucoin': {'public': (3, 3), 'private': (10, 10), 'order': 'private'},
+    'alpaca': {'public': (200 / 60, 10), 'private': 'public', 'order': 'public'},
+    'oanda': {'public': (100, 100), 'private': 'public', 'order': 'public'},
+    # Market data is 20 per 2 seconds, account data 10 per 2 seconds and order placement 60 per 2 seconds
+    'okx': {'public': (10, 20), 'private': (5, 10), 'order': (30, 60)},
+}
+# Used for any exchange or endpoint class that isn't listed above
+default_rate_limit = (5, 5)
+
+# Endpoint classes whose requests also spend their weight from another class's budget. Each Binance order counts
+#  once against the order limit and its weight against the shared request weight
+charged_rate_limits = {
+    'binance': {'order': 'public'},
+}
+
+# Status codes that mean slow down. Binance answers 418 once an IP is banned for ignoring 429s
+rate_limit_status_codes = (429, 418)
+
+__limiters: typing.Dict[typing.Tuple[str, str], RateLimiter] = {}
+__limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(exchange: str, endpoint_class: str = 'public') -> RateLimiter:
+    """
+    Get the process-wide limiter for an exchange's endpoint class so that every interface, thread and strategy
+    talking to the same venue shares one budget.
+
+    Args:
+        exchange: The exchange type such as 'coinbase_pro'
+        endpoint_class: One of 'public' (market data), 'private' (account data) or 'order' (order placement)
+    """
+    limits = exchange_rate_limits.get(exchange, {})
+    # Follow classes which share a budget to the class that owns it
+    while isinstance(limits.get(endpoint_class), str):
+        endpoint_class = limits[endpoint_class]
+
+    with __limiters_lock:
+        key = (exchange, endpoint_class)
+        if key not in __limiters:
+            __limiters[key] = RateLimiter(*limits.get(endpoint_class, default_rate_limit))
+        return __limiters[key]
+
+
+def rate_limit_metrics() -> typing.Dict[str, dict]:
+    """
+    Request counts and time spent waiting for every limiter used so far, keyed by 'exchange:endpoint_class'
+    """
+    with __limiters_lock:
+        return {f'{exchange}:{endpoint_class}': limiter.metrics()
+                for (exchange, endpoint_class), limiter in __limiters.items()}
+
+
+def __retry_after(response) -> typing.Optional[float]:
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def send_request(exchange: str, endpoint_class: str, send: typing.Callable, weight: float = 1,
+                 max_retries: int = 3):
+    """
+    Send a REST request through the shared limiter. Rate limit responses block the endpoint class for everyone and
+    429s are retried after the backoff. A 418 (ban) is returned to the caller straight away.
+
+    Args:
+        exchange: The exchange type such as 'coinbase_pro'
+        endpoint_class: One of 'public', 'private' or 'order'
+        send: Function which sends the request and returns the requests.Response. This is called again for each
+            retry, so any timestamps or signatures should be created inside it.
+        weight: The request weight charged by the exchange. Classes listed in charged_rate_limits spend one request
+            from their own budget and the weight from the charged class's budget.
+        max_retries: The number of times to retry after a 429
+    """
+    charged_class = charged_rate_limits.get(exchange, {}).get(endpoint_class)
+    if charged_class is None:
+        charges = [(get_rate_limiter(exchange, endpoint_class), weight)]
+    else:
+        charges = [(get_rate_limiter(exchange, endpoint_class), 1), (get_rate_limiter(exchange, charged_class), weight)]
+
+    attempt = 0
+    while True:
+        for limiter, charge in charges:
+            limiter.acquire(charge)
+        response = send()
+        if response.status_code not in rate_limit_status_codes:
+            for limiter, _ in charges:
+                limiter.succeeded()
+            return response
+
+        # The response doesn't say which limit was hit, so every budget the request spent from backs off
+        retry_after = __retry_after(response)
+        for limiter, _ in charges:
+            limiter.throttle(retry_after)
+        if response.status_code != 429 or attempt >= max_retries:
+            return response
+        attempt += 1
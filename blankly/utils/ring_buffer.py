@@ -0,0 +1,154 @@
+"""
+    Fixed capacity NumPy ring buffers for keeping recent price history
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import itertools
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+_buffer_ids = itertools.count()
+
+
+class RingBuffer:
+    """
+    Keeps the last `capacity` values, like deque(maxlen=capacity), in a NumPy array.
+
+    Every value is written twice, at its position & one capacity later, so the values in order are always one contiguous
+    slice of the array. to_numpy() returns that slice without copying, which is what the indicators are passed.
+
+    Each buffer has a unique uid and a version which changes on every write, so (uid, version) identifies the contents.
+    """
+    def __init__(self, capacity: int, data: Iterable = None, dtype: Any = float):
+        if capacity < 1:
+            raise ValueError("A ring buffer needs a capacity of at least one.")
+        self.capacity = capacity
+        self.uid = next(_buffer_ids)
+        self.version = 0
+        self.__data = np.zeros(2 * capacity, dtype=dtype)
+        # Position of the oldest value & where the next one is written
+        self.__start = 0
+        self.__end = 0
+        self.__length = 0
+
+        if data is not None:
+            self.extend(data)
+
+    def append(self, value):
+        self.version += 1
+        end = self.__end
+        self.__data[end] = value
+        self.__data[end + self.capacity] = value
+        end += 1
+        self.__end = end if end < self.capacity else 0
+        if self.__length < self.capacity:
+            self.__length += 1
+        else:
+            self.__start = self.__end
+
+    def extend(self, values: Iterable):
+        values = np.asarray(values if not isinstance(values, RingBuffer) else values.to_numpy())
+        if len(values) >= self.capacity:
+            # Only the last capacity values would be kept anyway
+            values = values[len(values) - self.capacity:]
+            self.__data[:self.capacity] = values
+            self.__data[self.capacity:] = values
+            self.version += 1
+            self.__start = self.__end = 0
+            self.__length = self.capacity
+        else:
+            for value in values:
+                self.append(value)
+
+    def clear(self):
+        self.version += 1
+        self.__start = self.__end = self.__length = 0
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        A read only view of the values from oldest to newest. The view shares memory with the buffer, so it is only
+        valid until the next append. Copy it to keep it.
+        """
+        view = self.__data[self.__start:self.__start + self.__length]
+        view.flags.writeable = False
+        return view
+
+    def __array__(self, dtype=None, copy=None):
+        view = self.to_numpy()
+        if copy or (dtype is not None and view.dtype != dtype):
+            return np.array(view, dtype=dtype)
+        return view
+
+    def __len__(self):
+        return self.__length
+
+    def __getitem__(self, item):
+        return self.to_numpy()[item]
+
+    def __iter__(self):
+        return iter(self.to_numpy())
+
+    def __repr__(self):
+        return f"RingBuffer({self.to_numpy().tolist()}, capacity={self.capacity})"
+
+
+class PriceHistory:
+    """
+    A ring buffer for each OHLCV column. This can be used anywhere a history(return_as='deque') dictionary is, including
+    StrategyState.append_bar(), and each column can be passed straight to an indicator.
+    """
+    columns = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, capacity: int, columns: Iterable[str] = None):
+        self.capacity = capacity
+        self.__buffers = {name: RingBuffer(capacity) for name in (self.columns if columns is None else columns)}
+
+    @classmethod
+    def from_dataframe(cls, data: pd.DataFrame, capacity: int = None) -> 'PriceHistory':
+        """
+        Create from a history() DataFrame, by default with room for as many bars as it has
+        """
+        history = cls(len(data) if capacity is None else capacity, columns=list(data.columns))
+        for name, buffer in history.items():
+            buffer.extend(data[name].to_numpy(dtype=float))
+        return history
+
+    def append_bar(self, bar: dict):
+        for name, buffer in self.__buffers.items():
+            buffer.append(bar[name])
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame({name: buffer.to_numpy().copy() for name, buffer in self.__buffers.items()})
+
+    def keys(self):
+        return self.__buffers.keys()
+
+    def items(self):
+        return self.__buffers.items()
+
+    def __getitem__(self, name: str) -> RingBuffer:
+        return self.__buffers[name]
+
+    def __contains__(self, name: str):
+        return name in self.__buffers
+
+    def __iter__(self):
+        return iter(self.__buffers)
+
+    def __repr__(self):
+        return f"PriceHistory(capacity={self.capacity}, columns={list(self.__buffers)})"
@@ -12,21 +12,26 @@
     You should have received a copy of the GNU Lesser General Public License
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
+import copy
 import math
 
 import blankly
 
+import contextlib
 import datetime
 import json
 import sys
+import threading
 import decimal
 import os
 from datetime import datetime as dt
 from math import trunc as math_trunc
-from typing import Union
+from typing import Union, TYPE_CHECKING
 
 import numpy as np
-import pandas as pd
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Copy of settings to compare defaults vs overrides
 default_general_settings = {
@@ -39,7 +44,8 @@ default_general_settings = {
         "simulate_margin": True,
 
         "coinbase_pro": {
-            "cash": "USD"
+            "cash": "USD",
+            "connection_pool_size": 10
         },
         "binance": {
             "cash": "USDT",
@@ -93,12 +99,20 @@ default_backtest_settings = {
         "save_initial_account_value": True,
         "show_progress_during_backtest": True,
         "cache_location": "./price_caches",
+        "cache_format": "csv",
         "continuous_caching": True,
+        "compact_cache_after_sync": False,
+        "download_threads": 4,
         "resample_account_value_for_metrics": "1d",
         "quote_account_value_in": "USD",
         "ignore_user_exceptions": True,
         "risk_free_return_rate": 0.0,
-        "benchmark_symbol": None
+        "benchmark_symbol": None,
+        "batch_simultaneous_events": False,
+        "intrabar_fills": False,
+        "intrabar_path": "nearest",
+        "profile_backtest": False,
+        "profile_sample_interval": 0.005
     }
 }
 
@@ -550,12 +564,31 @@ def compare_dictionaries(dict1, dict2, force_exchange_specific=True) -> bool:
         return False
 
 
+# Threads which report their progress somewhere else, such as the workers downloading backtest prices
+_progress_state = threading.local()
+
+
+@contextlib.contextmanager
+def silence_progress():
+    """
+    Skip update_progress() on this thread while inside this block. Worker threads use this so that their progress bars
+    don't interleave, and the thread that is waiting on them reports the overall progress instead.
+    """
+    _progress_state.silenced = True
+    try:
+        yield
+    finally:
+        _progress_state.silenced = False
+
+
 def update_progress(progress):
     # From this great post: https://stackoverflow.com/a/15860757/8087739
     # update_progress() : Displays or updates a console progress bar
     # Accepts a float between 0 and 1. Any int will be converted to a float.
     # A value under 0 represents a 'halt'.
     # A value at 1 or bigger represents 100%
+    if getattr(_progress_state, 'silenced', False):
+        return
     bar_length = 10  # Modify this to change the length of the progress bar
     status = ""
     if isinstance(progress, int):
@@ -581,6 +614,9 @@ def split_df(df, n):
 
 
 def get_ohlcv(candles, n, from_zero: bool):
+    # Pandas is imported where it's used so that `import blankly` doesn't pay for it
+    import pandas as pd
+
     if len(candles) < n:
         raise ValueError("Not enough candles provided, required at least {} candles, "
                          "but only received {}".format(n, len(candles)))
@@ -603,7 +639,7 @@ def get_ohlcv(candles, n, from_zero: bool):
     return new_candles
 
 
-def aggregate_candles(history: pd.DataFrame, aggregation_size: int):
+def aggregate_candles(history: 'pd.DataFrame', aggregation_size: int):
     """
     Aggregate history data (such as turn 1m data into 15m data)
     Args:
@@ -611,6 +647,8 @@ def aggregate_candles(history: pd.DataFrame, aggregation_size: int):
         aggregation_size: How many rows of history to aggregate - ex: aggregation_size=15 on 1m data produces
          15m intervals
     """
+    import pandas as pd
+
     aggregated = pd.DataFrame()
     splits = split_df(history, aggregation_size)
     for i in splits:
@@ -687,6 +725,37 @@ class AttributeDict(dict):
         self[attr] = value
 
 
+class FrozenAttributeDict(AttributeDict):
+    """
+    A read-only AttributeDict. Because nothing can change it, the same instance can be handed to every caller
+    instead of giving each one a deep copy. Copying it with copy.copy() or copy.deepcopy() returns a normal, mutable
+    AttributeDict.
+    """
+
+    def __read_only(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only. Use copy.copy() to create a mutable copy.")
+
+    __setitem__ = __read_only
+    __delitem__ = __read_only
+    __setattr__ = __read_only
+    __delattr__ = __read_only
+    __ior__ = __read_only
+    clear = __read_only
+    pop = __read_only
+    popitem = __read_only
+    setdefault = __read_only
+    update = __read_only
+
+    def __copy__(self):
+        return AttributeDict(self)
+
+    def __deepcopy__(self, memo):
+        return AttributeDict({key: copy.deepcopy(value, memo) for key, value in self.items()})
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
 def format_with_new_line(original_string, *components):
     for i in components:
         original_string += str(i)
@@ -833,6 +902,8 @@ def trim_df_time_column(df, epoch_start: [int, float], epoch_stop: [int, float])
 
 
 def aggregate_prices_by_resolution(price_dict, symbol_, resolution_, data_) -> dict:
+    import pandas as pd
+
     if symbol_ not in price_dict:
         price_dict[symbol_] = {}
     # Concat after the resolution check here
@@ -1,16 +1,17 @@
 import blankly
+from blankly.indicators import stream
 
 
 def price_event(price, symbol, state: blankly.StrategyState):
     """ This function will give an updated price every 15 seconds from our definition below """
-    state.variables['history'].append(price)
-    rsi = blankly.indicators.rsi(state.variables['history'])
-    if rsi[-1] < 30 and not state.variables['owns_position']:
+    # Updating the streaming RSI only does the work for the new price
+    rsi = state.variables['rsi'].update(price)
+    if rsi < 30 and not state.variables['owns_position']:
         # Dollar cost average buy
         buy = blankly.trunc(state.interface.cash/price, 2)
         state.interface.market_order(symbol, side='buy', size=buy)
         state.variables['owns_position'] = True
-    elif rsi[-1] > 70 and state.variables['owns_position']:
+    elif rsi > 70 and state.variables['owns_position']:
         # Dollar cost average sell
         curr_value = state.interface.account[state.base_asset].available
         state.interface.market_order(symbol, side='sell', size=curr_value)
@@ -19,8 +20,8 @@ def price_event(price, symbol, state: blankly.StrategyState):
 
 def init(symbol, state: blankly.StrategyState):
     # Download price data to give context to the algo
-    state.variables['history'] = state.interface.history(symbol, to=150, return_as='deque',
-                                                         resolution=state.resolution)['close']
+    history = state.interface.history(symbol, to=150, return_as='deque', resolution=state.resolution)['close']
+    state.variables['rsi'] = stream.RSI(14).seed(history)
     state.variables['owns_position'] = False
 
 
@@ -1,17 +1,20 @@
 from blankly import Screener, Alpaca, ScreenerState
-from blankly.indicators import rsi
+from blankly.indicators import batch
 
 tickers = ['AAPL', 'GME', 'MSFT']  # any stocks that you may want
 
 
+def init(state: ScreenerState):
+    # Get the past 40 closes of every stock and find their current RSIs in one call
+    closes = state.history_matrix(40, resolution='1d')
+    state.variables['rsi'] = batch.rsi(closes, 14).iloc[:, -1]
+
+
 # This function is our evaluator and runs per stock
 def is_stock_buy(symbol, state: ScreenerState):
     # This runs per stock
-    prices = state.interface.history(symbol, 40, resolution='1d',
-                                     return_as='list')  # get past 40 data points
     price = state.interface.get_price(symbol)
-    rsi_values = rsi(prices['close'], 14)
-    return {'is_oversold': bool(rsi_values[-1] < 30), 'price': price, 'symbol': symbol}
+    return {'is_oversold': bool(state.variables['rsi'][symbol] < 30), 'price': price, 'symbol': symbol}
 
 
 def formatter(results, state: ScreenerState):
@@ -25,6 +28,6 @@ def formatter(results, state: ScreenerState):
 
 if __name__ == "__main__":
     alpaca = Alpaca()  # initialize our interface
-    screener = Screener(alpaca, is_stock_buy, symbols=tickers, formatter=formatter)  # find oversold
+    screener = Screener(alpaca, is_stock_buy, symbols=tickers, init=init, formatter=formatter)  # find oversold
 
     print(screener.formatted_results)
@@ -0,0 +1,151 @@
+"""
+    Offline performance benchmarks for the backtesting engine
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# These are skipped in the normal test run. To run them:
+#   BLANKLY_BENCHMARK=1 pytest tests/benchmarks
+# Each measurement is compared to baselines.json and fails if it is more than BLANKLY_BENCHMARK_TOLERANCE (default
+#  0.5, so 50%) worse. After an intended change in performance, or on a new machine, store new baselines with:
+#   BLANKLY_BENCHMARK=update pytest tests/benchmarks
+
+import json
+import os
+import unittest
+
+import pandas as pd
+
+import blankly
+from tests.helpers.backtesting import synthetic_prices, keyless_strategy, backtest_settings
+from tests.test_import_time import probe_import
+
+MODE = os.getenv('BLANKLY_BENCHMARK', '')
+TOLERANCE = float(os.getenv('BLANKLY_BENCHMARK_TOLERANCE', 0.5))
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+# The number of steps to run at each resolution
+RESOLUTIONS = {
+    '1m': (60, 5000),
+    '1h': (3600, 2000),
+    '1d': (86400, 1000)
+}
+
+
+def run_backtest(prices: pd.DataFrame, resolution: str, price_event, settings: dict):
+    strategy = keyless_strategy(prices, maker_fee=0.001, taker_fee=0.002)
+    strategy.add_price_event(price_event, 'BTC-USD', resolution)
+    return strategy.backtest(**settings)
+
+
+def idle(price, symbol, state):
+    pass
+
+
+# Orders placed by the trading callback on each step
+ORDERS_PER_STEP = 4
+
+
+def trade(price, symbol, state):
+    interface = state.interface
+    interface.market_order(symbol, 'buy', 0.1)
+    interface.market_order(symbol, 'sell', 0.1)
+    # Far enough away that they never fill, the cancel keeps the book from growing
+    order = interface.limit_order(symbol, 'buy', blankly.trunc(price * 0.5, 2), 0.1)
+    interface.limit_order(symbol, 'sell', blankly.trunc(price * 2, 2), 0.1)
+    interface.cancel_order(symbol, order.get_id())
+
+
+class BacktestBenchmarks(unittest.TestCase):
+    """
+    Each benchmark records (value, higher_is_better) with measure()
+    """
+    measurements = {}
+
+    @classmethod
+    def setUpClass(cls):
+        if not MODE:
+            raise unittest.SkipTest('Set BLANKLY_BENCHMARK=1 to run the benchmarks')
+        with open(BASELINES_PATH) as file:
+            cls.baselines = json.load(file)
+
+    @classmethod
+    def tearDownClass(cls):
+        if MODE == 'update' and cls.measurements:
+            cls.baselines.update({name: {'value': round(value, 6), 'higher_is_better': higher_is_better}
+                                  for name, (value, higher_is_better) in cls.measurements.items()})
+            with open(BASELINES_PATH, 'w') as file:
+                json.dump(dict(sorted(cls.baselines.items())), file, indent=2)
+                file.write('\n')
+
+    def settings(self, prices: pd.DataFrame) -> dict:
+        return backtest_settings(self, prices, initial_values={'USD': 1000000, 'BTC': 1000}, profile_backtest=True,
+                                 profile_sample_interval=0)
+
+    def measure(self, name: str, value: float, higher_is_better: bool):
+        self.measurements[name] = (value, higher_is_better)
+        print(f'{name}: {value:.6g}')
+        if MODE == 'update' or name not in self.baselines:
+            return
+
+        baseline = self.baselines[name]['value']
+        if higher_is_better:
+            self.assertGreaterEqual(value, baseline * (1 - TOLERANCE),
+                                    f'{name} regressed to {value:.6g} from a baseline of {baseline:.6g}')
+        else:
+            self.assertLessEqual(value, baseline * (1 + TOLERANCE),
+                                 f'{name} regressed to {value:.6g} from a baseline of {baseline:.6g}')
+
+    @staticmethod
+    def steps_per_second(result) -> float:
+        profile = result.get_profile()
+        return profile.loc['run/value_account', 'calls'] / profile.loc['run', 'total_seconds']
+
+    def test_steps_per_second(self):
+        for resolution, (seconds, rows) in RESOLUTIONS.items():
+            with self.subTest(resolution=resolution):
+                prices = synthetic_prices(rows, seconds, wick=0.005)
+                result = run_backtest(prices, resolution, idle, self.settings(prices))
+                self.measure(f'backtest_{resolution}_steps_per_second', self.steps_per_second(result), True)
+
+    def test_order_throughput(self):
+        prices = synthetic_prices(2000, 3600, wick=0.005)
+        result = run_backtest(prices, '1h', trade, self.settings(prices))
+        profile = result.get_profile()
+        callback = profile.loc['run/price_event BTC-USD']
+        self.measure('paper_trade_orders_per_second', ORDERS_PER_STEP * callback['calls'] / callback['total_seconds'],
+                     True)
+        self.measure('backtest_trading_steps_per_second', self.steps_per_second(result), True)
+
+    def test_sync_prices(self):
+        prices = synthetic_prices(20000, 60, wick=0.005)
+        # Both runs share one cache folder
+        settings = self.settings(prices)
+        cold = run_backtest(prices, '1m', idle, settings).get_profile()
+        warm = run_backtest(prices, '1m', idle, settings).get_profile()
+        self.measure('sync_prices_cold_seconds', cold.loc['sync_prices', 'total_seconds'], False)
+        self.measure('sync_prices_warm_seconds', warm.loc['sync_prices', 'total_seconds'], False)
+
+    def test_metrics(self):
+        prices = synthetic_prices(20000, 60, wick=0.005)
+        result = run_backtest(prices, '1m', idle, self.settings(prices))
+        self.measure('metrics_seconds', result.get_profile().loc['metrics', 'total_seconds'], False)
+
+    def test_import_time(self):
+        self.measure('import_blankly_seconds', min(probe_import()['elapsed'] for _ in range(5)), False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+    Unit tests for the Coinbase Pro REST client.
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import base64
+import unittest
+
+from blankly.exchanges.interfaces.coinbase_pro.coinbase_pro_api import API
+
+
+def create_api(api_url: str = 'https://api.pro.coinbase.com/') -> API:
+    secret = base64.b64encode(b'secret').decode()
+    return API(api_key='key', api_secret=secret, api_pass='pass', api_url=api_url, pool_size=4)
+
+
+class CoinbaseProAPITest(unittest.TestCase):
+    def test_session_shared_per_host(self):
+        first = create_api()
+        second = create_api()
+        sandbox = create_api('https://api-public.sandbox.pro.coinbase.com/')
+
+        self.assertIs(first.session, second.session)
+        self.assertIsNot(first.session, sandbox.session)
+
+    def test_pooled_adapter(self):
+        adapter = create_api('https://pool-test.coinbase.com/').session.get_adapter('https://pool-test.coinbase.com/')
+
+        self.assertEqual(adapter._pool_maxsize, 4)
+        # Orders must never be replayed on a server error
+        self.assertFalse(adapter.max_retries.is_retry('POST', 503))
+        self.assertTrue(adapter.max_retries.is_retry('GET', 503))
+        # Rate limits are handled by the shared rate limiter
+        self.assertFalse(adapter.max_retries.is_retry('GET', 429, has_retry_after=True))
@@ -0,0 +1,65 @@
+"""
+    Tests for the columnar account value ledger used by backtests
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from blankly.exchanges.interfaces.paper_trade.backtest.account_ledger import AccountLedger
+
+
+class AccountLedgerTest(unittest.TestCase):
+    def test_matches_list_of_dicts(self):
+        rows = [{'BTC': 1.0, 'time': 10.0, 'USD': 5.0},
+                {'BTC': 2.0, 'time': 20.0, 'USD': 4.0, 'ETH': 3.0},
+                {'time': 30.0, 'USD': 3.0}]
+
+        # Grow past the initial capacity to make sure values survive a resize
+        ledger = AccountLedger(capacity=1)
+        for row in rows:
+            ledger.append_row()
+            for name, value in row.items():
+                ledger.set(name, value)
+
+        self.assertEqual(len(ledger), 3)
+        pd.testing.assert_frame_equal(ledger.to_dataframe(), pd.DataFrame(rows).astype(np.float64))
+
+    def test_discard_row(self):
+        ledger = AccountLedger()
+        ledger.append_row()
+        ledger.set('time', 1)
+        ledger.append_row()
+        ledger.set('time', 2)
+        ledger.set('BTC', 3)
+        ledger.discard_row()
+
+        # A column that only the discarded row had is gone
+        self.assertEqual(ledger.columns, ['time'])
+        self.assertEqual(list(ledger.to_dataframe().columns), ['time'])
+
+        # A reused row starts out empty rather than keeping the discarded values
+        ledger.append_row()
+        ledger.set('USD', 5)
+        np.testing.assert_array_equal(ledger.column('time'), [1, np.nan])
+        np.testing.assert_array_equal(ledger.column('USD'), [np.nan, 5])
+        self.assertEqual(ledger.columns, ['time', 'USD'])
+
+
+if __name__ == '__main__':
+    unittest.main()
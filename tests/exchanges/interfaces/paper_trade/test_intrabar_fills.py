@@ -0,0 +1,97 @@
+"""
+    Tests for filling backtest limit & stop orders against the high and low of each bar
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+from tests.helpers.backtesting import ohlc_bars, keyless_strategy, backtest_settings
+
+FLAT = (100, 100, 100, 100)
+
+
+class IntrabarFillTest(unittest.TestCase):
+    def backtest(self, rows: list, place_orders, **settings) -> tuple:
+        """
+        Run a backtest over the (open, high, low, close) rows which places orders on its first event
+
+        Returns:
+            The placed order ids by name & the backtest result
+        """
+        placed = {}
+
+        def price_event(price, symbol, state):
+            if len(placed) == 0:
+                placed.update(place_orders(state.interface, symbol))
+
+        bars = ohlc_bars(rows)
+        strategy = keyless_strategy(bars, taker_fee=0, maker_fee=0)
+        strategy.add_price_event(price_event, 'BTC-USD', '1h')
+        result = strategy.backtest(**backtest_settings(self, bars, initial_values={'USD': 1000, 'BTC': 2}, **settings))
+        return placed, result
+
+    @staticmethod
+    def filled(placed: dict, result) -> list:
+        """
+        The names of the placed orders in the order they were filled
+        """
+        names = {order_id: name for name, order_id in placed.items()}
+        return [names[record['id']] for record in result.trades['limits_executed']]
+
+    @staticmethod
+    def place_buy(interface, symbol):
+        return {'buy': interface.limit_order(symbol, 'buy', 95, 1).get_id()}
+
+    @staticmethod
+    def place_bracket(interface, symbol):
+        return {
+            'take_profit': interface.limit_order(symbol, 'sell', 110, 1).get_id(),
+            'stop': interface.stop_loss_order(symbol, 90, 1).get_id()
+        }
+
+    def test_fills_when_the_low_crosses(self):
+        rows = [FLAT, (100, 101, 94, 100), FLAT, FLAT]
+
+        # The closes never reach the order
+        self.assertEqual(self.filled(*self.backtest(rows, self.place_buy)), [])
+
+        placed, result = self.backtest(rows, self.place_buy, intrabar_fills=True)
+        self.assertEqual(self.filled(placed, result), ['buy'])
+        final = result.get_account_history().iloc[-1]
+        self.assertEqual((final['USD'], final['BTC']), (905, 3))
+
+    def test_gaps_fill_at_the_open(self):
+        _, result = self.backtest([FLAT, (90, 92, 88, 91), FLAT, FLAT], self.place_buy, intrabar_fills=True)
+        self.assertEqual([record['executed_price'] for record in result.trades['limits_executed']], [90])
+        self.assertEqual(result.get_account_history().iloc[-1]['USD'], 910)
+
+    def test_path_order(self):
+        rows = [FLAT, (100, 112, 85, 100), FLAT, FLAT]
+
+        def fill_order(**settings):
+            return self.filled(*self.backtest(rows, self.place_bracket, intrabar_fills=True, **settings))
+
+        self.assertEqual(fill_order(intrabar_path='high_first'), ['take_profit', 'stop'])
+        self.assertEqual(fill_order(intrabar_path='low_first'), ['stop', 'take_profit'])
+        # The high is closer to the open than the low
+        self.assertEqual(fill_order(), ['take_profit', 'stop'])
+
+        with self.assertRaises(ValueError):
+            fill_order(intrabar_path='sideways')
+
+
+if __name__ == '__main__':
+    unittest.main()
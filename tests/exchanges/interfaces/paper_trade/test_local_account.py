@@ -0,0 +1,69 @@
+"""
+    Tests for the read-only account snapshots of the paper trade local account
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import copy
+import pickle
+import unittest
+
+from blankly.exchanges.interfaces.paper_trade.local_account.trade_local import LocalAccount
+from blankly.utils.utils import AttributeDict
+
+
+def create_account() -> LocalAccount:
+    return LocalAccount({'BTC': AttributeDict({'available': 1.0, 'hold': 0.0}),
+                         'USD': AttributeDict({'available': 100.0, 'hold': 0.0})})
+
+
+class LocalAccountTest(unittest.TestCase):
+    def test_snapshots_are_read_only(self):
+        account = create_account()
+        btc = account.get_account('BTC')
+
+        with self.assertRaises(TypeError):
+            btc['available'] = 5
+        with self.assertRaises(TypeError):
+            btc.available = 5
+        with self.assertRaises(TypeError):
+            account.get_accounts()['USD'].update({'hold': 1})
+        self.assertEqual(account.get_account('BTC').available, 1.0)
+
+        # Copies are ordinary dictionaries that don't touch the account
+        mutable = copy.deepcopy(account.get_accounts())
+        mutable['BTC']['available'] = 5
+        self.assertEqual(type(mutable['BTC']), AttributeDict)
+        self.assertEqual(account.get_account('BTC').available, 1.0)
+        self.assertEqual(pickle.loads(pickle.dumps(btc)), btc)
+
+    def test_snapshots_follow_trades(self):
+        account = create_account()
+        usd = account.get_account('USD')
+        accounts = account.get_accounts()
+        self.assertIs(account.get_account('USD'), usd)
+
+        account.trade_local('BTC-USD', 'buy', 0.5, -10, 2, 8)
+        account.update_hold('USD', 3.0)
+
+        # Old snapshots keep the values from when they were taken
+        self.assertEqual(usd.available, 100.0)
+        self.assertEqual(accounts['BTC'].available, 1.0)
+        self.assertEqual(account.get_account('USD'), {'available': 90.0, 'hold': 3.0})
+        self.assertEqual(account.get_accounts()['BTC'].available, 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+    Tests for the indexed paper trade order book
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+from blankly.exchanges.interfaces.paper_trade.order_book import PaperOrderBook
+
+
+def order(order_id, side, price, order_type='limit', status='pending', symbol='BTC-USD'):
+    return {'id': order_id, 'side': side, 'price': price, 'type': order_type, 'status': status, 'symbol': symbol}
+
+
+class PaperOrderBookTest(unittest.TestCase):
+    def setUp(self):
+        self.book = PaperOrderBook()
+        for created in [order('market', 'buy', 0, order_type='market', status='done'),
+                        order('buy_high', 'buy', 99),
+                        order('sell_low', 'sell', 101),
+                        order('buy_low', 'buy', 90),
+                        order('stop', 'sell', 95, order_type='stop_loss'),
+                        order('other', 'buy', 1000, symbol='ETH-USD')]:
+            self.book.add(created)
+
+    def triggered_ids(self, symbol, price):
+        return [entry[1]['id'] for entry in sorted(self.book.pop_triggered(symbol, price), key=lambda e: e[0])]
+
+    def test_only_crossed_orders_trigger(self):
+        self.assertEqual(self.book.pending_symbols(), ['BTC-USD', 'ETH-USD'])
+        self.assertEqual(self.triggered_ids('BTC-USD', 100), [])
+        self.assertEqual(self.triggered_ids('BTC-USD', 98), ['buy_high'])
+        self.assertEqual(self.triggered_ids('BTC-USD', 200), ['sell_low'])
+        # Stops trigger at their price, buys only once the price is below theirs
+        self.assertEqual(self.triggered_ids('BTC-USD', 90), ['stop'])
+
+    def test_complete_cancel_and_requeue(self):
+        triggered = self.book.pop_triggered('BTC-USD', 50)
+        self.assertEqual(sorted(entry[1]['id'] for entry in triggered), ['buy_high', 'buy_low', 'stop'])
+
+        self.book.complete('buy_high')
+        self.assertEqual(self.book.cancel('buy_low')['id'], 'buy_low')
+        self.assertIsNone(self.book.cancel('buy_low'))
+        self.book.requeue(triggered)
+
+        # Only the stop was left pending, so it is the only one that comes back
+        self.assertEqual(self.triggered_ids('BTC-USD', 50), ['stop'])
+        self.assertEqual([o['id'] for o in self.book.open_orders], ['sell_low', 'stop', 'other'])
+        self.assertEqual([o['id'] for o in self.book.orders], ['market', 'buy_high', 'sell_low', 'stop', 'other'])
+        self.assertIsNotNone(self.book.get('buy_high'))
+        self.assertIsNone(self.book.get('buy_low'))
+
+        self.book.complete('sell_low')
+        self.book.complete('stop')
+        self.assertEqual(self.book.pending_symbols(), ['ETH-USD'])
+
+
+if __name__ == '__main__':
+    unittest.main()
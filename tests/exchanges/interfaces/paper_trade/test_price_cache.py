@@ -0,0 +1,210 @@
+"""
+    Tests for the backtest price cache backends
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from blankly.exchanges.interfaces.paper_trade.backtest.price_cache import CacheManifest, CacheSegment, \
+    CsvCacheBackend, create_cache_backend, parse_segment_name, segment_name
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+def build_prices(start: int, stop: int, resolution: int) -> pd.DataFrame:
+    times = np.arange(start, stop, resolution)
+    return pd.DataFrame({
+        'time': times,
+        'open': np.ones(len(times)),
+        'high': np.ones(len(times)) * 2,
+        'low': np.zeros(len(times)),
+        'close': np.ones(len(times)) * 1.5,
+        'volume': np.arange(len(times), dtype=float)
+    })
+
+
+class PriceCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_folder = os.path.join(self.directory.name, 'price_caches')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_segment_name_round_trip(self):
+        name = segment_name('coinbase_pro', True, 'BTC-USD', 1622400000, 1622510793.0, 60, 'csv')
+        self.assertEqual(name, 'coinbase_pro,True,BTC-USD,1622400000,1622510793,60.csv')
+
+        segment = parse_segment_name(name)
+        self.assertEqual(segment.key, ('coinbase_pro', True, 'BTC-USD', 60))
+        self.assertEqual((segment.epoch_start, segment.epoch_stop), (1622400000, 1622510793))
+
+        self.assertIsNone(parse_segment_name('notes.csv'))
+
+    def test_csv_backend(self):
+        cache = CsvCacheBackend(self.cache_folder)
+        self.assertEqual(cache.list_segments(), [])
+
+        df = build_prices(0, 600, 60)
+        name = cache.segment_name('keyless', True, 'BTC-USD', 0, 600, 60)
+        cache.write_segment(df, name)
+
+        # Invalid segments are removed and unrelated files are left alone
+        open(os.path.join(self.cache_folder, 'broken.csv'), 'w').close()
+        open(os.path.join(self.cache_folder, 'readme.txt'), 'w').close()
+
+        segments = cache.list_segments()
+        self.assertEqual([segment.file_name for segment in segments], [name])
+        self.assertEqual(sorted(os.listdir(self.cache_folder)), sorted([name, CacheManifest.file_name, CacheManifest.lock_name, 'readme.txt']))
+        pd.testing.assert_frame_equal(cache.read_segment(name), df)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet_backend_migrates_and_filters(self):
+        csv_cache = CsvCacheBackend(self.cache_folder)
+        csv_cache.list_segments()
+        df = build_prices(0, 6000, 60)
+        csv_cache.write_segment(df, csv_cache.segment_name('keyless', True, 'BTC-USD', 0, 6000, 60))
+
+        cache = create_cache_backend('parquet', self.cache_folder)
+        segments = cache.find_segments('keyless', True, 'BTC-USD', 60, 0, 6000)
+        self.assertEqual(len(segments), 1)
+        self.assertTrue(segments[0].file_name.endswith('.parquet'))
+        self.assertEqual(sorted(os.listdir(self.cache_folder)), sorted([segments[0].file_name,
+                                                                        CacheManifest.file_name,
+                                                                        CacheManifest.lock_name]))
+        self.assertEqual([segment.file_name for segment in cache.manifest.segments()], [segments[0].file_name])
+
+        window = cache.read_segment(segments[0].file_name, 600, 1200)
+        self.assertEqual(window['time'].min(), 600)
+        self.assertEqual(window['time'].max(), 1200)
+
+    def test_manifest_overlapping(self):
+        def segment(start, stop, resolution=60):
+            return CacheSegment('keyless', True, 'BTC-USD', start, stop, resolution,
+                                segment_name('keyless', True, 'BTC-USD', start, stop, resolution, 'csv'))
+
+        manifest = CacheManifest([segment(500, 600), segment(0, 1000), segment(100, 200), segment(1200, 1300),
+                                  segment(0, 5000, 3600)])
+        key = ('keyless', True, 'BTC-USD', 60)
+
+        def spans(start, stop):
+            return [(s.epoch_start, s.epoch_stop) for s in manifest.overlapping(key, start, stop)]
+
+        self.assertEqual(spans(150, 550), [(0, 1000), (100, 200), (500, 600)])
+        self.assertEqual(spans(700, 1100), [(0, 1000)])
+        self.assertEqual(spans(1000, 1200), [(0, 1000), (1200, 1300)])
+        self.assertEqual(spans(1400, 1500), [])
+        self.assertEqual(manifest.overlapping(('keyless', True, 'ETH-USD', 60), 0, 100), [])
+
+        manifest.remove(segment(0, 1000).file_name)
+        self.assertEqual(spans(700, 1100), [])
+
+        # Round trip through the on-disk format
+        self.assertEqual(sorted(CacheManifest.from_dict(manifest.to_dict()).segments()),
+                         sorted(manifest.segments()))
+
+    def test_manifest_is_maintained_and_rebuilt(self):
+        cache = CsvCacheBackend(self.cache_folder)
+        name = cache.segment_name('keyless', True, 'BTC-USD', 0, 600, 60)
+        cache.write_segment(build_prices(0, 600, 60), name)
+
+        # A fresh backend reads the manifest rather than the folder
+        self.assertEqual([s.file_name for s in CsvCacheBackend(self.cache_folder).find_segments(
+            'keyless', True, 'BTC-USD', 60, 100, 200)], [name])
+
+        # Files dropped into the folder by hand are reported until the manifest is rebuilt
+        external = cache.segment_name('keyless', True, 'BTC-USD', 600, 1200, 60)
+        build_prices(600, 1200, 60).to_csv(os.path.join(self.cache_folder, external), index=False)
+        self.assertEqual(cache.verify_manifest(), ([], [external]))
+
+        # A corrupt manifest is rebuilt from the folder
+        with open(os.path.join(self.cache_folder, CacheManifest.file_name), 'w') as file:
+            file.write('{')
+        cache = CsvCacheBackend(self.cache_folder)
+        self.assertEqual(cache.verify_manifest(), ([], []))
+        self.assertEqual(len(cache.find_segments('keyless', True, 'BTC-USD', 60, 0, 1200)), 2)
+
+        # Entries for deleted files are pruned on lookup
+        os.remove(os.path.join(self.cache_folder, name))
+        self.assertEqual(cache.verify_manifest(), ([name], []))
+        self.assertEqual([s.file_name for s in cache.find_segments('keyless', True, 'BTC-USD', 60, 0, 1200)],
+                         [external])
+        self.assertEqual(cache.verify_manifest(), ([], []))
+
+    def test_shared_folder(self):
+        # Two processes sharing the folder, each with the manifest loaded before the other wrote anything
+        first, second = CsvCacheBackend(self.cache_folder), CsvCacheBackend(self.cache_folder)
+        first.manifest, second.manifest
+        names = [first.segment_name('keyless', True, 'BTC-USD', start, start + 600, 60) for start in (0, 600, 1800)]
+        first.write_segment(build_prices(0, 600, 60), names[0])
+        second.write_segment(build_prices(600, 1200, 60), names[1])
+        first.write_segment(build_prices(1800, 2400, 60), names[2])
+
+        fresh = CsvCacheBackend(self.cache_folder)
+        self.assertEqual(sorted(s.file_name for s in fresh.manifest.segments()), sorted(names))
+        self.assertEqual(fresh.verify_manifest(), ([], []))
+
+        # A removal by one isn't undone by the other's next write
+        second.remove_segment(names[2])
+        name = first.segment_name('keyless', True, 'ETH-USD', 0, 600, 60)
+        first.write_segment(build_prices(0, 600, 60), name)
+        self.assertEqual(CsvCacheBackend(self.cache_folder).verify_manifest(), ([], []))
+
+    def test_unlisted_segments_are_found(self):
+        cache = CsvCacheBackend(self.cache_folder)
+        cache.write_segment(build_prices(0, 600, 60), cache.segment_name('keyless', True, 'BTC-USD', 0, 600, 60))
+        # Written by a process that stopped before indexing it
+        name = cache.segment_name('keyless', True, 'ETH-USD', 0, 600, 60)
+        build_prices(0, 600, 60).to_csv(os.path.join(self.cache_folder, name), index=False)
+
+        self.assertEqual([s.file_name for s in cache.find_segments('keyless', True, 'ETH-USD', 60, 0, 600)], [name])
+        self.assertEqual(CsvCacheBackend(self.cache_folder).verify_manifest(), ([], []))
+
+    def test_compact(self):
+        cache = CsvCacheBackend(self.cache_folder)
+        # Two overlapping segments, one touching them and one separated by a gap
+        for start, stop in [(0, 600), (300, 900), (900, 1200), (1800, 2400)]:
+            cache.write_segment(build_prices(start, stop, 60),
+                                cache.segment_name('keyless', True, 'BTC-USD', start, stop, 60))
+        size = sum(os.path.getsize(os.path.join(self.cache_folder, s.file_name)) for s in cache.manifest.segments())
+
+        result = cache.compact()
+        self.assertEqual((result.segments_merged, result.segments_written), (3, 1))
+
+        segments = cache.find_segments('keyless', True, 'BTC-USD', 60, 0, 2400)
+        self.assertEqual([(s.epoch_start, s.epoch_stop) for s in segments], [(0, 1200), (1800, 2400)])
+        self.assertEqual(cache.verify_manifest(), ([], []))
+        self.assertEqual(
+            size - sum(os.path.getsize(os.path.join(self.cache_folder, s.file_name)) for s in segments),
+            result.bytes_reclaimed)
+
+        merged = cache.read_segment(segments[0].file_name)
+        pd.testing.assert_series_equal(merged['time'], pd.Series(np.arange(0, 1200, 60), name='time'))
+
+        # Nothing is left to merge
+        self.assertEqual(cache.compact().segments_merged, 0)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            create_cache_backend('xml', self.cache_folder)
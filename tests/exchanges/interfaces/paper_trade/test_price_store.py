@@ -0,0 +1,135 @@
+"""
+    Tests for the columnar backtest price store
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from blankly.exchanges.interfaces.paper_trade.backtest.price_store import PriceStore, SymbolPrices, PriceCursor
+from blankly.exchanges.interfaces.paper_trade.backtest_result import BacktestResult
+from tests.helpers.backtesting import synthetic_prices, keyless_strategy, backtest_settings
+
+
+def build_prices(length: int = 10) -> pd.DataFrame:
+    return pd.DataFrame({
+        'time': np.arange(length) * 60 + 1600000000,
+        'open': np.linspace(1, 2, length),
+        'high': np.linspace(2, 3, length),
+        'low': np.linspace(0, 1, length),
+        'close': np.linspace(1.5, 2.5, length),
+        'volume': np.arange(length)
+    })
+
+
+class PriceStoreTest(unittest.TestCase):
+    def test_columns_are_typed_and_contiguous(self):
+        prices = SymbolPrices.from_dataframe(build_prices().reset_index())
+
+        self.assertNotIn('index', prices)
+        self.assertEqual(prices['time'].dtype, np.int64)
+        self.assertEqual(prices['close'].dtype, np.float64)
+        self.assertEqual(prices['volume'].dtype, np.int64)
+        for field in prices.columns:
+            self.assertTrue(prices[field].flags['C_CONTIGUOUS'])
+
+    def test_store_lookup(self):
+        df = build_prices()
+        store = PriceStore.from_dataframes({'BTC-USD': df})
+
+        self.assertIn('BTC-USD', store)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(len(store['BTC-USD']), len(df))
+        self.assertEqual(store['BTC-USD']['close'][3], df['close'].iloc[3])
+        self.assertTrue(np.array_equal(store.column('BTC-USD', 'time'), df['time'].to_numpy()))
+
+    def test_slice_does_not_copy(self):
+        prices = SymbolPrices.from_dataframe(build_prices())
+        sliced = prices.slice(2, 5)
+
+        self.assertEqual(len(sliced), 3)
+        self.assertTrue(np.shares_memory(sliced['close'], prices['close']))
+
+    def test_empty(self):
+        prices = SymbolPrices.from_dataframe(build_prices(0))
+        self.assertTrue(prices.empty)
+
+    def test_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            SymbolPrices({'time': np.arange(3), 'close': np.arange(4)})
+
+
+    def test_result_history_records(self):
+        df = build_prices()
+        store = PriceStore.from_dataframes({'BTC-USD': df})
+        result = BacktestResult({}, {}, store, 0, 1, 'USD', [])
+        self.assertIs(result.prices, store)
+
+        # The same record arrays as the result had before the columnar store
+        expected = df.to_records()
+        history = result.history['BTC-USD']
+        self.assertEqual(history.dtype.names, expected.dtype.names)
+        self.assertEqual(history[3]['close'], expected[3]['close'])
+        np.testing.assert_array_equal(history['time'], df['time'])
+        self.assertIs(result.history, result.history)
+
+    def test_interface_reads_store(self):
+        prices = synthetic_prices(48)
+        seen = []
+
+        def price_event(price, symbol, state):
+            # The interface reads the price out of the same store that the result is given
+            seen.append((state.interface.get_price(symbol), price, state.interface.price_store))
+
+        strategy = keyless_strategy(prices)
+        strategy.add_price_event(price_event, 'BTC-USD', '1h')
+        result = strategy.backtest(**backtest_settings(self, prices))
+
+        self.assertGreater(len(seen), 40)
+        for interface_price, price, store in seen:
+            self.assertEqual(interface_price, price)
+            self.assertIs(store, result.prices)
+        self.assertEqual([price for _, price, _ in seen[:48]], prices['close'].tolist())
+
+
+class PriceCursorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.times = np.arange(0, 1000, 10)
+
+    def test_matches_linear_scan(self):
+        cursor = PriceCursor(self.times)
+        index = 0
+        for requested in [0, 5, 10, 11, 95, 400, 401, 990]:
+            # This is the scan that the cursor replaces
+            while self.times[index] < requested:
+                index += 1
+            self.assertEqual(cursor.advance(requested), index)
+            self.assertTrue(cursor.has_data)
+
+    def test_never_moves_backwards(self):
+        cursor = PriceCursor(self.times)
+        cursor.advance(500)
+        self.assertEqual(cursor.advance(100), 50)
+
+    def test_end_of_data(self):
+        cursor = PriceCursor(self.times)
+        self.assertEqual(cursor.advance(990), len(self.times) - 1)
+        self.assertTrue(cursor.has_data)
+
+        self.assertEqual(cursor.advance(5000), len(self.times) - 1)
+        self.assertFalse(cursor.has_data)
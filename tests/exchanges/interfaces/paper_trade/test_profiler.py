@@ -0,0 +1,69 @@
+"""
+    Tests for the per-phase backtest profiler
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from blankly.exchanges.interfaces.paper_trade.backtest.profiler import BacktestProfiler
+from tests.helpers.backtesting import START, keyless_strategy, backtest_settings
+
+
+class BacktestProfilerTest(unittest.TestCase):
+    def test_report(self):
+        profiler = BacktestProfiler(detailed=True)
+        profiler.add('setup', 1)
+        profiler.add('run', 3)
+        profiler.add('run/callback', 1, calls=4)
+        profiler.add('run/callback', 1, calls=4)
+
+        report = profiler.report()
+        self.assertEqual(profiler.total, 4)
+        self.assertEqual(report.loc['run/callback', 'calls'], 8)
+        self.assertEqual(report.loc['run/callback', 'mean_seconds'], 0.25)
+        self.assertEqual(report.loc['run/other', 'total_seconds'], 1)
+        self.assertEqual(report.loc['run', 'percent'], 75)
+
+    def test_backtest(self):
+        rows = 48
+        prices = pd.DataFrame({
+            'time': START + np.arange(rows) * 3600,
+            'open': np.linspace(100, 120, rows),
+            'high': np.linspace(101, 121, rows),
+            'low': np.linspace(99, 119, rows),
+            'close': np.linspace(100, 120, rows),
+            'volume': np.ones(rows)
+        })
+
+        def price_event(price, symbol, state):
+            state.interface.market_order(symbol, 'buy', 1)
+
+        strategy = keyless_strategy(prices)
+        strategy.add_price_event(price_event, 'BTC-USD', '1h')
+        result = strategy.backtest(**backtest_settings(self, prices, initial_values={'USD': 10000},
+                                                       profile_backtest=True, profile_sample_interval=0))
+
+        report = result.get_profile()
+        for phase in ['run', 'run/price_event BTC-USD', 'run/value_account', 'run/other', 'metrics']:
+            self.assertIn(phase, report.index)
+        self.assertEqual(report.loc['run/price_event BTC-USD', 'calls'], report.loc['run/value_account', 'calls'])
+
+
+if __name__ == '__main__':
+    unittest.main()
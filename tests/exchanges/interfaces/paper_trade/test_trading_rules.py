@@ -0,0 +1,71 @@
+"""
+    Tests for the cached paper trade order filters & fees
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+
+from blankly.exchanges.interfaces.paper_trade.trading_rules import TradingRules, exceeds_decimals
+from blankly.utils.utils import count_decimals
+
+
+def order_filter(exchange_specific: dict) -> dict:
+    return {
+        'market_order': {'base_min_size': 0.001, 'base_max_size': 100, 'base_increment': 0.001,
+                         'quote_increment': 0.01},
+        'limit_order': {'base_min_size': '0.01', 'base_max_size': '50', 'base_increment': 0.0001,
+                        'price_increment': 0.5, 'min_price': '1', 'max_price': '100000'},
+        'exchange_specific': exchange_specific
+    }
+
+
+class TradingRulesTest(unittest.TestCase):
+    def test_exceeds_decimals_matches_count_decimals(self):
+        rng = np.random.default_rng(0)
+        numbers = [0, 3, 100.0, 0.1 + 0.2, 1e-5, 2.5e-7, 1e16, 1.5e17, -0.125, 12345.678]
+        numbers += [round(float(value), int(digits)) for value, digits in
+                    zip(rng.normal(0, 1000, 200), rng.integers(0, 10, 200))]
+        numbers += [float(value) for value in rng.normal(0, 1, 50)]
+
+        for number in numbers:
+            for decimals in range(0, 12):
+                self.assertEqual(exceeds_decimals(number, decimals), count_decimals(number) > decimals,
+                                 (number, decimals))
+
+    def test_create(self):
+        rules = TradingRules.create(order_filter({}), {'maker_fee_rate': '0.001', 'taker_fee_rate': 0.002},
+                                    'coinbase_pro')
+        self.assertEqual((rules.market_base_decimals, rules.quantity_decimals, rules.quote_decimals), (3, 4, 2))
+        self.assertEqual((rules.limit_base_min, rules.limit_base_max), (0.01, 50))
+        self.assertEqual((rules.maker_fee_rate, rules.taker_fee_rate), (0.001, 0.002))
+        self.assertEqual(rules.price_limits(None), (1, 100000))
+        self.assertFalse(rules.shortable)
+
+    def test_exchange_specific(self):
+        fees = {'maker_fee_rate': 0, 'taker_fee_rate': 0}
+        binance = TradingRules.create(order_filter({'limit_multiplier_down': 0.2, 'limit_multiplier_up': 5}), fees,
+                                      'binance')
+        self.assertEqual(binance.price_limits(100), (20, 500))
+
+        alpaca = TradingRules.create(order_filter({'shortable': True}), fees, 'alpaca')
+        self.assertEqual(alpaca.quantity_decimals, 10)
+        self.assertTrue(alpaca.shortable)
+
+
+if __name__ == '__main__':
+    unittest.main()
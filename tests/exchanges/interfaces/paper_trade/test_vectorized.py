@@ -0,0 +1,105 @@
+"""
+    Tests for the vectorized backtest engine
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+
+import blankly
+from blankly.exchanges.interfaces.paper_trade.backtest.vectorized import align_rows, forward_fill, \
+    simulate_positions
+from tests.helpers.backtesting import synthetic_prices, keyless_strategy, backtest_settings
+
+FEE = 0.002
+PRICES = synthetic_prices(200)
+
+
+def target(index: int) -> float:
+    # Hold one coin for five hours and then nothing for five hours
+    return 1.0 if index % 10 < 5 else 0.0
+
+
+class VectorizedSimulationTest(unittest.TestCase):
+    def test_forward_fill(self):
+        filled = forward_fill(np.array([np.nan, 1, np.nan, 0, np.nan]), 3)
+        self.assertTrue(np.array_equal(filled, [3, 1, 1, 0, 0]))
+
+    def test_align_rows(self):
+        times = np.array([0, 10, 20])
+        self.assertTrue(np.array_equal(align_rows(times, np.array([0, 5, 10, 20, 30])), [0, 1, 1, 2, 2]))
+
+    def test_fees_and_positions(self):
+        simulation = simulate_positions(np.array([10., 20., 20., 40.]), np.array([1, 1, np.nan, 0]), 0, 0.5)
+
+        self.assertTrue(np.array_equal(simulation.base, [1, 1, 1, 0]))
+        # The buy is sized up to cover the fee and the sale loses half of its value
+        self.assertTrue(np.array_equal(simulation.orders, [2, 0, 0, -1]))
+        self.assertTrue(np.array_equal(simulation.quote_delta, [-20, -20, -20, 0]))
+
+    def test_missing_prices_without_orders(self):
+        simulation = simulate_positions(np.array([10., np.nan, 10.]), np.array([1, 1, 0]), 0, 0)
+        self.assertTrue(np.array_equal(simulation.quote_delta, [-10, -10, 0]))
+
+
+class VectorizedBacktestTest(unittest.TestCase):
+    def setUp(self):
+        self.settings = backtest_settings(self, PRICES, initial_values={'USD': 10000})
+
+    @staticmethod
+    def backtest(strategy_function):
+        return strategy_function(keyless_strategy(PRICES, taker_fee=FEE))
+
+    def test_matches_event_backtest(self):
+        def price_event(price, symbol, state):
+            index = state.variables['index']
+            state.variables['index'] += 1
+            change = target(index) - state.variables['target']
+            state.variables['target'] = target(index)
+            if change > 0:
+                state.interface.market_order(symbol, 'buy', blankly.trunc(change / (1 - FEE), 8))
+            elif change < 0:
+                state.interface.market_order(symbol, 'sell', state.interface.account['BTC'].available)
+
+        def init(symbol, state):
+            state.variables['index'] = 0
+            state.variables['target'] = 0
+
+        def run_events(strategy: blankly.Strategy):
+            strategy.add_price_event(price_event, 'BTC-USD', '1h', init=init)
+            return strategy.backtest(**self.settings)
+
+        def run_vectorized(strategy: blankly.Strategy):
+            return strategy.backtest_vectorized(lambda prices, symbol: [target(i) for i in range(len(prices))],
+                                                'BTC-USD', '1h', **self.settings)
+
+        events = self.backtest(run_events)
+        vectorized = self.backtest(run_vectorized)
+
+        # The event loop values the account once more after the final price
+        event_history = events.get_account_history().iloc[:-1]
+        vectorized_history = vectorized.get_account_history()
+        self.assertEqual(list(event_history.columns), list(vectorized_history.columns))
+        self.assertTrue(np.allclose(event_history['Account Value (USD)'].astype(float),
+                                    vectorized_history['Account Value (USD)'].astype(float)))
+        self.assertEqual(len(vectorized.trades['created']), 40)
+        self.assertEqual(events.metrics['sharpe']['value'], vectorized.metrics['sharpe']['value'])
+
+    def test_signal_length(self):
+        with self.assertRaises(ValueError):
+            self.backtest(lambda strategy: strategy.backtest_vectorized(lambda prices, symbol: [1], 'BTC-USD', '1h',
+                                                                        **self.settings))
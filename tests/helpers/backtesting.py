@@ -0,0 +1,95 @@
+"""
+    Synthetic prices and backtest setup shared by the backtesting tests
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import tempfile
+import typing
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import blankly
+from blankly.data import PriceReader
+
+START = 1600000000
+SETTINGS_PATH = './tests/config/settings.json'
+BACKTEST_SETTINGS_PATH = './tests/config/backtest.json'
+
+
+def synthetic_prices(rows: int, resolution: int = 3600, seed: int = 0, wick: float = 0,
+                     start: int = START) -> pd.DataFrame:
+    """
+    A geometric random walk of OHLCV bars. Each bar opens at the previous close and the high & low reach past the
+    body by about `wick` of the price.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    open_ = np.concatenate([[100], close[:-1]])
+    return pd.DataFrame({
+        'time': start + np.arange(rows) * resolution,
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + np.abs(rng.normal(0, wick, rows))),
+        'low': np.minimum(open_, close) * (1 - np.abs(rng.normal(0, wick, rows))),
+        'close': close,
+        'volume': rng.uniform(1, 10, rows)
+    })
+
+
+def ohlc_bars(rows: list, resolution: int = 3600, start: int = START) -> pd.DataFrame:
+    """
+    Bars from a list of (open, high, low, close) tuples
+    """
+    open_, high, low, close = np.array(rows, dtype=float).T
+    return pd.DataFrame({
+        'time': start + np.arange(len(rows)) * resolution,
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': np.ones(len(rows))
+    })
+
+
+def keyless_strategy(prices: typing.Union[pd.DataFrame, list], symbol: str = 'BTC-USD',
+                     **exchange_settings) -> blankly.Strategy:
+    """
+    A strategy on a KeylessExchange which reads the prices from one DataFrame or a list of them at different
+    resolutions. Fees and other exchange settings are passed through.
+    """
+    if isinstance(prices, pd.DataFrame):
+        prices = [prices]
+    exchange = blankly.KeylessExchange(price_reader=[PriceReader(bars, symbol) for bars in prices],
+                                       settings_path=SETTINGS_PATH, **exchange_settings)
+    return blankly.Strategy(exchange)
+
+
+def backtest_settings(test: unittest.TestCase, prices: pd.DataFrame = None, **settings) -> dict:
+    """
+    Arguments for a quiet backtest which caches prices in a temporary folder removed after the test. When prices are
+    given the backtest covers every bar. Anything passed in settings overrides the defaults.
+    """
+    cache = tempfile.TemporaryDirectory()
+    test.addCleanup(cache.cleanup)
+    defaults = {'initial_values': {'USD': 1000}, 'settings_path': BACKTEST_SETTINGS_PATH,
+                'cache_location': cache.name, 'GUI_output': False, 'show_progress_during_backtest': False}
+    if prices is not None:
+        times = prices['time']
+        defaults['start_date'] = int(times.iloc[0])
+        defaults['end_date'] = int(times.iloc[-1] + times.iloc[1] - times.iloc[0])
+    defaults.update(settings)
+    return defaults
@@ -0,0 +1,119 @@
+"""
+    Tests that the multi-symbol indicators match the single symbol indicators
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import blankly.indicators as single
+from blankly.indicators import batch
+from tests.helpers.backtesting import synthetic_prices
+
+
+def random_walks(symbols: int, rows: int) -> dict:
+    # Give every symbol a different amount of history
+    return {f'SYM{i}': synthetic_prices(rows - 7 * i, seed=i)['close'].to_numpy() for i in range(symbols)}
+
+
+class BatchIndicatorTest(unittest.TestCase):
+    def setUp(self):
+        self.prices = random_walks(8, 200)
+
+    def assertMatches(self, output: pd.DataFrame, single_function, *args):
+        self.assertEqual(list(output.index), list(self.prices.keys()))
+        for symbol, prices in self.prices.items():
+            expected = np.asarray(single_function(prices, *args))
+            # Each row is right aligned and the single symbol output is missing its warmup
+            np.testing.assert_allclose(output.loc[symbol].to_numpy()[-len(expected):], expected, rtol=1e-8,
+                                       atol=1e-8, err_msg=f'{single_function.__name__} {symbol}')
+            self.assertTrue(output.loc[symbol].iloc[:-len(expected)].isna().all())
+
+    def test_single_output(self):
+        cases = [
+            (batch.sma, single.sma, 20),
+            (batch.ema, single.ema, 20),
+            (batch.wma, single.wma, 20),
+            (batch.rsi, single.rsi, 14),
+            (batch.var_period, single.var_period, 10),
+            (batch.stddev_period, single.stddev_period, 10),
+            (batch.sum_period, single.sum_period, 10),
+            (batch.min_period, single.min_period, 10),
+            (batch.max_period, single.max_period, 10),
+        ]
+        for batch_function, single_function, period in cases:
+            self.assertMatches(batch_function(self.prices, period), single_function, period)
+
+    def test_multiple_outputs(self):
+        for parameters in [(12, 26, 9), (5, 13, 4)]:
+            for output, index in zip(batch.macd(self.prices, *parameters), range(3)):
+                self.assertMatches(output, lambda prices: single.macd(prices, *parameters)[index])
+
+        for output, index in zip(batch.bbands(self.prices, 20, 2), range(3)):
+            self.assertMatches(output, lambda prices: single.bbands(prices, 20, 2)[index])
+
+    def test_missing_times(self):
+        prices = batch.to_matrix(random_walks(4, 120))
+        # A symbol missing one time in the middle, one missing its latest time and one with no values
+        prices.iloc[1, 60] = np.nan
+        prices.iloc[2, -1] = np.nan
+        prices.iloc[3] = np.nan
+
+        cases = [(batch.rsi, single.rsi, 14), (batch.ema, single.ema, 20), (batch.sma, single.sma, 20),
+                 (batch.stddev_period, single.stddev_period, 10), (batch.max_period, single.max_period, 10)]
+        for batch_function, single_function, period in cases:
+            output = batch_function(prices, period)
+            for symbol in prices.index[:3]:
+                row = prices.loc[symbol]
+                own = row.dropna().to_numpy()
+                expected = np.asarray(single_function(own, period))
+                # Calculated on the symbol's own history, at the times it has values
+                np.testing.assert_allclose(output.loc[symbol, row.notna()].to_numpy()[-len(expected):], expected,
+                                           rtol=1e-8, err_msg=f'{single_function.__name__} {symbol}')
+                # and keeping the latest value over a missing time
+                self.assertFalse(np.isnan(output.loc[symbol].iloc[-1]))
+                np.testing.assert_allclose(output.loc[symbol].iloc[-1], expected[-1], rtol=1e-8)
+            self.assertEqual(output.loc[prices.index[1]].iloc[60], output.loc[prices.index[1]].iloc[59])
+            self.assertTrue(output.loc[prices.index[3]].isna().all())
+
+    def test_inputs(self):
+        matrix = np.vstack([np.arange(10, dtype=float), np.arange(10, 20, dtype=float)])
+        result = batch.sma(matrix, 5)
+        self.assertEqual(result.shape, (2, 10))
+        self.assertEqual(result.iloc[:, -1].tolist(), [7, 17])
+        pd.testing.assert_frame_equal(batch.sma(pd.DataFrame(matrix, index=['A', 'B']), 5),
+                                      result.set_axis(['A', 'B']))
+        with self.assertRaises(ValueError):
+            batch.sma(np.arange(10), 5)
+
+    def test_history_matrix(self):
+        class Interface:
+            @staticmethod
+            def history(symbol, to, resolution):
+                times = np.arange(5) if symbol == 'A' else np.arange(2, 5)
+                return pd.DataFrame({'time': times, 'close': times + (0 if symbol == 'A' else 100)})
+
+        matrix = batch.history_matrix(Interface(), ['A', 'B'], 5, '1d')
+        self.assertEqual(list(matrix.columns), [0, 1, 2, 3, 4])
+        self.assertEqual(matrix.loc['A'].tolist(), [0, 1, 2, 3, 4])
+        self.assertTrue(matrix.loc['B', [0, 1]].isna().all())
+        self.assertEqual(matrix.loc['B', [2, 3, 4]].tolist(), [102, 103, 104])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+    Tests for the indicator result cache
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+
+from blankly.indicators import IndicatorCache, sma, rsi, macd
+from blankly.utils.ring_buffer import RingBuffer
+
+
+class IndicatorCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.close = np.random.default_rng(0).normal(100, 1, 200)
+
+    def test_hits(self):
+        cache = IndicatorCache()
+        first = cache(sma, self.close, 50)
+        self.assertIs(cache(sma, self.close.copy(), 50), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Different parameters, indicators or data are computed separately
+        cache(sma, self.close, 20)
+        cache(rsi, self.close, 20)
+        cache(sma, self.close[1:], 50)
+        self.assertEqual(cache.info()['misses'], 4)
+        self.assertFalse(first.flags.writeable)
+        np.testing.assert_array_equal(first, sma(self.close, 50))
+
+        macd_line, _, _ = cache(macd, list(self.close))
+        self.assertIs(cache(macd, list(self.close))[0], macd_line)
+
+    def test_ring_buffer_version(self):
+        cache = IndicatorCache()
+        buffer = RingBuffer(100, data=self.close)
+        first = cache(sma, buffer, 10)
+        self.assertIs(cache(sma, buffer, 10), first)
+
+        buffer.append(1000)
+        updated = cache(sma, buffer, 10)
+        self.assertIsNot(updated, first)
+        np.testing.assert_array_equal(updated, sma(buffer.to_numpy(), 10))
+        # An identical buffer is a different object, so it is keyed separately
+        cache(sma, RingBuffer(100, data=buffer), 10)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_eviction(self):
+        cache = IndicatorCache(maxsize=2)
+        cache(sma, self.close, 10)
+        cache(sma, self.close, 20)
+        cache(sma, self.close, 10)
+        cache(sma, self.close, 30)
+        self.assertEqual(len(cache), 2)
+
+        # 20 was the least recently used
+        cache(sma, self.close, 10)
+        cache(sma, self.close, 20)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+        cache.clear()
+        self.assertEqual(cache.info(), {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'size': 0, 'maxsize': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
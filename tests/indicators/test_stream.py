@@ -0,0 +1,111 @@
+"""
+    Tests that the streaming indicators match the batch indicators
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pickle
+import unittest
+
+import numpy as np
+
+from blankly.indicators import stream, sma, ema, wma, vwma, wilders, rsi, chande_momentum_oscillator, \
+    absolute_price_oscillator, percentage_price_oscillator, macd, var_period, stddev_period, bbands, sum_period, \
+    min_period, max_period, true_range, average_true_range, willr, stochastic_oscillator
+from tests.helpers.backtesting import synthetic_prices
+
+
+class StreamingIndicatorTest(unittest.TestCase):
+    def assertStreams(self, indicator: stream.StreamingIndicator, expected):
+        """
+        Feed the bars one at a time and compare every value against the aligned end of the batch output
+        """
+        data = synthetic_prices(300, wick=0.005)
+        expected = [np.asarray(output) for output in (expected if isinstance(expected, tuple) else (expected,))]
+        warmup = len(data) - len(expected[0])
+
+        precomputed = indicator.precompute(data)
+        streamed = [indicator.update_bar(bar) for bar in data.to_dict('records')]
+        for row, value in enumerate(streamed):
+            if value is None:
+                self.assertIsNone(precomputed.value(row))
+            else:
+                np.testing.assert_allclose(precomputed.value(row), value, rtol=1e-9, atol=1e-9)
+        self.assertTrue(all(value is None for value in streamed[:warmup]), type(indicator).__name__)
+        streamed = np.array(streamed[warmup:], dtype=float).reshape(len(expected[0]), -1)
+        for column, output in enumerate(expected):
+            np.testing.assert_allclose(streamed[:, column], output, rtol=1e-9, atol=1e-9,
+                                       err_msg=type(indicator).__name__)
+
+    def test_single_input(self):
+        close = synthetic_prices(300, wick=0.005)['close']
+        cases = [
+            (stream.SMA(20), sma(close, 20)),
+            (stream.EMA(20), ema(close, 20)),
+            (stream.WMA(20), wma(close, 20)),
+            (stream.Wilders(20), wilders(close, 20)),
+            (stream.RSI(14), rsi(close, 14)),
+            (stream.CMO(14), chande_momentum_oscillator(close, 14)),
+            (stream.APO(5, 13), absolute_price_oscillator(close, 5, 13)),
+            (stream.PPO(5, 13), percentage_price_oscillator(close, 5, 13)),
+            (stream.Variance(10), var_period(close, 10)),
+            (stream.StdDev(10), stddev_period(close, 10)),
+            (stream.Sum(10), sum_period(close, 10)),
+            (stream.Min(10), min_period(close, 10)),
+            (stream.Max(10), max_period(close, 10)),
+            (stream.MACD(), tuple(macd(close.to_numpy()))),
+            (stream.MACD(5, 13, 4), tuple(macd(close.to_numpy(), 5, 13, 4))),
+            (stream.BollingerBands(20, 2), tuple(bbands(close, 20, 2))),
+        ]
+        for indicator, expected in cases:
+            self.assertStreams(indicator, expected)
+
+    def test_multiple_inputs(self):
+        data = synthetic_prices(300, wick=0.005)
+        high, low, close = data['high'], data['low'], data['close']
+        self.assertStreams(stream.VWMA(20), vwma(close, data['volume'], 20))
+        self.assertStreams(stream.TrueRange(), true_range(high, low, close))
+        self.assertStreams(stream.ATR(14), average_true_range(high, low, close, 14))
+        self.assertStreams(stream.WillR(14), willr(high, low, close, 14))
+        self.assertStreams(stream.Stochastic(14, 3, 3),
+                           tuple(stochastic_oscillator(high.to_numpy(), low.to_numpy(), close.to_numpy(), 14, 3, 3)))
+
+    def test_seed(self):
+        data = synthetic_prices(300, wick=0.005)
+        seeded = stream.RSI(14).seed(data.iloc[:200])
+        self.assertEqual(seeded.update(data['close'].iloc[200]), rsi(data['close'].iloc[:201], 14).iloc[-1])
+        self.assertEqual(stream.SMA(5).seed([1, 2, 3, 4, 5]).value, 3)
+        self.assertFalse(stream.SMA(5).seed([1, 2]).ready)
+
+        with self.assertRaises(ValueError):
+            stream.ATR(14).seed(data['close'])
+
+        # Indicators are kept in state.variables, so they should survive a copy between processes
+        restored = pickle.loads(pickle.dumps(seeded))
+        self.assertEqual(restored.update(1.0), seeded.update(1.0))
+
+    def test_subclasses_implement_update_and_batch(self):
+        class Last(stream.StreamingIndicator):
+            def update(self, value):
+                self.value = value
+                return value
+
+        # A missing batch() fails when the indicator is created rather than when it is first precomputed
+        with self.assertRaises(TypeError):
+            Last()
+
+
+if __name__ == '__main__':
+    unittest.main()
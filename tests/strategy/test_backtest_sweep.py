@@ -0,0 +1,148 @@
+"""
+    Tests for parameter sweeps & walk-forward analysis of a strategy's backtest
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import multiprocessing
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import blankly
+from blankly.frameworks.strategy.sweep import parameter_grid, walk_forward_windows, can_fork
+from tests.helpers.backtesting import synthetic_prices, keyless_strategy, backtest_settings
+
+PRICES = synthetic_prices(300, seed=1)
+
+
+def price_event(price, symbol, state):
+    variables = state.variables
+    variables['history'].append(price)
+    if len(variables['history']) < variables['period']:
+        return
+
+    average = sum(variables['history'][-variables['period']:]) / variables['period']
+    held = state.interface.account[state.base_asset].available
+    if price > average * (1 + variables['band']) and held == 0:
+        state.interface.market_order(symbol, 'buy', 1)
+    elif price < average and held > 0:
+        state.interface.market_order(symbol, 'sell', held)
+
+
+def init(symbol, state):
+    state.variables['history'] = []
+
+
+def create_strategy(variables: dict) -> blankly.Strategy:
+    strategy = keyless_strategy(PRICES, taker_fee=0.001)
+    strategy.add_price_event(price_event, 'BTC-USD', '1h', init=init, variables=variables)
+    return strategy
+
+
+class BacktestSweepTest(unittest.TestCase):
+    def setUp(self):
+        self.settings = backtest_settings(self, PRICES)
+
+    def test_parameter_grid(self):
+        self.assertEqual(parameter_grid({'period': [5, 10], 'band': [0]}),
+                         [{'period': 5, 'band': 0}, {'period': 10, 'band': 0}])
+        self.assertEqual(parameter_grid([{'period': 5}]), [{'period': 5}])
+
+    def test_sweep_matches_backtests(self):
+        grid = {'period': [5, 20], 'band': [0, 0.01]}
+        finished = []
+
+        strategy = create_strategy({'band': 0})
+        parallel = strategy.backtest_sweep(grid, processes=2, callback=lambda parameters, metrics:
+                                           finished.append(parameters), **self.settings)
+        serial = strategy.backtest_sweep(grid, processes=1, **self.settings)
+
+        self.assertEqual(len(finished), 4)
+        self.assertEqual(list(parallel['period']), [5, 5, 20, 20])
+        pd.testing.assert_frame_equal(parallel, serial)
+
+        single = create_strategy({'period': 20, 'band': 0.01}).backtest(**self.settings)
+        self.assertEqual(parallel['sharpe'].iloc[3], single.metrics['sharpe']['value'])
+        self.assertEqual(parallel['cum_returns'].iloc[3], single.metrics['cum_returns']['value'])
+
+    def test_only_forks_on_linux(self):
+        with mock.patch('sys.platform', 'darwin'):
+            self.assertFalse(can_fork())
+        with mock.patch('sys.platform', 'linux'):
+            self.assertEqual(can_fork(), 'fork' in multiprocessing.get_all_start_methods())
+
+    def test_variables_are_restored(self):
+        strategy = create_strategy({'band': 0})
+        strategy.backtest_sweep({'period': [5, 20]}, processes=1, **self.settings)
+        self.assertEqual(dict(strategy.schedulers[0].get_kwargs()['variables']), {'band': 0})
+
+    def test_failed_runs_are_reported(self):
+        # A missing period fails inside the event, which the strategy catches, so break the account instead
+        results = create_strategy({'period': 5, 'band': 0}).backtest_sweep([{'band': 0}], processes=1,
+                                                                           quote_account_value_in='EUR',
+                                                                           **self.settings)
+        self.assertIn('KeyError', results['error'].iloc[0])
+
+
+class WalkForwardTest(unittest.TestCase):
+    def setUp(self):
+        self.settings = backtest_settings(self, PRICES)
+
+    def test_windows(self):
+        rolling = walk_forward_windows(0, 100, 40, 20)
+        self.assertEqual([(window['train_start'], window['test_start']) for window in rolling],
+                         [(0, 40), (20, 60), (40, 80)])
+
+        anchored = walk_forward_windows(0, 100, 40, 20, step=30, anchored=True)
+        self.assertEqual([(window['train_start'], window['test_stop']) for window in anchored], [(0, 60), (0, 90)])
+
+        with self.assertRaises(ValueError):
+            walk_forward_windows(0, 50, 40, 20)
+
+    def test_windows_match_backtests(self):
+        result = create_strategy({'band': 0}).backtest_walk_forward('5d', '3d', {'period': [5, 20], 'band': [0]},
+                                                                    processes=2, **self.settings)
+
+        self.assertEqual(len(result.windows), 2)
+        self.assertAlmostEqual(result.metrics['sharpe'], result.windows['sharpe'].mean())
+
+        # Each test window gives the same result as backtesting only that window with the chosen parameters
+        window = result.windows.iloc[1]
+        single = create_strategy({'period': int(window['period']), 'band': 0}).backtest(
+            **dict(self.settings, start_date=window['test_start'], end_date=window['test_stop']))
+        self.assertEqual(window['sharpe'], single.metrics['sharpe']['value'])
+
+    def test_window_with_one_bound(self):
+        start, stop = int(PRICES['time'][100]), int(PRICES['time'][200])
+        for window, bounds in [((start,), {'start_date': start}), ((None, stop), {'end_date': stop})]:
+            strategy = create_strategy({'period': 5, 'band': 0})
+            strategy.setup_model()
+            backtester = strategy.model.backtester
+            backtester.add_prices('BTC-USD', '1h', start_date=self.settings['start_date'],
+                                  stop_date=self.settings['end_date'])
+            kwargs = {key: value for key, value in self.settings.items()
+                      if key not in ('initial_values', 'settings_path', 'start_date', 'end_date')}
+            strategy.model.preload_backtest_prices(settings_path=self.settings['settings_path'], kwargs=dict(kwargs))
+
+            # The missing bound is the start or end of the preloaded prices
+            backtester.set_backtest_window(*window)
+            windowed = strategy.model.backtest(args={}, initial_values=self.settings['initial_values'],
+                                               settings_path=self.settings['settings_path'], kwargs=dict(kwargs))
+            strategy.model.teardown()
+
+            single = create_strategy({'period': 5, 'band': 0}).backtest(**dict(self.settings, **bounds))
+            pd.testing.assert_frame_equal(windowed.get_account_history(), single.get_account_history())
@@ -0,0 +1,125 @@
+"""
+    Tests for indicators declared on price events
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+
+import blankly
+from blankly.indicators import stream
+from tests.helpers.backtesting import START, synthetic_prices, keyless_strategy, backtest_settings
+
+RESOLUTION = 3600
+
+
+class PrecomputedIndicatorTest(unittest.TestCase):
+    def test_matches_streaming(self):
+        rows = 120
+        steps = []
+
+        def init(symbol, state):
+            # Updated by hand with each price the event is given
+            state.variables['rsi'] = stream.RSI(5)
+            state.variables['macd'] = stream.MACD(3, 6, 2)
+
+        def price_event(price, symbol, state):
+            # The final event runs after the last bar, where the price doesn't move on
+            if state.time < START + rows * RESOLUTION:
+                steps.append((dict(state.indicators), state.variables['rsi'].update(price),
+                              state.variables['macd'].update(price)))
+
+        prices = synthetic_prices(rows)
+        strategy = keyless_strategy(prices)
+        strategy.add_price_event(price_event, 'BTC-USD', '1h', init=init,
+                                 indicators={'rsi': stream.RSI(5), 'macd': stream.MACD(3, 6, 2)})
+        strategy.backtest(**backtest_settings(self, prices))
+
+        self.assertGreater(len(steps), 100)
+        for indicators, rsi, macd in steps:
+            if rsi is None:
+                self.assertIsNone(indicators['rsi'])
+            else:
+                self.assertAlmostEqual(indicators['rsi'], rsi, places=9)
+            if macd is None:
+                self.assertIsNone(indicators['macd'])
+            else:
+                np.testing.assert_allclose(indicators['macd'], macd, rtol=1e-9)
+        self.assertIsNotNone(steps[-1][0]['rsi'])
+
+    def test_event_resolution(self):
+        days = 30
+        daily = synthetic_prices(days, 86400, seed=1)
+        steps = []
+
+        def daily_event(price, symbol, state):
+            steps.append((state.time, state.indicators['rsi']))
+
+        strategy = keyless_strategy([synthetic_prices(days * 24), daily])
+        strategy.add_price_event(lambda price, symbol, state: None, 'BTC-USD', '1h')
+        strategy.add_price_event(daily_event, 'BTC-USD', '1d', indicators={'rsi': stream.RSI(3)})
+        strategy.backtest(**backtest_settings(self, daily, end_date=START + (days - 1) * 86400))
+
+        # The daily event's RSI only sees the daily bars, up to the one at the event's time
+        self.assertGreater(len(steps), 20)
+        times = daily['time'].to_numpy()
+        for time, value in steps:
+            row = min(int(np.searchsorted(times, time)), len(times) - 1)
+            expected = stream.RSI(3).seed(daily['close'].iloc[:row + 1]).value
+            if expected is None:
+                self.assertIsNone(value)
+            else:
+                self.assertAlmostEqual(value, expected, places=9)
+
+    def test_live_updates(self):
+        prices = {'BTC-USD': [1, 2, 3, 2, 4, 5], 'ETH-USD': [10, 9, 8, 9, 7, 6]}
+        received = {symbol: [] for symbol in prices}
+
+        class Interface:
+            @staticmethod
+            def get_price(symbol):
+                return prices[symbol][len(received[symbol])]
+
+        def price_event(price, symbol, state):
+            received[symbol].append(state.indicators['sma'])
+
+        shared = {'sma': stream.SMA(3)}
+        strategy = keyless_strategy(synthetic_prices(10))
+        for symbol in prices:
+            strategy.add_price_event(price_event, symbol, '1h', indicators=shared)
+        strategy.setup_model()
+        strategy.model.interface = Interface()
+
+        for _ in range(len(prices['BTC-USD'])):
+            for scheduler in strategy.schedulers:
+                strategy.model.rest_event(**scheduler.get_kwargs())
+
+        # Each event updates its own copy with its own symbol's prices
+        for symbol, values in prices.items():
+            self.assertEqual(received[symbol], [None, None] + [sum(values[i - 2:i + 1]) / 3 for i in range(2, 6)])
+        self.assertIsNone(shared['sma'].value)
+
+    def test_declarations(self):
+        strategy = keyless_strategy(synthetic_prices(10))
+        with self.assertRaises(TypeError):
+            strategy.add_price_event(print, 'BTC-USD', '1h', indicators={'rsi': blankly.indicators.rsi})
+        with self.assertRaises(ValueError):
+            strategy.add_price_event(print, 'BTC-USD', '1h', indicators={'atr': stream.ATR(14)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+    Guard the cost of `import blankly`
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# Seconds that a cold `import blankly` may take. Override with BLANKLY_IMPORT_BUDGET on slow machines.
+IMPORT_BUDGET = float(os.getenv('BLANKLY_IMPORT_BUDGET', 1.0))
+
+# Modules which should only be loaded once something that needs them is accessed
+LAZY_MODULES = [
+    'bokeh',
+    'pandas',
+    'requests',
+    'binance',
+    'alpaca_trade_api',
+    'kucoin',
+    'blankly.exchanges.exchange',
+    'blankly.frameworks.strategy',
+    'blankly.exchanges.interfaces.paper_trade.backtest_controller',
+]
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import blankly
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def probe_import() -> dict:
+    output = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_heavy_modules_are_lazy(self):
+        self.assertEqual(probe_import()['loaded'], [])
+
+    def test_import_budget(self):
+        # Take the best of a few runs so that a busy machine doesn't fail the test
+        elapsed = min(probe_import()['elapsed'] for _ in range(3))
+        self.assertLess(elapsed, IMPORT_BUDGET, f'`import blankly` took {elapsed:.2f}s, the budget is '
+                                                f'{IMPORT_BUDGET:.2f}s')
+
+    def test_lazy_attributes(self):
+        import blankly
+        self.assertEqual(blankly.Strategy.__name__, 'Strategy')
+        self.assertEqual(blankly.Interface.__name__, 'ABCExchangeInterface')
+        self.assertIn('KeylessExchange', dir(blankly))
+        with self.assertRaises(AttributeError):
+            getattr(blankly, 'NotAnExchange')
@@ -0,0 +1,47 @@
+"""
+    Tests for the console progress bar
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import contextlib
+import io
+import threading
+import unittest
+
+from blankly.utils.utils import update_progress, silence_progress
+
+
+class ProgressTest(unittest.TestCase):
+    def test_silenced_threads(self):
+        output = io.StringIO()
+
+        def worker():
+            with silence_progress():
+                update_progress(0.5)
+
+        with contextlib.redirect_stdout(output):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            self.assertEqual(output.getvalue(), '')
+
+            # Only the thread that silenced itself is affected
+            update_progress(0.5)
+            self.assertIn('50.0%', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+    Tests for the shared exchange rate limiter
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+import time
+import unittest
+
+from blankly.utils.rate_limiter import RateLimiter, TokenBucket, get_rate_limiter, rate_limit_metrics, send_request
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers: dict = None):
+        self.status_code = status_code
+        self.headers = headers if headers is not None else {}
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_throttle(self):
+        bucket = TokenBucket(rate=50, capacity=5)
+
+        start = time.monotonic()
+        for _ in range(5):
+            self.assertEqual(bucket.acquire(), 0)
+        # The burst is spent, the next 5 tokens take 0.1 seconds to refill
+        for _ in range(5):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_weight(self):
+        bucket = TokenBucket(rate=100, capacity=10)
+        self.assertEqual(bucket.acquire(10), 0)
+        self.assertAlmostEqual(bucket.acquire(5), 0.05, delta=0.01)
+
+    def test_shared_between_threads(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+
+        def worker():
+            for _ in range(5):
+                bucket.acquire()
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 20 requests with a burst of 1 at 100 per second can't finish in less than 0.19 seconds
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_registry(self):
+        self.assertIs(get_rate_limiter('coinbase_pro'), get_rate_limiter('coinbase_pro'))
+        self.assertIsNot(get_rate_limiter('coinbase_pro'), get_rate_limiter('binance'))
+        self.assertEqual(get_rate_limiter('coinbase_pro').rate, 10)
+
+    def test_endpoint_classes(self):
+        # Binance shares one weight budget between public & private endpoints but limits orders separately
+        self.assertIs(get_rate_limiter('binance', 'public'), get_rate_limiter('binance', 'private'))
+        self.assertIsNot(get_rate_limiter('binance', 'public'), get_rate_limiter('binance', 'order'))
+        self.assertEqual(get_rate_limiter('unlisted_exchange', 'order').rate, 5)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_backoff(self):
+        limiter = RateLimiter(rate=1000, capacity=1000, max_backoff=0.2)
+        # The first backoff of 1 second is capped by max_backoff
+        self.assertEqual(limiter.throttle(), 0.2)
+        self.assertEqual(limiter.throttle(0.05), 0.05)
+
+        # Callers wait out the backoff before spending tokens
+        self.assertGreaterEqual(limiter.acquire(), 0.15)
+        metrics = limiter.metrics()
+        self.assertEqual((metrics['requests'], metrics['throttled_responses']), (1, 2))
+        self.assertGreaterEqual(metrics['total_wait'], 0.15)
+
+    def test_send_request_retries_429(self):
+        responses = [FakeResponse(429, {'Retry-After': '0.05'}), FakeResponse(429, {'Retry-After': '0.05'}),
+                     FakeResponse(200)]
+        calls = []
+
+        def send():
+            calls.append(time.monotonic())
+            return responses[len(calls) - 1]
+
+        start = time.monotonic()
+        self.assertEqual(send_request('test_retry_exchange', 'public', send).status_code, 200)
+        self.assertEqual(len(calls), 3)
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(rate_limit_metrics()['test_retry_exchange:public']['throttled_responses'], 2)
+
+    def test_send_request_does_not_retry_ban(self):
+        calls = []
+
+        def send():
+            calls.append(1)
+            return FakeResponse(418, {'Retry-After': '0'})
+
+        self.assertEqual(send_request('test_ban_exchange', 'public', send).status_code, 418)
+        self.assertEqual(len(calls), 1)
+
+    def test_send_request_charges_shared_weight(self):
+        order_limiter = get_rate_limiter('binance', 'order')
+        weight_limiter = get_rate_limiter('binance', 'public')
+        orders, weight = order_limiter.requests, weight_limiter.weight
+
+        self.assertEqual(send_request('binance', 'order', lambda: FakeResponse(200), weight=2).status_code, 200)
+        # The order counts once against the order limit and its weight against the shared request weight
+        self.assertEqual(order_limiter.requests - orders, 1)
+        self.assertEqual(weight_limiter.weight - weight, 2)
+
+        # Other exchanges only spend from the endpoint class's own budget
+        public, order = get_rate_limiter('okx', 'public').weight, get_rate_limiter('okx', 'order').weight
+        send_request('okx', 'order', lambda: FakeResponse(200), weight=2)
+        self.assertEqual(get_rate_limiter('okx', 'order').weight - order, 2)
+        self.assertEqual(get_rate_limiter('okx', 'public').weight, public)
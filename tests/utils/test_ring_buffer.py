@@ -0,0 +1,76 @@
+"""
+    Tests for the NumPy ring buffer price history
+    Copyright (C) 2022  Emerson Dove
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from blankly.exchanges.interfaces.abc_base_exchange_interface import ABCBaseExchangeInterface
+from blankly.frameworks.strategy import StrategyState
+from blankly.indicators import rsi, sma
+from blankly.indicators.utils import convert_to_numpy
+from blankly.utils.ring_buffer import RingBuffer, PriceHistory
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_matches_deque(self):
+        buffer = RingBuffer(5)
+        reference = deque(maxlen=5)
+        for value in range(23):
+            buffer.append(value)
+            reference.append(value)
+            np.testing.assert_array_equal(buffer.to_numpy(), np.array(reference, dtype=float))
+            self.assertEqual(buffer[-1], reference[-1])
+
+        buffer.extend(range(100, 103))
+        reference.extend(range(100, 103))
+        self.assertEqual(list(buffer), list(reference))
+        buffer.extend(range(50))
+        self.assertEqual(list(buffer), list(range(45, 50)))
+
+    def test_zero_copy(self):
+        buffer = RingBuffer(50, data=np.arange(120, dtype=float))
+        view = convert_to_numpy(buffer)
+        self.assertTrue(view.flags.c_contiguous)
+        self.assertFalse(view.flags.writeable)
+        self.assertTrue(np.shares_memory(view, buffer.to_numpy()))
+
+        np.testing.assert_array_equal(sma(buffer, 10), sma(np.arange(70, 120, dtype=float), 10))
+
+    def test_price_history(self):
+        bars = pd.DataFrame({
+            'time': np.arange(30) * 60,
+            'open': np.linspace(1, 30, 30),
+            'high': np.linspace(2, 31, 30),
+            'low': np.linspace(0, 29, 30),
+            'close': 100 + np.sin(np.arange(30)),
+            'volume': np.ones(30)
+        })
+        history = ABCBaseExchangeInterface.cast_type(bars.iloc[:20], 'ring', 20)
+        self.assertIsInstance(history, PriceHistory)
+
+        for bar in bars.iloc[20:].to_dict('records'):
+            StrategyState.append_bar(history, bar)
+        pd.testing.assert_frame_equal(history.to_dataframe(), bars.iloc[10:].reset_index(drop=True).astype(float))
+        np.testing.assert_array_equal(rsi(history['close'], 5), rsi(bars['close'].iloc[10:].to_numpy(), 5))
+
+
+if __name__ == '__main__':
+    unittest.main()